@@ -3,22 +3,45 @@ Portfolio Agent - Working Implementation
 Uses Yahoo Finance for market data and real allocation algorithms.
 """
 
-from typing import TypedDict, Dict, Any, List
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage
+from typing import TYPE_CHECKING, TypedDict, Dict, Any, List, Optional
+import asyncio
+import copy
+import hashlib
+import json
+import threading
+import time
 import os
 import sys
+import weakref
+
+import numpy as np
 
 # Add tools to path
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from tools.market_data import (
-    get_stock_info,
+    aget_stock_info,
+    aget_many_stock_info,
     find_sector_peers,
     calculate_fundamental_score,
+    calculate_fundamental_scores,
     get_sector_etf,
-    format_market_cap
+    format_market_cap,
+    fundamentals_version,
+    get_fundamentals_version,
+    get_snapshot
 )
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+from config.metrics import cache_samples, increment, record_stage, register_collector, time_stage
+from tools.cache import TTLCache
+from tools.gateway import SourceUnavailable
+from tools.records import StockRecord, StockUniverse
+from tools.score_store import queue_scores
+from tools.response_cache import ResponseCache
+from tools.optimizer import InsufficientHistory, optimize_allocation, price_store_version
+from tools.singleflight import AsyncSingleFlight
 from tools.allocation_algorithms import (
     allocate_low_risk,
     allocate_medium_risk,
@@ -26,6 +49,47 @@ from tools.allocation_algorithms import (
     format_allocation
 )
 
+# One ChatOpenAI per event loop (the server runs one) so its HTTP connection
+# pool (and TLS sessions) is reused across requests instead of being rebuilt
+# on every call. The async pool is bound to the loop it was opened on, so
+# clients are not shared between loops. `_llm` overrides them all (fakes).
+LLM_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+_llm = None
+_llms: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ChatOpenAI]" = weakref.WeakKeyDictionary()
+_llm_lock = threading.Lock()
+
+# Rationales keyed by a fingerprint of the allocation they explain
+_rationale_cache = TTLCache(
+    name="rationale",
+    ttl=float(os.getenv("RATIONALE_CACHE_TTL_SECONDS", "3600")),
+    max_entries=int(os.getenv("RATIONALE_CACHE_SIZE", "512"))
+)
+
+register_collector(lambda: cache_samples("rationale", _rationale_cache.stats()))
+
+# Identical portfolio requests in flight at the same time share one generation
+_portfolio_flight = AsyncSingleFlight("portfolio")
+
+# Event loop per thread behind the synchronous wrappers: reused so that
+# thread's LLM client keeps a live connection pool, while sync callers on
+# different threads run concurrently
+_sync_loops = threading.local()
+
+# Finished responses, keyed on the normalized request and validated on read
+# against the fundamentals versions of every candidate they were built from
+_response_cache = ResponseCache(
+    name="portfolio_response",
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600")),
+    max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "256")),
+    redis_url=os.getenv("REDIS_URL"),
+    path=os.getenv(
+        "RESPONSE_CACHE_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "response_cache.db")
+    )
+)
+
+register_collector(lambda: cache_samples("portfolio_response", _response_cache.stats()))
+
 class PortfolioState(TypedDict):
     """State for portfolio generation."""
     ticker: str
@@ -35,9 +99,9 @@ class PortfolioState(TypedDict):
     max_holdings: int
     
     # Agent outputs
-    target_info: Dict
+    target_info: StockRecord
     peer_candidates: List[str]
-    peer_data: Dict[str, Dict]
+    peer_data: Dict[str, StockRecord]
     allocation: List[Dict]
     rationale: str
     summary: Dict
@@ -48,118 +112,407 @@ def generate_portfolio_allocation(
     investment_amount: float,
     risk_level: str,
     include_etfs: bool = True,
-    max_holdings: int = 5
+    max_holdings: int = 5,
+    market_data: Optional[Dict[str, StockRecord]] = None,
+    strategy: str = "heuristic"
+) -> Dict[str, Any]:
+    """Synchronous agenerate_portfolio_allocation, for scripts and the benchmark runner."""
+    return _run_sync(agenerate_portfolio_allocation(
+        ticker, investment_amount, risk_level, include_etfs, max_holdings, market_data, strategy
+    ))
+
+async def agenerate_portfolio_allocation(
+    ticker: str,
+    investment_amount: float,
+    risk_level: str,
+    include_etfs: bool = True,
+    max_holdings: int = 5,
+    market_data: Optional[Dict[str, StockRecord]] = None,
+    strategy: str = "heuristic"
 ) -> Dict[str, Any]:
     """
     Main entry point for portfolio generation.
-    Simplified single-function implementation for speed.
-    """
+    Market data is fetched off the event loop and the LLM call is awaited,
+    so concurrent requests on one worker do not block each other.
     
-    print(f"🔍 Generating portfolio for {ticker}...")
+    `market_data` optionally supplies prefetched stock info keyed by ticker
+    (see agenerate_portfolio_batch); any ticker missing from it is fetched.
+    Without it, repeat requests are served from the response cache, and
+    identical requests that arrive while one is already being generated
+    await that generation instead of starting their own.
     
-    # Step 1: Get target company info
-    print(f"📊 Fetching data for {ticker}...")
-    target_info = get_stock_info(ticker)
-    target_score = calculate_fundamental_score(target_info)
-    target_info["score"] = target_score
+    `strategy` is "heuristic" (the risk-level preset weights) or
+    "min_variance" / "max_sharpe" (see tools/optimizer.py).
+    """
+    if market_data is not None:
+        return await _agenerate_portfolio_allocation(
+            ticker, investment_amount, risk_level, include_etfs, max_holdings, market_data, strategy
+        )
     
-    # Step 2: Find peer companies
-    print(f"🔎 Finding peer companies in {target_info['sector']}...")
-    peer_tickers = find_sector_peers(ticker, limit=8)
+    # The persistent tier (SQLite or Redis) and the version checks can block,
+    # so cache reads and writes run off the event loop
+    loop = asyncio.get_running_loop()
+    cache_key = response_cache_key(ticker, investment_amount, risk_level, include_etfs, max_holdings, strategy)
+    cached = await loop.run_in_executor(None, get_cached_response, cache_key)
+    if cached is not None:
+        return cached
     
-    # Step 3: Get data and scores for all candidates
-    print(f"💯 Calculating quality scores...")
-    # Make sure target info has formatted market cap
-    if "market_cap_formatted" not in target_info:
-        target_info["market_cap_formatted"] = format_market_cap(target_info.get("market_cap", 0))
-    
-    peer_data = {ticker: target_info}
-    scored_peers = [(ticker, target_score)]
-    
-    for peer_ticker in peer_tickers:
-        if peer_ticker != ticker:
-            peer_info = get_stock_info(peer_ticker)
-            peer_score = calculate_fundamental_score(peer_info)
-            peer_info["score"] = peer_score
-            # Market cap should already be formatted in get_stock_info, but double-check
-            if "market_cap_formatted" not in peer_info:
-                peer_info["market_cap_formatted"] = format_market_cap(peer_info.get("market_cap", 0))
-            peer_data[peer_ticker] = peer_info
-            scored_peers.append((peer_ticker, peer_score))
+    result = await _portfolio_flight.do(cache_key, lambda: _agenerate_portfolio_allocation(
+        ticker, investment_amount, risk_level, include_etfs, max_holdings,
+        strategy=strategy, cache_key=cache_key
+    ))
+    return copy.deepcopy(result)
+
+async def _agenerate_portfolio_allocation(
+    ticker: str,
+    investment_amount: float,
+    risk_level: str,
+    include_etfs: bool = True,
+    max_holdings: int = 5,
+    market_data: Optional[Dict[str, StockRecord]] = None,
+    strategy: str = "heuristic",
+    cache_key: Optional[str] = None
+) -> Dict[str, Any]:
+    print(f"🔍 Generating portfolio for {ticker}...")
+    start = time.perf_counter()
     
-    # Sort by score (highest first)
-    scored_peers.sort(key=lambda x: x[1], reverse=True)
+    candidates = await agather_candidates(ticker, include_etfs, market_data)
+    target_info = candidates["target_info"]
     
     # Step 4: Apply allocation algorithm
-    print(f"💰 Applying {risk_level} risk allocation...")
-    etf_ticker = get_sector_etf(target_info["sector"]) if include_etfs else None
-    
-    if risk_level == "low":
-        allocations = allocate_low_risk(scored_peers, include_etfs, etf_ticker)
-    elif risk_level == "medium":
-        allocations = allocate_medium_risk(scored_peers, include_etfs, etf_ticker)
-    else:  # high
-        allocations = allocate_high_risk(scored_peers, ticker, include_etfs, etf_ticker)
-    
-    # Add ETF data if included
-    if include_etfs and etf_ticker:
-        etf_info = get_stock_info(etf_ticker)
-        etf_info["score"] = None  # ETFs don't have quality scores
-        etf_info["market_cap_formatted"] = "ETF"
-        peer_data[etf_ticker] = etf_info
-    
-    # Format allocation
-    formatted_allocation = format_allocation(allocations, investment_amount, peer_data)
+    formatted_allocation, strategy_fallback = build_allocation(candidates, risk_level, investment_amount, strategy)
     
     # Step 5: Generate rationale with LLM
     print(f"🤖 Generating portfolio rationale...")
+    llm_ok = True
     try:
-        rationale, per_holding_rationale = generate_rationale_llm(
+        rationale, per_holding_rationale = await agenerate_rationale_llm(
             ticker,
             target_info,
             formatted_allocation,
             risk_level,
             investment_amount
         )
-        
-        # Add per-holding rationale
-        for item in formatted_allocation:
-            item["rationale"] = per_holding_rationale.get(item["ticker"], "Diversification component")
+        apply_holding_rationale(formatted_allocation, per_holding_rationale)
     
     except Exception as e:
         print(f"⚠️  LLM generation failed: {e}")
-        rationale = generate_template_rationale(ticker, formatted_allocation, risk_level)
-        for item in formatted_allocation:
-            item["rationale"] = f"{item['company_name']} - {item['sector']} exposure"
+        rationale = apply_template_rationale(ticker, formatted_allocation, risk_level)
+        llm_ok = False
     
     # Step 6: Calculate summary
-    avg_score = sum(
-        item["earnings_quality_score"] 
-        for item in formatted_allocation 
-        if item["earnings_quality_score"] is not None
-    ) / max(1, sum(1 for item in formatted_allocation if item["earnings_quality_score"] is not None))
-    
-    sector_concentration = {}
-    for item in formatted_allocation:
-        sector = item["sector"]
-        percent = item["allocation_percent"]
-        sector_concentration[sector] = sector_concentration.get(sector, 0) + percent
-    
-    summary = {
-        "total_holdings": len(formatted_allocation),
-        "average_earnings_quality": round(avg_score, 1),
-        "risk_profile": risk_level,
-        "expected_volatility": get_volatility_label(risk_level),
-        "sector_concentration": sector_concentration,
-        "key_insights": generate_insights(formatted_allocation, avg_score, risk_level)
-    }
+    summary = summarize_allocation(formatted_allocation, risk_level)
     
     print(f"✅ Portfolio generated successfully!")
+    record_stage("total", time.perf_counter() - start)
+    
+    response = build_response(
+        ticker, target_info, investment_amount, risk_level, formatted_allocation, summary, rationale,
+        summarize_data_quality(candidates, strategy, strategy_fallback)
+    )
+    if cache_key is not None and llm_ok:
+        await asyncio.get_running_loop().run_in_executor(None, cache_response, cache_key, candidates, response)
+    return response
+
+async def astream_portfolio_allocation(
+    ticker: str,
+    investment_amount: float,
+    risk_level: str,
+    include_etfs: bool = True,
+    max_holdings: int = 5,
+    strategy: str = "heuristic"
+):
+    """
+    Streaming variant of agenerate_portfolio_allocation.
+    
+    Yields (event, data) pairs as each stage finishes: "target", "peers",
+    "allocation", "summary", then "rationale_token" chunks from the LLM,
+    the parsed "rationale" and finally the full response as "complete".
+    """
+    
+    print(f"🔍 Streaming portfolio for {ticker}...")
+    start = time.perf_counter()
+    
+    # Step 1: Get target company info
+    print(f"📊 Fetching data for {ticker}...")
+    with time_stage("target_fetch"):
+        target_info = await aget_stock_info(ticker)
+    # A stub for an unavailable target has no metrics to score (as in score_candidates)
+    target_status = target_info.data_status
+    yield "target", {
+        "ticker": ticker,
+        "company_name": target_info.company_name,
+        "sector": target_info.sector,
+        "industry": target_info.industry or "Unknown",
+        "market_cap": target_info.market_cap_formatted or "N/A",
+        "earnings_quality_score": None if target_status == "unavailable" else calculate_fundamental_score(target_info),
+        "data_status": target_status
+    }
+    
+    # Steps 2-3: Peers and scores
+    candidate_tickers, etf_ticker = plan_candidates(ticker, target_info, include_etfs)
+    fetch_tickers = candidate_tickers + ([etf_ticker] if etf_ticker else [])
+    with time_stage("peer_fetch"):
+        fetched = await _aget_stock_infos(fetch_tickers)
+    candidates = score_candidates(ticker, target_info, candidate_tickers, fetched, etf_ticker)
+    target_info = candidates["target_info"]
+    yield "peers", {
+        "peers": [
+            {"ticker": peer_ticker, "earnings_quality_score": score}
+            for peer_ticker, score in candidates["scored_peers"]
+        ],
+        "etf": candidates["etf_ticker"]
+    }
+    
+    # Step 4: Allocation (rationale filled in once the LLM answers)
+    formatted_allocation, strategy_fallback = build_allocation(candidates, risk_level, investment_amount, strategy)
+    yield "allocation", {"allocation": formatted_allocation}
+    
+    # Step 6 runs before the LLM: the summary does not depend on the rationale
+    summary = summarize_allocation(formatted_allocation, risk_level)
+    yield "summary", summary
+    
+    # Step 5: Stream rationale tokens
+    print(f"🤖 Streaming portfolio rationale...")
+    try:
+        cache_key = rationale_fingerprint(ticker, investment_amount, {risk_level: formatted_allocation})
+        cached = _rationale_cache.get(cache_key)
+        if cached is not None:
+            rationale, per_holding_rationale = _copy_rationale(cached)
+        else:
+            prompt = build_rationale_prompt(ticker, target_info, formatted_allocation, risk_level, investment_amount)
+            chunks = []
+            llm_start = time.perf_counter()
+            async for chunk in get_llm().astream(prompt_messages(prompt)):
+                if chunk.content:
+                    chunks.append(chunk.content)
+                    yield "rationale_token", {"text": chunk.content}
+            record_stage("llm", time.perf_counter() - llm_start)
+            rationale, per_holding_rationale = _cache_rationale(cache_key, parse_rationale("".join(chunks)))
+        apply_holding_rationale(formatted_allocation, per_holding_rationale)
+    
+    except Exception as e:
+        increment("portfolio_errors_total", stage="llm")
+        print(f"⚠️  LLM generation failed: {e}")
+        rationale = apply_template_rationale(ticker, formatted_allocation, risk_level)
+    
+    yield "rationale", {
+        "overall": rationale,
+        "holdings": {item["ticker"]: item["rationale"] for item in formatted_allocation}
+    }
+    
+    print(f"✅ Portfolio streamed successfully!")
+    record_stage("total", time.perf_counter() - start)
+    
+    yield "complete", build_response(
+        ticker, target_info, investment_amount, risk_level, formatted_allocation, summary, rationale,
+        summarize_data_quality(candidates, strategy, strategy_fallback)
+    )
+
+def gather_candidates(
+    ticker: str,
+    include_etfs: bool = True,
+    market_data: Optional[Dict[str, StockRecord]] = None
+) -> Dict[str, Any]:
+    """Synchronous agather_candidates (used by the backtest CLI)."""
+    return _run_sync(agather_candidates(ticker, include_etfs, market_data))
+
+async def agather_candidates(
+    ticker: str,
+    include_etfs: bool = True,
+    market_data: Optional[Dict[str, StockRecord]] = None
+) -> Dict[str, Any]:
+    """
+    Steps 1-3: fetch the target, discover peers and score every candidate.
+    
+    The result is independent of risk level, so it can be shared by several
+    allocations (see agenerate_risk_comparison).
+    """
+    
+    # Step 1: Get target company info
+    print(f"📊 Fetching data for {ticker}...")
+    with time_stage("target_fetch"):
+        target_info = _prefetched_info(ticker, market_data) or await aget_stock_info(ticker)
+    
+    candidate_tickers, etf_ticker = plan_candidates(ticker, target_info, include_etfs)
+    
+    # Fetch all peers and the sector ETF concurrently; slow tickers are dropped
+    fetch_tickers = candidate_tickers + ([etf_ticker] if etf_ticker else [])
+    with time_stage("peer_fetch"):
+        fetched = await _aget_stock_infos(fetch_tickers, market_data)
+    
+    return score_candidates(ticker, target_info, candidate_tickers, fetched, etf_ticker)
+
+def plan_candidates(ticker: str, target_info: StockRecord, include_etfs: bool) -> tuple:
+    """Step 2: pick the peer tickers and sector ETF to fetch for a target."""
+    print(f"🔎 Finding peer companies in {target_info.sector}...")
+    with time_stage("peer_discovery"):
+        peer_tickers = find_sector_peers(ticker, limit=8, stock_info=target_info)
+    candidate_tickers = [t for t in peer_tickers if t != ticker]
+    etf_ticker = get_sector_etf(target_info.sector) if include_etfs else None
+    return candidate_tickers, etf_ticker
+
+def score_candidates(
+    ticker: str,
+    target_info: StockRecord,
+    candidate_tickers: List[str],
+    fetched: Dict[str, StockRecord],
+    etf_ticker: Optional[str]
+) -> Dict[str, Any]:
+    """
+    Step 3: score the target and every fetched peer (no I/O).
+    Fetched records are shared with the stock info cache (and, in a batch,
+    with other requests), so each is copied once here; peer_data and the
+    allocation work on those copies.
+    
+    Stock info served stale or unavailable by the market data gateway is
+    listed in "data_status". Unavailable peers are dropped, and an
+    unavailable target is kept for display but not allocated to, so stub
+    metrics never turn into neutral scores. An ETF without data is dropped
+    as well; if no scored candidate is left, SourceUnavailable is raised.
+    """
+    print(f"💯 Calculating quality scores...")
+    data_status = {
+        t: record.data_status
+        for t, record in [(ticker, target_info)] + [(t, fetched[t]) for t in candidate_tickers + [etf_ticker] if t in fetched]
+        if record.data_status
+    }
+    target_unavailable = data_status.get(ticker) == "unavailable"
+    tickers = [ticker] + [t for t in candidate_tickers if t in fetched and data_status.get(t) != "unavailable"]
+    records = [copy.copy(target_info)] + [copy.copy(fetched[t]) for t in tickers[1:]]
+    with time_stage("scoring"):
+        scores = calculate_fundamental_scores(StockUniverse.from_records(records).metrics())
+    queue_scores(records, scores, source="agent")
+    
+    peer_data = {}
+    scored_peers = []
+    
+    for peer_ticker, record, score in zip(tickers, records, scores):
+        # Market cap should already be formatted in get_stock_info, but double-check
+        if record.market_cap_formatted is None:
+            record.market_cap_formatted = format_market_cap(record.market_cap or 0)
+        peer_data[peer_ticker] = record
+        if peer_ticker == ticker and target_unavailable:
+            continue
+        record.score = float(score)
+        scored_peers.append((peer_ticker, record.score))
+    
+    if not scored_peers:
+        raise SourceUnavailable(f"No market data available for {ticker} or its sector peers")
+    
+    # Sort by score (highest first)
+    scored_peers.sort(key=lambda x: x[1], reverse=True)
+    
+    # Add ETF data if included. Allocation only reads scored_peers, so a peer
+    # that doubles as the sector ETF is still scored before being relabelled.
+    if etf_ticker and etf_ticker in fetched and data_status.get(etf_ticker) != "unavailable":
+        etf_record = copy.copy(fetched[etf_ticker])
+        etf_record.score = None  # ETFs don't have quality scores
+        etf_record.market_cap_formatted = "ETF"
+        peer_data[etf_ticker] = etf_record
+    elif etf_ticker:
+        print(f"⚠️  No market data for {etf_ticker}, leaving the ETF out")
+        etf_ticker = None
     
+    return {
+        "ticker": ticker,
+        "target_info": records[0],
+        "peer_data": peer_data,
+        "scored_peers": scored_peers,
+        "etf_ticker": etf_ticker,
+        "data_status": data_status
+    }
+
+def build_allocation(
+    candidates: Dict[str, Any],
+    risk_level: str,
+    investment_amount: float,
+    strategy: str = "heuristic"
+) -> tuple:
+    """
+    Step 4: apply the risk-level allocation algorithm to scored candidates.
+    Optimizer strategies re-weight the preset's holdings from price history,
+    falling back to the preset weights when the history is missing or the
+    optimization fails. Returns (formatted allocation, fallback reason or None).
+    """
+    print(f"💰 Applying {risk_level} risk allocation...")
+    
+    ticker = candidates["ticker"]
+    scored_peers = candidates["scored_peers"]
+    etf_ticker = candidates["etf_ticker"]
+    include_etfs = etf_ticker is not None
+    
+    strategy_fallback = None
+    with time_stage("allocation"):
+        if risk_level == "low":
+            allocations = allocate_low_risk(scored_peers, include_etfs, etf_ticker)
+        elif risk_level == "medium":
+            allocations = allocate_medium_risk(scored_peers, include_etfs, etf_ticker)
+        else:  # high
+            allocations = allocate_high_risk(scored_peers, ticker, include_etfs, etf_ticker)
+        
+        if strategy != "heuristic":
+            try:
+                allocations = optimize_allocation(strategy, risk_level, allocations, etf_ticker)
+            except (InsufficientHistory, np.linalg.LinAlgError, ValueError) as e:
+                # Singular covariance or solver failure: keep the preset weights
+                increment("optimizer_fallbacks_total", strategy=strategy)
+                print(f"⚠️  {strategy} unavailable, using {risk_level} preset weights: {e}")
+                strategy_fallback = str(e) or type(e).__name__
+        
+        # Format allocation
+        return format_allocation(allocations, investment_amount, candidates["peer_data"]), strategy_fallback
+
+def apply_holding_rationale(allocation: List[Dict], per_holding_rationale: Dict[str, str]) -> None:
+    """Attach LLM per-holding rationale to formatted allocation items."""
+    for item in allocation:
+        item["rationale"] = per_holding_rationale.get(item["ticker"], "Diversification component")
+
+def apply_template_rationale(ticker: str, allocation: List[Dict], risk_level: str) -> str:
+    """Fallback when the LLM is unavailable: template rationale for the portfolio and each holding."""
+    for item in allocation:
+        item["rationale"] = f"{item['company_name']} - {item['sector']} exposure"
+    return generate_template_rationale(ticker, allocation, risk_level)
+
+def summarize_allocation(formatted_allocation: List[Dict], risk_level: str) -> Dict[str, Any]:
+    """Step 6: portfolio summary statistics and insights."""
+    with time_stage("summary"):
+        avg_score = sum(
+            item["earnings_quality_score"] 
+            for item in formatted_allocation 
+            if item["earnings_quality_score"] is not None
+        ) / max(1, sum(1 for item in formatted_allocation if item["earnings_quality_score"] is not None))
+        
+        sector_concentration = {}
+        for item in formatted_allocation:
+            sector = item["sector"]
+            percent = item["allocation_percent"]
+            sector_concentration[sector] = sector_concentration.get(sector, 0) + percent
+        
+        return {
+            "total_holdings": len(formatted_allocation),
+            "average_earnings_quality": round(avg_score, 1),
+            "risk_profile": risk_level,
+            "expected_volatility": get_volatility_label(risk_level),
+            "sector_concentration": sector_concentration,
+            "key_insights": generate_insights(formatted_allocation, avg_score, risk_level)
+        }
+
+def build_response(
+    ticker: str,
+    target_info: StockRecord,
+    investment_amount: float,
+    risk_level: str,
+    formatted_allocation: List[Dict],
+    summary: Dict,
+    rationale: str,
+    data_quality: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Assemble the portfolio response payload."""
     return {
         "request": {
             "ticker": ticker,
-            "ticker_name": target_info["company_name"],
+            "ticker_name": target_info.company_name or ticker,
             "investment_amount": investment_amount,
             "risk_level": risk_level,
             "analysis_date": "2025-10-19"
@@ -172,29 +525,357 @@ def generate_portfolio_allocation(
             "Yahoo Finance (market data)",
             "Fundamental analysis (quality scores)",
             "OpenAI GPT-4 (rationale generation)"
-        ]
+        ],
+        "data_quality": data_quality or summarize_data_quality({})
+    }
+
+def summarize_data_quality(
+    candidates: Dict[str, Any],
+    strategy: str = "heuristic",
+    strategy_fallback: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Flag market data the gateway could not fetch fresh: tickers served from
+    expired cache or snapshot entries ("stale") and tickers with no data
+    at all ("unavailable", left out of the allocation). Also reports the
+    weighting strategy actually used, with the reason when an optimizer
+    strategy fell back to the preset weights.
+    """
+    data_status = candidates.get("data_status", {})
+    stale = sorted(t for t, status in data_status.items() if status == "stale")
+    unavailable = sorted(t for t, status in data_status.items() if status == "unavailable")
+    return {
+        "degraded": bool(stale or unavailable or strategy_fallback),
+        "stale": stale,
+        "unavailable": unavailable,
+        "strategy": "heuristic" if strategy_fallback else strategy,
+        "strategy_fallback": strategy_fallback
+    }
+
+def generate_risk_comparison(
+    ticker: str,
+    investment_amount: float,
+    risk_levels: List[str],
+    include_etfs: bool = True
+) -> Dict[str, Any]:
+    """Synchronous agenerate_risk_comparison."""
+    return _run_sync(agenerate_risk_comparison(ticker, investment_amount, risk_levels, include_etfs))
+
+async def agenerate_risk_comparison(
+    ticker: str,
+    investment_amount: float,
+    risk_levels: List[str],
+    include_etfs: bool = True
+) -> Dict[str, Any]:
+    """
+    Generate portfolios for several risk levels from one shared pass.
+    
+    Peers are fetched and scored once, every risk level is allocated over the
+    same scored list, and all rationales come from a single LLM round trip.
+    """
+    
+    print(f"⚖️  Comparing {', '.join(risk_levels)} risk portfolios for {ticker}...")
+    
+    candidates = await agather_candidates(ticker, include_etfs)
+    target_info = candidates["target_info"]
+    
+    allocations = {
+        level: build_allocation(candidates, level, investment_amount)[0]
+        for level in risk_levels
+    }
+    
+    print(f"🤖 Generating comparison rationale...")
+    try:
+        rationales = await agenerate_comparison_rationale_llm(ticker, target_info, allocations, investment_amount)
+    except Exception as e:
+        print(f"⚠️  LLM generation failed: {e}")
+        rationales = {}
+    
+    return build_comparison(
+        ticker, target_info, investment_amount, allocations, rationales, summarize_data_quality(candidates)
+    )
+
+def build_comparison(
+    ticker: str,
+    target_info: StockRecord,
+    investment_amount: float,
+    allocations: Dict[str, List[Dict]],
+    rationales: Dict[str, tuple],
+    data_quality: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Assemble one portfolio response per risk level, with template fallback for missing rationales."""
+    portfolios = {}
+    for level, formatted_allocation in allocations.items():
+        if level in rationales:
+            rationale, per_holding_rationale = rationales[level]
+            apply_holding_rationale(formatted_allocation, per_holding_rationale)
+        else:
+            rationale = apply_template_rationale(ticker, formatted_allocation, level)
+        
+        summary = summarize_allocation(formatted_allocation, level)
+        portfolios[level] = build_response(
+            ticker, target_info, investment_amount, level, formatted_allocation, summary, rationale, data_quality
+        )
+    
+    print(f"✅ Comparison generated successfully!")
+    
+    return {
+        "ticker": ticker,
+        "investment_amount": investment_amount,
+        "portfolios": portfolios
+    }
+
+def generate_portfolio_batch(requests: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Synchronous agenerate_portfolio_batch."""
+    return _run_sync(agenerate_portfolio_batch(requests))
+
+async def agenerate_portfolio_batch(requests: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Generate portfolios for many requests against one shared fetch pass.
+    
+    Each request holds the keyword arguments of agenerate_portfolio_allocation.
+    The union of targets, peers and sector ETFs is deduplicated and fetched
+    once, then every allocation runs concurrently against that shared data.
+    """
+    
+    print(f"📦 Generating batch of {len(requests)} portfolios...")
+    
+    # Targets first: their sectors decide which peers and ETFs are needed
+    market_data = await aget_many_stock_info([item["ticker"] for item in requests])
+    market_data.update(await aget_many_stock_info(_batch_dependencies(requests, market_data)))
+    print(f"📊 Fetched {len(market_data)} unique tickers for {len(requests)} requests")
+    
+    portfolios = await asyncio.gather(
+        *(agenerate_portfolio_allocation(**item, market_data=market_data) for item in requests),
+        return_exceptions=True
+    )
+    
+    results = []
+    for item, portfolio in zip(requests, portfolios):
+        if isinstance(portfolio, Exception):
+            results.append(_batch_result(item, error=portfolio))
+        else:
+            results.append(_batch_result(item, portfolio=portfolio))
+    
+    return {
+        "results": results,
+        "unique_tickers_fetched": len(market_data)
+    }
+
+def _batch_dependencies(requests: List[Dict[str, Any]], market_data: Dict[str, StockRecord]) -> List[str]:
+    """Peers and sector ETFs needed by a batch that are not yet in `market_data`."""
+    needed = []
+    for item in requests:
+        target_info = market_data.get(item["ticker"])
+        if target_info is None:
+            continue
+        needed.extend(find_sector_peers(item["ticker"], limit=8, stock_info=target_info))
+        if item.get("include_etfs", True):
+            needed.append(get_sector_etf(target_info.sector))
+    return [t for t in dict.fromkeys(needed) if t not in market_data]
+
+def _batch_result(item: Dict[str, Any], portfolio: Optional[Dict] = None, error: Optional[Exception] = None) -> Dict[str, Any]:
+    """Wrap one batch item's portfolio or failure."""
+    result = {
+        "ticker": item["ticker"],
+        "risk_level": item["risk_level"],
+        "status": "ok" if error is None else "error"
+    }
+    if error is None:
+        result["portfolio"] = portfolio
+    else:
+        print(f"⚠️  Batch item {item['ticker']} ({item['risk_level']}) failed: {error}")
+        result["error"] = str(error)
+    return result
+
+def _prefetched_info(ticker: str, market_data: Optional[Dict[str, StockRecord]]) -> Optional[StockRecord]:
+    """Prefetched stock info for `ticker`, if supplied (read-only: scoring copies it)."""
+    if market_data and ticker in market_data:
+        return market_data[ticker]
+    return None
+
+async def _aget_stock_infos(tickers: List[str], market_data: Optional[Dict[str, StockRecord]] = None) -> Dict[str, StockRecord]:
+    """Look up stock info, preferring prefetched `market_data` and fetching the rest concurrently."""
+    market_data = market_data or {}
+    missing = [t for t in tickers if t not in market_data]
+    fetched = await aget_many_stock_info(missing) if missing else {}
+    return _merge_stock_infos(tickers, market_data, fetched)
+
+def _merge_stock_infos(
+    tickers: List[str],
+    market_data: Dict[str, StockRecord],
+    fetched: Dict[str, StockRecord]
+) -> Dict[str, StockRecord]:
+    return {
+        t: market_data[t] if t in market_data else fetched[t]
+        for t in tickers
+        if t in market_data or t in fetched
+    }
+
+def _run_sync(coroutine):
+    """Run an async pipeline step from synchronous code (not from inside a running loop)."""
+    loop = getattr(_sync_loops, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _sync_loops.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(coroutine)
+
+def get_llm(loop: Optional[asyncio.AbstractEventLoop] = None) -> "ChatOpenAI":
+    """
+    ChatOpenAI client for `loop` (default: the running loop), created on first use.
+    langchain_openai is imported here rather than at module load: it is the
+    slowest import in the process and only needed once an LLM call is made
+    (tools/warmup.py preloads the server loop's client when OPENAI_API_KEY is set).
+    """
+    if _llm is not None:
+        return _llm
+    loop = loop or asyncio.get_running_loop()
+    with _llm_lock:
+        client = _llms.get(loop)
+        if client is None:
+            from langchain_openai import ChatOpenAI
+            client = _llms[loop] = ChatOpenAI(model=LLM_MODEL, temperature=0.7)
+    return client
+
+def prompt_messages(prompt: str) -> List:
+    """Wrap a prompt as a single-message chat input."""
+    from langchain_core.messages import HumanMessage
+    return [HumanMessage(content=prompt)]
+
+def rationale_fingerprint(ticker: str, investment_amount: float, allocations: Dict[str, List[Dict]]) -> str:
+    """
+    Canonical cache key for rationales: ticker, amount and, per risk level,
+    each holding's rounded allocation percent and quality score.
+    """
+    canonical = {
+        "ticker": ticker,
+        "amount": round(investment_amount, 2),
+        "allocations": {
+            level: [
+                [item["ticker"], item["allocation_percent"], item["earnings_quality_score"]]
+                for item in allocation
+            ]
+            for level, allocation in allocations.items()
+        }
     }
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
 
-def generate_rationale_llm(
+def response_cache_key(
     ticker: str,
-    target_info: Dict,
+    investment_amount: float,
+    risk_level: str,
+    include_etfs: bool,
+    max_holdings: int,
+    strategy: str = "heuristic"
+) -> str:
+    """
+    Response cache key: the normalized request plus the snapshot and model
+    versions, and for the optimizer strategies the price store version.
+    Per-ticker data versions are checked on read instead.
+    """
+    snapshot = get_snapshot()
+    payload = json.dumps({
+        "ticker": ticker.upper(),
+        "investment_amount": round(float(investment_amount), 2),
+        "risk_level": risk_level,
+        "include_etfs": bool(include_etfs),
+        "max_holdings": int(max_holdings),
+        "strategy": strategy,
+        "snapshot": snapshot.built_at if snapshot is not None else None,
+        "prices": price_store_version() if strategy != "heuristic" else None,
+        "model": LLM_MODEL
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def get_cached_response(cache_key: str) -> Optional[Dict[str, Any]]:
+    """A cached response whose constituents' fundamentals are all unchanged."""
+    entry = _response_cache.get(cache_key, validate=_versions_current)
+    return copy.deepcopy(entry["response"]) if entry is not None else None
+
+def cache_response(cache_key: str, candidates: Dict[str, Any], response: Dict[str, Any]) -> None:
+    """
+    Cache a response with the fundamentals version of every candidate it
+    was built from. Responses that used a stub record (failed fetch),
+    degraded (stale) market data or fell back from the requested optimizer
+    strategy are not cached.
+    """
+    peer_data = candidates["peer_data"]
+    if candidates.get("data_status") or not all(record.has_fundamentals for record in peer_data.values()):
+        return
+    if response["data_quality"].get("strategy_fallback"):
+        return
+    _response_cache.set(cache_key, {
+        "response": response,
+        "versions": {t: fundamentals_version(record) for t, record in peer_data.items()},
+        "cached_at": time.time()
+    })
+
+def get_response_cache_stats() -> Dict[str, Any]:
+    """Hit/miss/invalidation counters for the response cache."""
+    return _response_cache.stats()
+
+def _versions_current(entry: Dict[str, Any]) -> Optional[bool]:
+    """
+    False if any constituent's fundamentals changed, None if some version
+    is unknown here (nothing cached or snapshotted yet), otherwise True.
+    """
+    unknown = False
+    for ticker, version in entry["versions"].items():
+        current = get_fundamentals_version(ticker)
+        if current is None:
+            unknown = True
+        elif current != version:
+            return False
+    return None if unknown else True
+
+def get_rationale_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the rationale cache."""
+    return _rationale_cache.stats()
+
+def _cache_rationale(cache_key: str, rationale: tuple) -> tuple:
+    """Cache a parsed rationale unless it is the unparsed-JSON fallback."""
+    overall, holdings = rationale
+    if holdings:
+        _rationale_cache.set(cache_key, _copy_rationale(rationale))
+    return rationale
+
+def _copy_rationale(rationale: tuple) -> tuple:
+    overall, holdings = rationale
+    return overall, dict(holdings)
+
+async def agenerate_rationale_llm(
+    ticker: str,
+    target_info: StockRecord,
     allocation: List[Dict],
     risk_level: str,
     investment_amount: float
 ) -> tuple:
     """Generate portfolio rationale using GPT-4."""
     
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.7)
+    cache_key = rationale_fingerprint(ticker, investment_amount, {risk_level: allocation})
+    cached = _rationale_cache.get(cache_key)
+    if cached is not None:
+        return _copy_rationale(cached)
     
-    allocation_summary = "\n".join([
-        f"- {item['ticker']} ({item['company_name']}): {item['allocation_percent']}%, "
-        f"Sector: {item['sector']}, Quality Score: {item['earnings_quality_score']}"
-        for item in allocation
-    ])
+    prompt = build_rationale_prompt(ticker, target_info, allocation, risk_level, investment_amount)
+    with time_stage("llm"):
+        response = await get_llm().ainvoke(prompt_messages(prompt))
+    return _cache_rationale(cache_key, parse_rationale(response.content))
+
+def build_rationale_prompt(
+    ticker: str,
+    target_info: StockRecord,
+    allocation: List[Dict],
+    risk_level: str,
+    investment_amount: float
+) -> str:
+    """Build the single-portfolio rationale prompt."""
     
-    prompt = f"""You are a financial analyst explaining a portfolio allocation.
+    allocation_summary = format_allocation_summary(allocation)
+    
+    return f"""You are a financial analyst explaining a portfolio allocation.
 
-TARGET: {ticker} ({target_info['company_name']})
+TARGET: {ticker} ({target_info.company_name or ticker})
 AMOUNT: ${investment_amount:,}
 RISK LEVEL: {risk_level}
 
@@ -217,17 +898,93 @@ Format as JSON:
   }}
 }}
 """
-    
-    response = llm.invoke([HumanMessage(content=prompt)])
-    
-    # Parse JSON response
-    import json
+
+def parse_rationale(content: str) -> tuple:
+    """Parse the LLM's JSON rationale into (overall, holdings)."""
     try:
-        parsed = json.loads(response.content)
+        parsed = json.loads(content)
         return parsed["overall"], parsed["holdings"]
     except:
         # Fallback if JSON parsing fails
-        return response.content, {}
+        return content, {}
+
+async def agenerate_comparison_rationale_llm(
+    ticker: str,
+    target_info: StockRecord,
+    allocations: Dict[str, List[Dict]],
+    investment_amount: float
+) -> Dict[str, tuple]:
+    """
+    Generate rationales for several risk-level allocations in one LLM call.
+    Returns {risk_level: (overall, holdings)} for every level the model answered.
+    """
+    
+    cache_key = rationale_fingerprint(ticker, investment_amount, allocations)
+    cached = _rationale_cache.get(cache_key)
+    if cached is not None:
+        return {level: _copy_rationale(rationale) for level, rationale in cached.items()}
+    
+    prompt = build_comparison_prompt(ticker, target_info, allocations, investment_amount)
+    with time_stage("llm"):
+        response = await get_llm().ainvoke(prompt_messages(prompt))
+    rationales = parse_comparison_rationale(response.content, list(allocations))
+    if len(rationales) == len(allocations):
+        _rationale_cache.set(cache_key, {level: _copy_rationale(r) for level, r in rationales.items()})
+    return rationales
+
+def build_comparison_prompt(
+    ticker: str,
+    target_info: StockRecord,
+    allocations: Dict[str, List[Dict]],
+    investment_amount: float
+) -> str:
+    """Build the multi-risk-level comparison prompt."""
+    
+    allocation_sections = "\n\n".join(
+        f"{level.upper()} RISK ALLOCATION:\n{format_allocation_summary(allocation)}"
+        for level, allocation in allocations.items()
+    )
+    levels_json = ",\n".join(
+        f'  "{level}": {{"overall": "...", "holdings": {{"TICKER1": "...", "TICKER2": "..."}}}}'
+        for level in allocations
+    )
+    
+    return f"""You are a financial analyst comparing portfolio allocations for different risk levels.
+
+TARGET: {ticker} ({target_info.company_name or ticker})
+AMOUNT: ${investment_amount:,}
+
+{allocation_sections}
+
+For EACH risk level, write a 3-4 sentence rationale explaining:
+1. Why these specific companies were selected
+2. How this allocation balances risk and return for that risk level
+3. Key strengths of the portfolio (reference quality scores)
+
+Then provide a 1-sentence rationale for EACH holding explaining its specific role.
+
+Format as JSON:
+{{
+{levels_json}
+}}
+"""
+
+def parse_comparison_rationale(content: str, risk_levels: List[str]) -> Dict[str, tuple]:
+    """Parse the comparison JSON into {risk_level: (overall, holdings)}."""
+    parsed = json.loads(content)
+    return {
+        level: (parsed[level]["overall"], parsed[level].get("holdings", {}))
+        for level in risk_levels
+        if level in parsed
+    }
+
+def format_allocation_summary(allocation: List[Dict]) -> str:
+    """Render allocation items as prompt lines for the LLM."""
+    return "\n".join([
+        f"- {item['ticker']} ({item['company_name']}): {item['allocation_percent']}%, "
+        f"Sector: {item['sector']}, Quality Score: {item['earnings_quality_score']}"
+        for item in allocation
+    ])
 
 def generate_template_rationale(ticker: str, allocation: List[Dict], risk_level: str) -> str:
     """Generate a template-based rationale as fallback."""
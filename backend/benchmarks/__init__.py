@@ -0,0 +1 @@
+"""Benchmark harness for the portfolio request path (offline, fixture-driven)."""
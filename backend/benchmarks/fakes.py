@@ -0,0 +1,189 @@
+"""
+Benchmark Fakes - Yahoo Finance and OpenAI stand-ins
+Replay fixtures with configurable injected latency and failure rates.
+
+Yahoo payloads come from fixtures/yahoo_info.json when it has been
+recorded, otherwise from fixtures/yahoo_info_synthetic.json: generated
+sample payloads with the .info keys and value ranges Yahoo returns, but
+made-up companies and metrics. Record real payloads (run inside backend/):
+    python -m benchmarks.fakes --record
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from typing import Dict, List, Optional
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+YAHOO_FIXTURE = os.path.join(FIXTURES_DIR, "yahoo_info.json")  # written by --record
+SYNTHETIC_YAHOO_FIXTURE = os.path.join(FIXTURES_DIR, "yahoo_info_synthetic.json")
+LLM_FIXTURE = os.path.join(FIXTURES_DIR, "llm_rationale.json")
+
+# Only the .info keys the market data layer reads are recorded
+RECORDED_INFO_KEYS = [
+    "longName", "shortName", "quoteType", "sector", "industry", "marketCap",
+    "currentPrice", "regularMarketPrice", "trailingPE", "profitMargins",
+    "debtToEquity", "revenueGrowth", "earningsGrowth", "totalAssets"
+]
+
+
+class InjectedFailure(Exception):
+    """Raised by the fakes to simulate an upstream error."""
+
+
+class LatencyModel:
+    """Latency (seconds) drawn uniformly from mean ± jitter, plus a failure rate."""
+
+    def __init__(self, mean_ms: float = 0.0, jitter_ms: float = 0.0, failure_rate: float = 0.0, seed: int = 7):
+        self.mean = mean_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+
+    def delay(self) -> float:
+        return max(0.0, self.mean + self._rng.uniform(-self.jitter, self.jitter))
+
+    def should_fail(self) -> bool:
+        return self.failure_rate > 0 and self._rng.random() < self.failure_rate
+
+
+class FakeYFinance:
+    """Stand-in for the `yfinance` module: `FakeYFinance(...).Ticker(symbol).info`."""
+
+    def __init__(self, latency: Optional[LatencyModel] = None, fixture_path: Optional[str] = None):
+        with open(fixture_path or default_yahoo_fixture()) as f:
+            fixture = json.load(f)
+        self.infos: Dict[str, Dict] = fixture["tickers"]
+        self.source: str = fixture.get("_source", "")
+        self.latency = latency or LatencyModel()
+        self.calls = 0
+
+    def Ticker(self, ticker: str) -> "FakeTicker":
+        return FakeTicker(self, ticker)
+
+
+class FakeTicker:
+    def __init__(self, source: FakeYFinance, ticker: str):
+        self._source = source
+        self.ticker = ticker
+
+    @property
+    def info(self) -> Dict:
+        self._source.calls += 1
+        time.sleep(self._source.latency.delay())
+        if self._source.latency.should_fail():
+            raise InjectedFailure(f"Injected Yahoo failure for {self.ticker}")
+        # Unknown symbols behave like Yahoo's sparse payload for bad tickers
+        return dict(self._source.infos.get(self.ticker, {"shortName": self.ticker}))
+
+
+class FakeChatOpenAI:
+    """
+    Stand-in for ChatOpenAI supporting invoke, ainvoke and astream.
+    Replays the fixture rationale, with one holding line per ticker in the prompt.
+    """
+
+    def __init__(self, latency: Optional[LatencyModel] = None, fixture_path: str = LLM_FIXTURE, chunk_size: int = 24):
+        with open(fixture_path) as f:
+            self.fixture = json.load(f)
+        self.latency = latency or LatencyModel()
+        self.chunk_size = chunk_size
+        self.calls = 0
+
+    def invoke(self, messages) -> "FakeMessage":
+        content = self._respond(messages)
+        time.sleep(self.latency.delay())
+        return FakeMessage(content)
+
+    async def ainvoke(self, messages) -> "FakeMessage":
+        content = self._respond(messages)
+        await asyncio.sleep(self.latency.delay())
+        return FakeMessage(content)
+
+    async def astream(self, messages):
+        content = self._respond(messages)
+        chunks = [content[i:i + self.chunk_size] for i in range(0, len(content), self.chunk_size)]
+        per_chunk = self.latency.delay() / max(1, len(chunks))
+        for chunk in chunks:
+            await asyncio.sleep(per_chunk)
+            yield FakeMessage(chunk)
+
+    def _respond(self, messages) -> str:
+        self.calls += 1
+        if self.latency.should_fail():
+            raise InjectedFailure("Injected OpenAI failure")
+        prompt = messages[-1].content
+
+        # Comparison prompts ask for one object per risk level
+        levels = re.findall(r"^(LOW|MEDIUM|HIGH) RISK ALLOCATION:", prompt, flags=re.MULTILINE)
+        if levels:
+            sections = re.split(r"^(?:LOW|MEDIUM|HIGH) RISK ALLOCATION:", prompt, flags=re.MULTILINE)[1:]
+            return json.dumps({
+                level.lower(): self._rationale(section)
+                for level, section in zip(levels, sections)
+            })
+        return json.dumps(self._rationale(prompt))
+
+    def _rationale(self, text: str) -> Dict:
+        holdings = {}
+        for ticker, sector, score in re.findall(
+            r"^- (\S+) \(.*?\): \d+%, Sector: (.*?), Quality Score: (\S+)$", text, flags=re.MULTILINE
+        ):
+            holdings[ticker] = self.fixture["holding"].format(ticker=ticker, sector=sector, score=score)
+        return {"overall": self.fixture["overall"], "holdings": holdings}
+
+
+class FakeMessage:
+    def __init__(self, content: str):
+        self.content = content
+
+
+def default_yahoo_fixture() -> str:
+    """The recorded Yahoo fixture if there is one, else the synthetic sample."""
+    return YAHOO_FIXTURE if os.path.exists(YAHOO_FIXTURE) else SYNTHETIC_YAHOO_FIXTURE
+
+
+def install_fakes(yahoo: FakeYFinance, llm: FakeChatOpenAI) -> None:
+    """Route the market data layer and the agent's pooled LLM client to the fakes."""
+    import tools.market_data as market_data
+    import tools.providers.yahoo as yahoo_provider
+    import agents.portfolio_agent as portfolio_agent
+
+    yahoo_provider.yf = yahoo
+    market_data.provider = yahoo_provider.YFinanceProvider()
+    portfolio_agent._llm = llm
+
+
+def record_yahoo_fixtures(path: str = YAHOO_FIXTURE, tickers: Optional[List[str]] = None) -> None:
+    """Record live Yahoo Finance `.info` payloads for the universe into `path`."""
+    import yfinance as yf
+    from tools.market_data import get_universe_tickers
+
+    tickers = tickers or get_universe_tickers()
+    recorded = {}
+    for ticker in tickers:
+        try:
+            info = yf.Ticker(ticker).info
+            recorded[ticker] = {k: info[k] for k in RECORDED_INFO_KEYS if info.get(k) is not None}
+            print(f"📼 Recorded {ticker}")
+        except Exception as e:
+            print(f"Error recording {ticker}: {e}")
+
+    with open(path, "w") as f:
+        json.dump({"_source": f"recorded from Yahoo Finance at {time.strftime('%Y-%m-%d')}", "tickers": recorded}, f, indent=1, sort_keys=True)
+    print(f"✅ Recorded {len(recorded)} tickers to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage benchmark fixtures.")
+    parser.add_argument("--record", action="store_true", help="Record Yahoo fixtures from the live API")
+    parser.add_argument("--out", default=YAHOO_FIXTURE)
+    args = parser.parse_args()
+    if args.record:
+        record_yahoo_fixtures(args.out)
+    else:
+        parser.print_help()
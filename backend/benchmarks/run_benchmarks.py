@@ -0,0 +1,306 @@
+"""
+Benchmark Runner - Reproducible request-path performance numbers
+Drives generate_portfolio_allocation and the FastAPI app against the
+Yahoo/OpenAI fakes (see benchmarks/fakes.py; the report says whether the
+Yahoo payloads are recorded or synthetic).
+
+Run inside backend/:
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --yahoo-latency-ms 150 --llm-latency-ms 2000 --failure-rate 0.05
+    python -m benchmarks.run_benchmarks --scenarios concurrent --concurrency 32 --json results.json
+
+Scenarios:
+    single      sequential generate_portfolio_allocation calls
+    concurrent  concurrent POST /api/v1/portfolio/generate through the ASGI app
+    batch       POST /api/v1/portfolio/batch with --batch-size items per call
+
+Caches are reset before each scenario, so numbers include the cold start.
+Allocation samples (--alloc-samples) clear the response, rationale and
+stock info caches before every request, so they measure the full miss path.
+Pass --import-report to also profile cold imports with `python -X importtime`.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeChatOpenAI, FakeYFinance, LatencyModel, install_fakes
+
+DEFAULT_TICKERS = ["AAPL", "JPM", "XOM", "JNJ", "HOOD", "AMZN", "NEE", "PG", "NVDA", "CAT"]
+RISK_LEVELS = ["low", "medium", "high"]
+
+
+def reset_state() -> None:
+    """Clear caches, the snapshot and metrics so every scenario starts cold."""
+    import tools.market_data as market_data
+    import agents.portfolio_agent as portfolio_agent
+    from config.metrics import reset_metrics
+    from tools.response_cache import ResponseCache
+
+    market_data._stock_info_cache.clear()
+    market_data._snapshot = None
+    market_data._snapshot_checked_at = float("inf")  # never load a snapshot mid-run
+    market_data.source_gateway.reset()
+    portfolio_agent._rationale_cache.clear()
+    # Memory-only response cache so earlier runs on disk cannot leak in
+    portfolio_agent._response_cache = ResponseCache("portfolio_response", portfolio_agent._response_cache.ttl)
+    reset_metrics()
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return float("nan")
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(name: str, latencies: List[float], elapsed: float, units: int, extra: Dict = None) -> Dict:
+    """Throughput and latency percentiles (ms) for one scenario."""
+    from config.metrics import get_stage_summary
+
+    result = {
+        "scenario": name,
+        "requests": len(latencies),
+        "portfolios": units,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(units / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(1000 * percentile(latencies, 0.50), 1),
+        "p95_ms": round(1000 * percentile(latencies, 0.95), 1),
+        "p99_ms": round(1000 * percentile(latencies, 0.99), 1),
+        "stages": get_stage_summary(),
+    }
+    result.update(extra or {})
+    return result
+
+
+def clear_request_caches() -> None:
+    """Drop cached responses, rationales and stock info, so the next request misses every cache."""
+    import tools.market_data as market_data
+    import agents.portfolio_agent as portfolio_agent
+
+    market_data._stock_info_cache.clear()
+    portfolio_agent._rationale_cache.clear()
+    portfolio_agent._response_cache.clear()
+
+
+def measure_allocations(run_one: Callable[[int], None], samples: int) -> Dict:
+    """
+    Peak traced memory and net allocated blocks per uncached request, via
+    tracemalloc. Caches are cleared before each sample (outside the traced
+    window), so a scenario that warmed them is not measured as cache hits.
+    """
+    peaks = []
+    blocks = []
+    tracemalloc.start()
+    try:
+        for i in range(samples):
+            clear_request_caches()
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+            run_one(i)
+            after = tracemalloc.take_snapshot()
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            blocks.append(sum(stat.count_diff for stat in after.compare_to(before, "filename")))
+    finally:
+        tracemalloc.stop()
+    return {
+        "alloc_peak_kib_per_request": round(sum(peaks) / len(peaks) / 1024, 1),
+        "alloc_net_blocks_per_request": round(sum(blocks) / len(blocks), 1),
+    }
+
+
+def run_single(args, tickers: List[str]) -> Dict:
+    from agents.portfolio_agent import generate_portfolio_allocation
+
+    def run_one(i):
+        generate_portfolio_allocation(
+            tickers[i % len(tickers)], args.amount, RISK_LEVELS[i % len(RISK_LEVELS)]
+        )
+
+    reset_state()
+    latencies = []
+    start = time.perf_counter()
+    for i in range(args.requests):
+        t0 = time.perf_counter()
+        run_one(i)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+
+    result = summarize("single", latencies, elapsed, args.requests)
+    if args.alloc_samples:
+        result.update(measure_allocations(run_one, args.alloc_samples))
+    return result
+
+
+async def _post_all(payloads: List[Dict], path: str, concurrency: int) -> tuple:
+    import httpx
+    from main import app
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        async def post(payload):
+            nonlocal failures
+            async with semaphore:
+                t0 = time.perf_counter()
+                response = await client.post(path, json=payload)
+                latencies.append(time.perf_counter() - t0)
+                if response.status_code != 200:
+                    failures += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(post(payload) for payload in payloads))
+        elapsed = time.perf_counter() - start
+
+    return latencies, elapsed, failures
+
+
+def _request_payload(args, tickers: List[str], i: int) -> Dict:
+    return {
+        "ticker": tickers[i % len(tickers)],
+        "investment_amount": args.amount,
+        "risk_level": RISK_LEVELS[i % len(RISK_LEVELS)],
+        "include_etfs": True,
+        "max_holdings": 5
+    }
+
+
+def run_concurrent(args, tickers: List[str]) -> Dict:
+    reset_state()
+    payloads = [_request_payload(args, tickers, i) for i in range(args.requests)]
+    latencies, elapsed, failures = asyncio.run(
+        _post_all(payloads, "/api/v1/portfolio/generate", args.concurrency)
+    )
+    return summarize("concurrent", latencies, elapsed, args.requests, {
+        "concurrency": args.concurrency,
+        "http_failures": failures,
+    })
+
+
+def run_batch(args, tickers: List[str]) -> Dict:
+    reset_state()
+    batches = max(1, args.requests // args.batch_size)
+    payloads = [
+        {"items": [_request_payload(args, tickers, b * args.batch_size + i) for i in range(args.batch_size)]}
+        for b in range(batches)
+    ]
+    latencies, elapsed, failures = asyncio.run(
+        _post_all(payloads, "/api/v1/portfolio/batch", 1)
+    )
+    return summarize("batch", latencies, elapsed, batches * args.batch_size, {
+        "batch_size": args.batch_size,
+        "http_failures": failures,
+    })
+
+
+SCENARIOS = {
+    "single": run_single,
+    "concurrent": run_concurrent,
+    "batch": run_batch,
+}
+
+
+def print_report(results: List[Dict], yahoo: FakeYFinance, llm: FakeChatOpenAI) -> None:
+    print()
+    print(f"{'scenario':<12}{'portfolios':>11}{'thru/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for r in results:
+        print(
+            f"{r['scenario']:<12}{r['portfolios']:>11}{r['throughput_per_s']:>10}"
+            f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}"
+        )
+        if "alloc_peak_kib_per_request" in r:
+            print(
+                f"{'':<12}allocations: {r['alloc_peak_kib_per_request']} KiB peak, "
+                f"{r['alloc_net_blocks_per_request']} net blocks per request"
+            )
+    print()
+    print(f"Upstream calls: yahoo={yahoo.calls} llm={llm.calls}")
+    print(f"Yahoo fixture: {yahoo.source}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the portfolio request path against Yahoo/OpenAI fakes.")
+    parser.add_argument("--scenarios", default="single,concurrent,batch", help="Comma-separated: " + ",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=30, help="Portfolios per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--amount", type=float, default=10000)
+    parser.add_argument("--tickers", default=",".join(DEFAULT_TICKERS))
+    parser.add_argument("--yahoo-latency-ms", type=float, default=80)
+    parser.add_argument("--yahoo-jitter-ms", type=float, default=40)
+    parser.add_argument("--llm-latency-ms", type=float, default=1500)
+    parser.add_argument("--llm-jitter-ms", type=float, default=500)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Injected failure rate for both fakes")
+    parser.add_argument("--yahoo-rate-limit", type=float, default=1000,
+                        help="Yahoo gateway requests/second (0 keeps YAHOO_RATE_LIMIT_PER_SECOND)")
+    parser.add_argument("--alloc-samples", type=int, default=5, help="Requests traced with tracemalloc (0 disables)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Keep the agent's progress output")
+    parser.add_argument("--import-report", action="store_true", help="Profile cold imports of the app and agent")
+    args = parser.parse_args()
+
+    # Score index and persistent response cache go to a scratch directory, so
+    # fixture data never lands in data/ (set before anything imports them)
+    scratch_dir = tempfile.mkdtemp(prefix="portfolio-bench-")
+    os.environ["SCORE_STORE_PATH"] = os.path.join(scratch_dir, "scores.db")
+    os.environ["RESPONSE_CACHE_PATH"] = os.path.join(scratch_dir, "response_cache.db")
+    try:
+        run(args)
+    finally:
+        from tools.score_store import flush_scores
+        flush_scores()
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def run(args) -> None:
+    import_profiles = []
+    if args.import_report:
+        from config.imports import importtime_profile
+        import_profiles = [importtime_profile(module, top=8) for module in ("main", "agents.portfolio_agent")]
+
+    if args.yahoo_rate_limit:
+        # The fakes never throttle, so by default measure the request path rather than the limiter
+        os.environ["YAHOO_RATE_LIMIT_PER_SECOND"] = str(args.yahoo_rate_limit)
+        os.environ["YAHOO_RATE_LIMIT_BURST"] = str(args.yahoo_rate_limit)
+
+    yahoo = FakeYFinance(LatencyModel(args.yahoo_latency_ms, args.yahoo_jitter_ms, args.failure_rate, args.seed))
+    llm = FakeChatOpenAI(LatencyModel(args.llm_latency_ms, args.llm_jitter_ms, args.failure_rate, args.seed + 1))
+    install_fakes(yahoo, llm)
+
+    tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+    results = []
+    for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+        print(f"⏱️  Running {name} scenario...")
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with quiet:
+            results.append(SCENARIOS[name](args, tickers))
+
+    print_report(results, yahoo, llm)
+    for profile in import_profiles:
+        print(f"Cold import {profile['module']}: {profile['total_ms']} ms")
+        for entry in profile["slowest"][1:]:
+            print(f"    {entry['cumulative_ms']:>9.1f} ms  {entry['module']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results, "imports": import_profiles}, f, indent=2)
+        print(f"📄 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
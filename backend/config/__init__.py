@@ -1,6 +1,14 @@
 """Configuration module for Smart Portfolio Agent."""
 
 from .tracing import init_arize_tracing, get_tracing_status
+from .metrics import render_prometheus, get_stage_summary
+from .imports import preload_modules, get_import_report
 
-__all__ = ["init_arize_tracing", "get_tracing_status"]
-
+__all__ = [
+    "init_arize_tracing",
+    "get_tracing_status",
+    "render_prometheus",
+    "get_stage_summary",
+    "preload_modules",
+    "get_import_report"
+]
@@ -0,0 +1,120 @@
+"""
+Startup Import Phase for Smart Portfolio Agent
+Loads heavy dependencies once, explicitly and timed, during startup.
+
+main.py imports the agent lazily inside request handlers so that importing
+the app stays cheap. Without this phase the first request would pay for
+yfinance, pandas and langchain; with it that cost moves into startup (before
+Uvicorn accepts traffic) and is reported through /health.
+
+Profile a cold import from the command line (run inside backend/):
+    python -m config.imports main agents.portfolio_agent
+"""
+
+import importlib
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+# Imported in this order; each entry's time excludes modules already loaded
+STARTUP_MODULES = [
+    "numpy",
+    "pandas",
+    "yfinance",
+    "tools.market_data",
+    "agents.portfolio_agent",
+]
+
+# Only needed when an LLM is configured; otherwise rationales use templates
+OPTIONAL_MODULES = {
+    "langchain_openai": "OPENAI_API_KEY",
+}
+
+_report: Dict = {"state": "pending"}
+
+
+def preload_modules(modules: Optional[List[str]] = None) -> Dict:
+    """Import startup dependencies, timing each one. Returns the import report."""
+    global _report
+
+    modules = list(modules or STARTUP_MODULES)
+    deferred = []
+    for module, env_var in OPTIONAL_MODULES.items():
+        if os.getenv(env_var):
+            modules.append(module)
+        else:
+            deferred.append(module)
+
+    timings = {}
+    failed = {}
+    start = time.perf_counter()
+    for module in modules:
+        t0 = time.perf_counter()
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            failed[module] = str(e)
+            continue
+        timings[module] = round(time.perf_counter() - t0, 3)
+
+    _report = {
+        "state": "loaded",
+        "phase_seconds": round(time.perf_counter() - start, 3),
+        "modules_seconds": timings,
+        "deferred": deferred,
+        "failed": failed
+    }
+    return _report
+
+
+def get_import_report() -> Dict:
+    """The startup import report for /health."""
+    return dict(_report)
+
+
+def importtime_profile(module: str, top: int = 15) -> Dict:
+    """
+    Cold-import `module` in a fresh interpreter with `-X importtime` and
+    return the total plus the `top` slowest imports by cumulative time.
+    """
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=backend_dir,
+        capture_output=True,
+        text=True
+    )
+
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append({
+            "module": name.strip(),
+            "self_ms": round(int(self_us) / 1000, 1),
+            "cumulative_ms": round(int(cumulative_us) / 1000, 1)
+        })
+
+    total = next((e for e in entries if e["module"] == module), None)
+    return {
+        "module": module,
+        "ok": completed.returncode == 0,
+        "total_ms": total["cumulative_ms"] if total else None,
+        "slowest": sorted(entries, key=lambda e: e["cumulative_ms"], reverse=True)[:top]
+    }
+
+
+def main():
+    modules = sys.argv[1:] or ["main"]
+    for module in modules:
+        profile = importtime_profile(module)
+        print(f"⏱️  import {module}: {profile['total_ms']} ms")
+        for entry in profile["slowest"]:
+            print(f"    {entry['cumulative_ms']:>9.1f} ms  {entry['module']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+In-process Metrics for Smart Portfolio Agent
+Stage latency histograms, counters and a Prometheus text exposition.
+
+Unlike Arize tracing (config/tracing.py), nothing leaves the process:
+GET /metrics renders the current state for a Prometheus scrape.
+
+Usage:
+    with time_stage("scoring"):
+        ...
+    increment("portfolio_errors_total", stage="llm")
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Latency buckets in seconds, from cache hits up to slow LLM calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.95, 0.99)
+QUANTILE_WINDOW = 1024  # most recent observations used for quantiles
+
+STAGE_METRIC = "portfolio_stage_latency_seconds"
+
+_lock = threading.Lock()
+_histograms: Dict[Tuple[str, Tuple], "Histogram"] = {}
+_counters: Dict[Tuple[str, Tuple], float] = {}
+_help: Dict[str, str] = {
+    STAGE_METRIC: "Latency of each portfolio generation stage",
+}
+_collectors: List[Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]] = []
+
+
+class Histogram:
+    """Cumulative bucket histogram plus a sliding window for quantiles."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=QUANTILE_WINDOW)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+
+    def quantile(self, q: float) -> float:
+        if not self.recent:
+            return float("nan")
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(math.ceil(q * len(ordered))) - 1)]
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    """Record one observation in histogram `name`."""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(value)
+
+
+def increment(name: str, amount: float = 1, **labels: str) -> None:
+    """Add `amount` to counter `name`."""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Record the latency of a pipeline stage."""
+    observe(STAGE_METRIC, seconds, stage=stage)
+
+
+@contextmanager
+def time_stage(stage: str):
+    """Time the enclosed block as `stage`; failures also count as stage errors."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        increment("portfolio_errors_total", stage=stage)
+        raise
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def register_collector(collector: Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]) -> None:
+    """
+    Register a callable polled at render time for externally owned values
+    (e.g. cache hit counters). It returns (metric_name, labels, value) tuples.
+    """
+    with _lock:
+        _collectors.append(collector)
+
+
+def cache_samples(cache: str, stats: Dict[str, float]) -> List[Tuple[str, Dict[str, str], float]]:
+    """Convert a cache's stats() dict into collector samples."""
+    samples = []
+    for key, value in stats.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        counter = key.endswith(("hits", "misses", "sets", "evictions", "errors"))
+        name = f"portfolio_cache_{key}_total" if counter else f"portfolio_cache_{key}"
+        samples.append((name, {"cache": cache}, value))
+    return samples
+
+
+def get_stage_summary() -> Dict[str, Dict[str, float]]:
+    """Per-stage count, mean and quantiles in milliseconds (for JSON reports)."""
+    summary = {}
+    with _lock:
+        for (name, labels), histogram in _histograms.items():
+            if name != STAGE_METRIC:
+                continue
+            stage = dict(labels)["stage"]
+            summary[stage] = {
+                "count": histogram.count,
+                "mean_ms": round(1000 * histogram.sum / histogram.count, 2) if histogram.count else 0.0,
+                **{f"p{int(q * 100)}_ms": round(1000 * histogram.quantile(q), 2) for q in QUANTILES}
+            }
+    return summary
+
+
+def render_prometheus() -> str:
+    """Render every metric in the Prometheus text exposition format."""
+    lines = []
+
+    with _lock:
+        histograms = sorted(_histograms.items())
+        counters = sorted(_counters.items())
+        collectors = list(_collectors)
+
+        seen = set()
+        for (name, labels), histogram in histograms:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {_help.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+            for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                lines.append(f"{name}_bucket{_labels(labels, le=_number(bound))} {count}")
+            lines.append(f"{name}_bucket{_labels(labels, le='+Inf')} {histogram.count}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(histogram.sum)}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+        seen = set()
+        for (name, labels), histogram in histograms:
+            quantile_name = f"{name}_quantile"
+            if quantile_name not in seen:
+                seen.add(quantile_name)
+                lines.append(f"# HELP {quantile_name} Quantiles over the last {QUANTILE_WINDOW} observations")
+                lines.append(f"# TYPE {quantile_name} gauge")
+            for q in QUANTILES:
+                lines.append(f"{quantile_name}{_labels(labels, quantile=str(q))} {_number(histogram.quantile(q))}")
+
+    seen = set()
+    for (name, labels), value in counters:
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    # Group collector samples by family: Prometheus requires them contiguous
+    families: Dict[str, List[Tuple[Dict[str, str], float]]] = {}
+    for collector in collectors:
+        try:
+            samples = list(collector())
+        except Exception as e:
+            print(f"⚠️  Metrics collector failed: {e}")
+            continue
+        for name, labels, value in samples:
+            families.setdefault(name, []).append((labels, value))
+
+    for name, samples in families.items():
+        lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+        for labels, value in samples:
+            lines.append(f"{name}{_labels(tuple(sorted(labels.items())))} {_number(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    """Clear all recorded observations and counters (collectors are kept)."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def _labels(labels: Tuple, **extra: str) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    body = ",".join(f'{key}="{_escape(str(value))}"' for key, value in pairs)
+    return "{" + body + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if isinstance(value, float) else str(value)
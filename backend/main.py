@@ -5,14 +5,18 @@ Main entry point for the portfolio allocation API.
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
+import asyncio
+import json
 import os
 from dotenv import load_dotenv
 
+from tools.gateway import SourceUnavailable
+
 # Load environment variables
 load_dotenv()
 
@@ -42,6 +46,11 @@ class PortfolioRequest(BaseModel):
     risk_level: str = Field(..., pattern="^(low|medium|high)$", description="Risk tolerance level")
     include_etfs: bool = Field(default=True, description="Include sector ETFs")
     max_holdings: int = Field(default=5, ge=3, le=5, description="Maximum number of holdings")
+    strategy: str = Field(
+        default="heuristic",
+        pattern="^(heuristic|min_variance|max_sharpe)$",
+        description="Weighting: risk-level preset, or mean-variance over price history"
+    )
 
 class AllocationItem(BaseModel):
     ticker: str
@@ -61,6 +70,13 @@ class PortfolioSummary(BaseModel):
     sector_concentration: Dict[str, int]
     key_insights: List[str]
 
+class DataQuality(BaseModel):
+    degraded: bool = False
+    stale: List[str] = []
+    unavailable: List[str] = []
+    strategy: str = "heuristic"
+    strategy_fallback: Optional[str] = None
+
 class PortfolioResponse(BaseModel):
     request: Dict[str, Any]
     allocation: List[AllocationItem]
@@ -68,6 +84,86 @@ class PortfolioResponse(BaseModel):
     rationale: str
     risk_disclosure: str
     data_sources: List[str]
+    data_quality: DataQuality = DataQuality()
+
+class PortfolioComparisonResponse(BaseModel):
+    ticker: str
+    investment_amount: float
+    portfolios: Dict[str, PortfolioResponse]
+
+class BatchPortfolioRequest(BaseModel):
+    items: List[PortfolioRequest] = Field(..., min_length=1, max_length=25, description="Portfolio requests to generate together")
+
+class BatchPortfolioItem(BaseModel):
+    ticker: str
+    risk_level: str
+    status: str
+    portfolio: Optional[PortfolioResponse] = None
+    error: Optional[str] = None
+
+class BatchPortfolioResponse(BaseModel):
+    results: List[BatchPortfolioItem]
+    unique_tickers_fetched: int
+
+class ScoreResponse(BaseModel):
+    ticker: str
+    company_name: Optional[str]
+    sector: Optional[str]
+    score: float
+    metrics: Dict[str, Optional[float]]
+    source: Optional[str]
+    updated_at: str
+
+class BulkScoreRequest(BaseModel):
+    tickers: List[str] = Field(..., min_length=1, max_length=1000, description="Ticker symbols to look up")
+
+class BulkScoreResponse(BaseModel):
+    scores: Dict[str, ScoreResponse]
+    missing: List[str]
+
+class ScreenRequest(BaseModel):
+    tickers: Optional[List[str]] = Field(default=None, max_length=20000, description="Universe to screen (default: snapshot universe)")
+    risk_levels: List[str] = Field(default=["low", "medium", "high"], min_length=1, description="Presets to build")
+    include_etfs: bool = Field(default=True, description="Include sector ETFs")
+    peer_limit: int = Field(default=8, ge=1, le=20, description="Peers per portfolio")
+
+class ScreenPortfolios(BaseModel):
+    holdings: List[List[int]]
+    weights: List[List[float]]
+    etf_weight: List[float]
+    holdings_count: List[int]
+    average_quality: List[float]
+    top_weight: List[float]
+
+class ScreenResponse(BaseModel):
+    count: int
+    tickers: List[str]
+    sectors: List[str]
+    etfs: List[str]
+    scores: List[float]
+    portfolios: Dict[str, ScreenPortfolios]
+
+# ============================================
+# Helpers
+# ============================================
+
+def validate_portfolio_request(req: PortfolioRequest) -> None:
+    """Reject out-of-range portfolio requests with a 400."""
+    if req.investment_amount < 1000 or req.investment_amount > 1000000:
+        raise HTTPException(
+            status_code=400,
+            detail="Investment amount must be between $1,000 and $1,000,000"
+        )
+    
+    if req.risk_level not in ["low", "medium", "high"]:
+        raise HTTPException(
+            status_code=400,
+            detail="Risk level must be 'low', 'medium', or 'high'"
+        )
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 # ============================================
 # API Endpoints
@@ -113,17 +209,46 @@ async def health_check():
     except:
         tracing_status = {"enabled": False}
     
+    try:
+        from tools.market_data import get_cache_stats
+        from agents.portfolio_agent import get_rationale_cache_stats, get_response_cache_stats
+        cache_stats = get_cache_stats()
+        from tools.refresher import is_running
+        cache_stats["rationale"] = get_rationale_cache_stats()
+        cache_stats["portfolio_response"] = get_response_cache_stats()
+        cache_stats["background_refresh"] = "running" if is_running() else "stopped"
+    except Exception as e:
+        cache_stats = {"error": str(e)}
+    
+    from tools.warmup import get_warmup_status, is_ready
+    from config.imports import get_import_report
+    
     return {
         "status": "healthy",
+        "ready": is_ready(),
         "checks": {
             "api": "ok",
+            "warmup": get_warmup_status()["state"],
+            "market_data": "ok" if cache_stats.get("source_gateway", {}).get("state", "closed") == "closed" else "degraded",
             "llm": "ok" if os.getenv("OPENAI_API_KEY") else "missing_key",
             "cache": "ok" if os.getenv("REDIS_URL") else "not_configured",
             "tracing": "ok" if tracing_status.get("enabled") else "not_configured"
         },
-        "tracing": tracing_status
+        "tracing": tracing_status,
+        "warmup": get_warmup_status(),
+        "imports": get_import_report(),
+        "cache_stats": cache_stats
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus-style metrics: per-stage latency histograms and quantiles,
+    cache hit/miss counters, timeouts and errors. Everything is in-process.
+    """
+    from config.metrics import render_prometheus
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
 @app.post("/api/v1/portfolio/generate", response_model=PortfolioResponse)
 async def generate_portfolio(req: PortfolioRequest):
     """
@@ -136,35 +261,27 @@ async def generate_portfolio(req: PortfolioRequest):
     4. Rationale - GPT-4 generated explanations
     """
     
-    # Validate inputs
-    if req.investment_amount < 1000 or req.investment_amount > 1000000:
-        raise HTTPException(
-            status_code=400,
-            detail="Investment amount must be between $1,000 and $1,000,000"
-        )
-    
-    if req.risk_level not in ["low", "medium", "high"]:
-        raise HTTPException(
-            status_code=400,
-            detail="Risk level must be 'low', 'medium', or 'high'"
-        )
+    validate_portfolio_request(req)
     
     # Import the working agent
     try:
-        from agents.portfolio_agent import generate_portfolio_allocation
+        from agents.portfolio_agent import agenerate_portfolio_allocation
         
         # Generate portfolio
-        result = generate_portfolio_allocation(
+        result = await agenerate_portfolio_allocation(
             ticker=req.ticker.upper(),
             investment_amount=req.investment_amount,
             risk_level=req.risk_level,
             include_etfs=req.include_etfs,
-            max_holdings=req.max_holdings
+            max_holdings=req.max_holdings,
+            strategy=req.strategy
         )
         
         # Convert to response model
         return PortfolioResponse(**result)
         
+    except SourceUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"Market data unavailable: {str(e)}")
     except Exception as e:
         print(f"Error generating portfolio: {e}")
         import traceback
@@ -174,31 +291,196 @@ async def generate_portfolio(req: PortfolioRequest):
             detail=f"Portfolio generation failed: {str(e)}"
         )
 
-@app.get("/api/v1/scores/{ticker}")
+@app.post("/api/v1/portfolio/generate/stream")
+async def generate_portfolio_stream(req: PortfolioRequest):
+    """
+    Stream portfolio generation as server-sent events.
+    
+    Emits `target`, `peers`, `allocation` and `summary` as each stage
+    finishes, then `rationale_token` chunks while the LLM writes, the parsed
+    `rationale`, and a final `complete` event carrying the full
+    PortfolioResponse payload. Failures are reported as an `error` event
+    with the HTTP status the plain endpoint would return (503 when no
+    market data is available).
+    """
+    
+    validate_portfolio_request(req)
+    
+    from agents.portfolio_agent import astream_portfolio_allocation
+    
+    async def event_stream():
+        try:
+            async for event, data in astream_portfolio_allocation(
+                ticker=req.ticker.upper(),
+                investment_amount=req.investment_amount,
+                risk_level=req.risk_level,
+                include_etfs=req.include_etfs,
+                max_holdings=req.max_holdings,
+                strategy=req.strategy
+            ):
+                yield format_sse(event, data)
+        except SourceUnavailable as e:
+            yield format_sse("error", {"status": 503, "detail": f"Market data unavailable: {str(e)}"})
+        except Exception as e:
+            print(f"Error streaming portfolio: {e}")
+            import traceback
+            traceback.print_exc()
+            yield format_sse("error", {"status": 500, "detail": f"Portfolio generation failed: {str(e)}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/v1/portfolio/batch", response_model=BatchPortfolioResponse)
+async def batch_generate_portfolios(req: BatchPortfolioRequest):
+    """
+    Generate portfolios for a whole watchlist in one call.
+    
+    Tickers are deduplicated across all items so overlapping peer sets are
+    fetched once; each item then succeeds or fails independently.
+    """
+    try:
+        from agents.portfolio_agent import agenerate_portfolio_batch
+        
+        result = await agenerate_portfolio_batch([
+            {
+                "ticker": item.ticker.upper(),
+                "investment_amount": item.investment_amount,
+                "risk_level": item.risk_level,
+                "include_etfs": item.include_etfs,
+                "max_holdings": item.max_holdings,
+                "strategy": item.strategy
+            }
+            for item in req.items
+        ])
+        
+        return BatchPortfolioResponse(**result)
+        
+    except Exception as e:
+        print(f"Error generating portfolio batch: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Batch generation failed: {str(e)}"
+        )
+
+@app.get("/api/v1/scores/{ticker}", response_model=ScoreResponse)
 async def get_ticker_score(ticker: str):
     """
     Get earnings quality score for a specific ticker.
+    
+    Served from the score index, which holds the latest score computed by
+    portfolio generation or the nightly snapshot. Tickers that have never
+    been scored return 404; nothing is fetched live.
+    """
+    from tools.score_store import lookup_scores
+    
+    record = lookup_scores([ticker]).get(ticker.upper())
+    if record is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No score recorded for {ticker.upper()}"
+        )
+    return ScoreResponse(**record)
+
+@app.post("/api/v1/scores/bulk", response_model=BulkScoreResponse)
+async def get_ticker_scores(req: BulkScoreRequest):
+    """
+    Look up scores for many tickers in one call (up to 1,000).
+    Tickers without a recorded score are listed in `missing`.
     """
-    # TODO: Implement score lookup
-    raise HTTPException(
-        status_code=501,
-        detail="Score lookup not yet implemented"
+    from tools.score_store import lookup_scores
+    
+    tickers = list(dict.fromkeys(t.strip().upper() for t in req.tickers if t.strip()))
+    records = lookup_scores(tickers)
+    return BulkScoreResponse(
+        scores=records,
+        missing=[t for t in tickers if t not in records]
     )
 
-@app.get("/api/v1/portfolio/compare")
+@app.post("/api/v1/screen", response_model=ScreenResponse)
+async def screen_universe(req: ScreenRequest):
+    """
+    Score a whole universe and build every ticker's preset portfolios.
+    
+    The CPU work is sharded across a process pool. The response is columnar:
+    one list per field, with `holdings` as indices into `tickers` (-1 for
+    empty slots) and `weights` alongside them.
+    """
+    risk_levels = list(dict.fromkeys(level.strip().lower() for level in req.risk_levels))
+    if any(level not in ["low", "medium", "high"] for level in risk_levels):
+        raise HTTPException(
+            status_code=400,
+            detail="Risk levels must be a subset of 'low', 'medium', 'high'"
+        )
+    
+    try:
+        from tools.screening import ascreen_universe, screen_payload
+        
+        tickers = [t.strip().upper() for t in req.tickers if t.strip()] if req.tickers else None
+        result = await ascreen_universe(tickers, risk_levels, req.include_etfs, req.peer_limit)
+        return ScreenResponse(**screen_payload(result))
+        
+    except Exception as e:
+        print(f"Error screening universe: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Screening failed: {str(e)}"
+        )
+
+@app.get("/api/v1/portfolio/compare", response_model=PortfolioComparisonResponse)
 async def compare_risk_levels(
     ticker: str,
     amount: float,
-    levels: str = "low,medium,high"
+    levels: str = "low,medium,high",
+    include_etfs: bool = True
 ):
     """
     Compare portfolio allocations across multiple risk levels.
+    
+    Market data and quality scores are computed once and shared by every
+    level, and all rationales come from a single LLM call.
     """
-    # TODO: Implement comparison logic
-    raise HTTPException(
-        status_code=501,
-        detail="Comparison endpoint not yet implemented"
-    )
+    if amount < 1000 or amount > 1000000:
+        raise HTTPException(
+            status_code=400,
+            detail="Investment amount must be between $1,000 and $1,000,000"
+        )
+    
+    risk_levels = list(dict.fromkeys(level.strip().lower() for level in levels.split(",") if level.strip()))
+    if not risk_levels or any(level not in ["low", "medium", "high"] for level in risk_levels):
+        raise HTTPException(
+            status_code=400,
+            detail="Levels must be a comma-separated subset of 'low', 'medium', 'high'"
+        )
+    
+    try:
+        from agents.portfolio_agent import agenerate_risk_comparison
+        
+        result = await agenerate_risk_comparison(
+            ticker=ticker.upper(),
+            investment_amount=amount,
+            risk_levels=risk_levels,
+            include_etfs=include_etfs
+        )
+        
+        return PortfolioComparisonResponse(**result)
+        
+    except SourceUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"Market data unavailable: {str(e)}")
+    except Exception as e:
+        print(f"Error comparing portfolios: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Portfolio comparison failed: {str(e)}"
+        )
 
 # ============================================
 # Startup/Shutdown Events
@@ -225,12 +507,45 @@ async def startup_event():
     except Exception as e:
         print(f"🔍 Arize Tracing: ⚠️  Initialization failed: {e}")
     
+    # Load heavy dependencies in one measured phase instead of on the first request
+    from config.imports import preload_modules
+    imports = preload_modules()
+    print(f"📦 Imports: {imports['phase_seconds']}s "
+          f"({', '.join(f'{m} {t}s' for m, t in imports['modules_seconds'].items())})")
+    for module, error in imports["failed"].items():
+        print(f"📦 Import of {module} failed: {error}")
+    
+    # Preload the universe and LLM client before accepting traffic
+    from tools.warmup import warm_up
+    warmup = await warm_up()
+    if warmup["state"] == "ready":
+        print(f"🔥 Warm-up: ✅ {warmup['tickers_loaded']}/{warmup['tickers_total']} tickers, "
+              f"LLM client {warmup['llm_client']} ({warmup['duration_seconds']}s)")
+    else:
+        print("🔥 Warm-up: ⚠️  Disabled (WARMUP_ENABLED=false)")
+    
+    # Keep popular tickers warm in the background
+    from tools.refresher import start_refresher
+    if start_refresher():
+        print("🔄 Background refresh: ✅ Running")
+    else:
+        print("🔄 Background refresh: ⚠️  Disabled (BACKGROUND_REFRESH_ENABLED=false)")
+    
     print("Ready to accept requests!")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown."""
     print("👋 Smart Portfolio API shutting down...")
+    
+    from tools.refresher import stop_refresher
+    await stop_refresher()
+    
+    from tools.screening import shutdown_screening_pool
+    shutdown_screening_pool()
+    
+    from tools.score_store import flush_scores
+    await asyncio.get_running_loop().run_in_executor(None, flush_scores)
 
 # ============================================
 # Run Server
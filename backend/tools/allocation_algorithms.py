@@ -1,10 +1,14 @@
 """
 Allocation Algorithms - Risk-based portfolio distribution
-Implements low, medium, and high risk strategies.
+Implements low, medium, and high risk strategies as presets of the
+constrained solver in tools/allocation_engine.py.
 """
 
 from typing import List, Tuple, Dict
 
+from tools.allocation_engine import allocate_preset
+from tools.records import StockRecord
+
 def allocate_low_risk(
     peers_with_scores: List[Tuple[str, float]],
     include_etf: bool = True,
@@ -16,22 +20,7 @@ def allocate_low_risk(
     - 60% split equally among top 4 peers
     - Max 20% per stock
     """
-    allocations = []
-    
-    if include_etf:
-        allocations.append((etf_ticker, 0.40))
-        remaining = 0.60
-        peer_count = min(4, len(peers_with_scores))
-    else:
-        remaining = 1.0
-        peer_count = min(5, len(peers_with_scores))
-    
-    if peer_count > 0:
-        per_peer = remaining / peer_count
-        for ticker, score in peers_with_scores[:peer_count]:
-            allocations.append((ticker, per_peer))
-    
-    return allocations
+    return allocate_preset("low", peers_with_scores, include_etf, etf_ticker)
 
 def allocate_medium_risk(
     peers_with_scores: List[Tuple[str, float]],
@@ -41,36 +30,11 @@ def allocate_medium_risk(
     """
     Medium Risk Strategy: Quality-weighted allocation
     - Weight by quality score
-    - Max 35% per holding
+    - Max 35% per holding (enforced after normalization)
     - Optional 5% ETF for diversification
+    - Equal weight (low risk) if every score is zero
     """
-    # Calculate total score
-    total_score = sum(score for _, score in peers_with_scores)
-    
-    if total_score == 0:
-        # Fallback to equal weight
-        return allocate_low_risk(peers_with_scores, include_etf, etf_ticker)
-    
-    allocations = []
-    
-    # Calculate raw weights based on scores
-    for ticker, score in peers_with_scores[:5]:
-        raw_weight = score / total_score
-        capped_weight = min(raw_weight, 0.35)  # Max 35% per holding
-        allocations.append((ticker, capped_weight))
-    
-    # Normalize to sum to 1.0 (or 0.95 if including ETF)
-    total_allocated = sum(weight for _, weight in allocations)
-    
-    if include_etf and total_allocated > 0.05:
-        # Reserve 5% for ETF
-        allocations = [(ticker, weight * 0.95 / total_allocated) for ticker, weight in allocations]
-        allocations.append((etf_ticker, 0.05))
-    else:
-        # Normalize to 100%
-        allocations = [(ticker, weight / total_allocated) for ticker, weight in allocations]
-    
-    return allocations
+    return allocate_preset("medium", peers_with_scores, include_etf, etf_ticker)
 
 def allocate_high_risk(
     peers_with_scores: List[Tuple[str, float]],
@@ -85,46 +49,14 @@ def allocate_high_risk(
     - Second peer: 20%
     - Third peer: 10%
     - Optional: Small ETF position
+    If the target is not among the peers, the first peer takes its place.
     """
-    allocations = []
-    
-    # Ensure target ticker is first
-    target_included = False
-    sorted_peers = []
-    
-    for ticker, score in peers_with_scores:
-        if ticker == target_ticker:
-            target_included = True
-        else:
-            sorted_peers.append((ticker, score))
-    
-    if target_included or len(peers_with_scores) > 0:
-        # Add target with 40%
-        if target_ticker in [t for t, _ in peers_with_scores]:
-            allocations.append((target_ticker, 0.40))
-        else:
-            # If target not in peers, use first peer as main holding
-            allocations.append((peers_with_scores[0][0], 0.40))
-            sorted_peers = peers_with_scores[1:]
-        
-        # Add remaining peers
-        if len(sorted_peers) >= 1:
-            allocations.append((sorted_peers[0][0], 0.30))
-        if len(sorted_peers) >= 2:
-            allocations.append((sorted_peers[1][0], 0.20))
-        if len(sorted_peers) >= 3:
-            if include_etf:
-                allocations.append((sorted_peers[2][0], 0.07))
-                allocations.append((etf_ticker, 0.03))
-            else:
-                allocations.append((sorted_peers[2][0], 0.10))
-    
-    return allocations
+    return allocate_preset("high", peers_with_scores, include_etf, etf_ticker, target_ticker=target_ticker)
 
 def format_allocation(
     allocations: List[Tuple[str, float]],
     amount: float,
-    peer_data: Dict[str, Dict]
+    peer_data: Dict[str, StockRecord]
 ) -> List[Dict]:
     """
     Format allocation into detailed response structure.
@@ -132,16 +64,16 @@ def format_allocation(
     formatted = []
     
     for ticker, percent in allocations:
-        data = peer_data.get(ticker, {})
+        record = peer_data.get(ticker) or StockRecord(ticker)
         
         formatted.append({
             "ticker": ticker,
-            "company_name": data.get("company_name", ticker),
+            "company_name": record.company_name or ticker,
             "allocation_percent": int(percent * 100),
             "allocation_amount": int(amount * percent),
-            "sector": data.get("sector", "Unknown"),
-            "earnings_quality_score": data.get("score"),
-            "market_cap": data.get("market_cap_formatted", "N/A"),
+            "sector": record.sector or "Unknown",
+            "earnings_quality_score": record.score,
+            "market_cap": record.market_cap_formatted or "N/A",
             "rationale": ""  # Will be filled by LLM
         })
     
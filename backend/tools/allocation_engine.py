@@ -0,0 +1,321 @@
+"""
+Allocation Engine - Constrained weight solving with NumPy
+Turns preference scores into portfolio weights under per-holding min/max
+weights, sector caps and an ETF sleeve, for one portfolio or a whole batch.
+
+The low/medium/high strategies in tools/allocation_algorithms.py are
+presets of this engine (see PRESETS).
+
+Usage:
+    weights = solve_weights(np.array([4.5, 3.0, 2.0]), budget=0.95, max_weight=0.35)
+    stock_w, etf_w = allocate_batch("medium", scores, include_etf=True)
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_EPS = 1e-12
+
+# Strategy presets. `holdings` is how many candidates (in priority order)
+# receive weight; weighting is "equal", "score" (proportional to score) or
+# "rank" (fixed weights by position). The ETF sleeve is carved out first.
+PRESETS: Dict[str, Dict] = {
+    "low": {
+        "holdings": 4,
+        "holdings_without_etf": 5,
+        "weighting": "equal",
+        "max_weight": 0.20,
+        "etf_weight": 0.40,
+        "etf_first": True,
+    },
+    "medium": {
+        "holdings": 5,
+        "weighting": "score",
+        "max_weight": 0.35,
+        "etf_weight": 0.05,
+        "fallback": "low",  # used when every score is zero
+    },
+    "high": {
+        "holdings": 4,
+        "weighting": "rank",
+        "rank_weights": (0.40, 0.30, 0.20, 0.10),
+        "etf_rank_weights": (0.40, 0.30, 0.20, 0.07),
+        "etf_weight": 0.03,
+        "etf_min_holdings": 4,  # the ETF replaces part of the fourth position
+        "target_first": True,
+    },
+}
+
+
+def solve_weights(
+    preferences: np.ndarray,
+    budget=1.0,
+    min_weight=0.0,
+    max_weight=1.0,
+    sectors: Optional[np.ndarray] = None,
+    sector_cap: Optional[float] = None
+) -> np.ndarray:
+    """
+    Weights proportional to `preferences` that sum to `budget` while every
+    weight stays within [min_weight, max_weight] and every sector's total
+    stays at or below `sector_cap`.
+
+    `preferences` is (n,) or (batch, n); NaN marks an empty slot, which gets
+    weight 0. `budget`, `min_weight` and `max_weight` are scalars or broadcast
+    per row/holding. `sectors` holds integer sector codes shaped like
+    `preferences` (-1 for none).
+
+    Each weight is clip(level * preference, min_weight, max_weight). A sector
+    that would exceed its cap gets its own lower level, set by bisection so
+    it sits exactly at the cap; the common level is then bisected until the
+    weights sum to the budget, and the holdings left between their bounds
+    are solved in closed form. Zero-preference holdings only receive weight
+    (in equal shares) once every other holding is at a bound. When the
+    constraints cannot be met (e.g. two holdings capped at 35%), the result
+    is rescaled to the budget as a last resort.
+    """
+    prefs = np.asarray(preferences, dtype=float)
+    single = prefs.ndim == 1
+    prefs = np.atleast_2d(prefs)
+    rows, n = prefs.shape
+
+    active = ~np.isnan(prefs)
+    prefs = np.where(active, np.maximum(np.nan_to_num(prefs), 0.0), 0.0)
+    budget = np.broadcast_to(np.asarray(budget, dtype=float), (rows,)).reshape(rows, 1)
+    lo = np.where(active, np.broadcast_to(np.asarray(min_weight, dtype=float), (rows, n)), 0.0)
+    hi = np.where(active, np.broadcast_to(np.asarray(max_weight, dtype=float), (rows, n)), 0.0)
+
+    groups = None
+    caps = None
+    if sectors is not None and sector_cap is not None:
+        codes = np.broadcast_to(np.atleast_2d(np.asarray(sectors)), (rows, n))
+        groups = (codes[..., None] == np.arange(max(codes.max() + 1, 1))) & active[..., None]  # (rows, n, k)
+        caps = np.full((rows, groups.shape[2]), float(sector_cap))
+
+    # Rows where every preference is zero weight their holdings equally
+    positive = active & (prefs > _EPS)
+    prefs = np.where(active & ~positive.any(axis=1, keepdims=True), 1.0, prefs)
+    positive = active & (prefs > _EPS)
+
+    weights = _fill(prefs, positive, budget, lo, hi, groups, caps)
+
+    # Zero-preference holdings share whatever the others could not take
+    zero = active & ~positive
+    short = (budget - weights.sum(axis=1, keepdims=True) > 1e-12) & zero.any(axis=1, keepdims=True)
+    if short.any():
+        placed = np.where(positive, weights, 0.0)
+        remaining_caps = None if groups is None else caps - np.einsum("rn,rnk->rk", placed, groups)
+        spread = _fill(
+            zero.astype(float), zero, budget - placed.sum(axis=1, keepdims=True),
+            np.where(zero, lo, 0.0), np.where(zero, hi, 0.0), groups, remaining_caps
+        )
+        weights = np.where(short & zero, spread, weights)
+
+    # Infeasible rows (bounds or caps cannot meet the budget): rescale
+    totals = weights.sum(axis=1, keepdims=True)
+    off_budget = (np.abs(totals - budget) > 1e-9) & (totals > _EPS)
+    weights = np.where(off_budget, weights * budget / np.where(totals > _EPS, totals, 1.0), weights)
+
+    return weights[0] if single else weights
+
+
+def _fill(
+    prefs: np.ndarray,
+    mask: np.ndarray,
+    budget: np.ndarray,
+    lo: np.ndarray,
+    hi: np.ndarray,
+    groups: Optional[np.ndarray],
+    caps: Optional[np.ndarray],
+    iterations: int = 100
+) -> np.ndarray:
+    """
+    clip(level * prefs, lo, hi) over `mask` (other holdings sit at `lo`),
+    with per-sector levels capping sector totals at `caps` and the common
+    level chosen so the row sums to `budget` where the bounds allow.
+    """
+    rows, n = prefs.shape
+    p = np.where(mask, prefs, 0.0)
+    # Every masked holding sits at its upper bound at this level (the bracket
+    # starts above it, so saturated holdings classify as pinned)
+    top = 2 * np.max(np.where(mask, hi / np.where(p > _EPS, p, 1.0), 0.0), axis=1, keepdims=True)
+
+    def weights_at(level):
+        return np.where(mask, np.clip(level * p, lo, hi), lo)
+
+    # Per-sector level bracket; sectors that fit under their cap never bind
+    binds = np.zeros((rows, n), dtype=bool)
+    sector_lo = sector_hi = np.zeros((rows, n))
+    if groups is not None:
+        capped = np.einsum("rn,rnk->rk", weights_at(top), groups) > caps + _EPS
+        if capped.any():
+            low = np.zeros(caps.shape)
+            high = np.broadcast_to(top, caps.shape).copy()
+            for _ in range(iterations):
+                mid = (low + high) / 2
+                over = np.einsum("rn,rnk->rk", weights_at(np.einsum("rnk,rk->rn", groups, mid)), groups) > caps
+                high = np.where(over, mid, high)
+                low = np.where(over, low, mid)
+            member = np.einsum("rnk,rk->rn", groups, capped.astype(float)) > 0
+            sector_lo = np.einsum("rnk,rk->rn", groups, low)
+            sector_hi = np.einsum("rnk,rk->rn", groups, high)
+            binds = member
+
+    # Common level: the largest whose weights stay within the budget
+    low = np.zeros((rows, 1))
+    high = top.copy()
+    for _ in range(iterations):
+        mid = (low + high) / 2
+        level = np.where(binds, np.minimum(mid, sector_lo), mid)
+        over = weights_at(level).sum(axis=1, keepdims=True) > budget
+        high = np.where(over, mid, high)
+        low = np.where(over, low, mid)
+    binds &= sector_hi < low
+
+    # Classify each holding at the final bracket, then solve the free ones exactly
+    level_lo = np.where(binds, sector_lo, low)
+    level_hi = np.where(binds, sector_hi, high)
+    at_hi = mask & (level_lo * p >= hi)
+    at_lo = ~mask | (level_hi * p <= lo)
+    free = ~(at_hi | at_lo)
+    weights = np.where(at_hi, hi, lo)
+
+    if groups is not None and binds.any():
+        # Free holdings of a binding sector share what the cap leaves them
+        in_sector = free & binds
+        sector_free = np.einsum("rn,rnk->rk", np.where(in_sector, p, 0.0), groups)
+        sector_room = caps - np.einsum("rn,rnk->rk", np.where(in_sector, 0.0, weights), groups)
+        scale = np.where(sector_free > _EPS, sector_room / np.where(sector_free > _EPS, sector_free, 1.0), 0.0)
+        weights = np.where(in_sector, p * np.einsum("rnk,rk->rn", groups, scale), weights)
+
+    # Remaining free holdings share the rest of the budget by preference
+    common = free & ~binds
+    total = np.where(common, p, 0.0).sum(axis=1, keepdims=True)
+    remaining = budget - np.where(common, 0.0, weights).sum(axis=1, keepdims=True)
+    share = np.where(common, p, 0.0) / np.where(total > _EPS, total, 1.0)
+    return np.where(common, share * remaining, weights)
+
+
+def preset_preferences(
+    preset: Dict,
+    scores: np.ndarray,
+    include_etf: bool
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Preference matrix and per-row ETF weight for a preset.
+    `scores` is (batch, n) in priority order, NaN-padded.
+    """
+    scores = np.atleast_2d(np.asarray(scores, dtype=float))
+    rows, n = scores.shape
+    available = ~np.isnan(scores)
+    position = np.cumsum(available, axis=1) - 1  # rank among available candidates
+
+    holdings = preset["holdings"] if include_etf else preset.get("holdings_without_etf", preset["holdings"])
+    chosen = available & (position < holdings)
+    chosen_count = chosen.sum(axis=1)
+
+    etf_weight = np.zeros(rows)
+    if include_etf:
+        etf_weight[:] = preset["etf_weight"]
+        if "etf_min_holdings" in preset:
+            etf_weight = np.where(chosen_count >= preset["etf_min_holdings"], etf_weight, 0.0)
+
+    if preset["weighting"] == "equal":
+        prefs = np.where(chosen, 1.0, np.nan)
+    elif preset["weighting"] == "score":
+        prefs = np.where(chosen, scores, np.nan)
+    else:
+        position = np.clip(position, 0, n - 1)
+        plain = _rank_table(preset["rank_weights"], n)[position]
+        with_etf = _rank_table(preset.get("etf_rank_weights", preset["rank_weights"]), n)[position]
+        prefs = np.where(chosen, np.where((etf_weight > 0)[:, None], with_etf, plain), np.nan)
+
+    return prefs, etf_weight
+
+
+def allocate_batch(
+    preset_name: str,
+    scores: np.ndarray,
+    include_etf: bool = True,
+    sectors: Optional[np.ndarray] = None,
+    sector_cap: Optional[float] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Solve many portfolios at once with one preset.
+
+    `scores` is (batch, n): candidate scores in priority order (highest
+    first; for "high" the target in column 0), NaN-padded for rows with
+    fewer candidates. Returns (stock_weights (batch, n), etf_weight (batch,)).
+    """
+    preset = PRESETS[preset_name]
+    scores = np.atleast_2d(np.asarray(scores, dtype=float))
+    prefs, etf_weight = preset_preferences(preset, scores, include_etf)
+
+    weights = solve_weights(
+        prefs,
+        budget=1.0 - etf_weight,
+        min_weight=preset.get("min_weight", 0.0),
+        max_weight=preset.get("max_weight", 1.0),
+        sectors=sectors,
+        sector_cap=sector_cap
+    )
+
+    fallback = preset.get("fallback")
+    if fallback:
+        # Rows with no positive score use the fallback preset instead
+        dead = ~(np.nan_to_num(prefs) > 0).any(axis=1)
+        if dead.any():
+            dead_sectors = None if sectors is None else np.atleast_2d(sectors)[dead]
+            weights[dead], etf_weight[dead] = allocate_batch(fallback, scores[dead], include_etf, dead_sectors, sector_cap)
+
+    return weights, etf_weight
+
+
+def allocate_preset(
+    preset_name: str,
+    peers_with_scores: List[Tuple[str, float]],
+    include_etf: bool = True,
+    etf_ticker: str = "SPY",
+    target_ticker: Optional[str] = None,
+    sector_by_ticker: Optional[Dict[str, str]] = None,
+    sector_cap: Optional[float] = None
+) -> List[Tuple[str, float]]:
+    """
+    Allocate one portfolio with a preset, returning (ticker, weight) pairs
+    in the same shape as the allocate_*_risk functions.
+    """
+    preset = PRESETS[preset_name]
+    candidates = list(peers_with_scores)
+    if preset.get("target_first") and target_ticker is not None:
+        target = [(t, s) for t, s in candidates if t == target_ticker]
+        candidates = target + [(t, s) for t, s in candidates if t != target_ticker]
+
+    if not candidates:
+        return [(etf_ticker, 1.0)] if include_etf else []
+
+    tickers = [t for t, _ in candidates]
+    scores = np.array([[s if s is not None else 0.0 for _, s in candidates]], dtype=float)
+
+    sectors = None
+    if sector_by_ticker is not None and sector_cap is not None:
+        names = {name: i for i, name in enumerate(dict.fromkeys(sector_by_ticker.get(t, "") for t in tickers))}
+        sectors = np.array([[names[sector_by_ticker.get(t, "")] for t in tickers]])
+
+    weights, etf_weight = allocate_batch(preset_name, scores, include_etf, sectors, sector_cap)
+
+    allocations = [(t, float(w)) for t, w in zip(tickers, weights[0]) if w > 0]
+    if etf_weight[0] > 0:
+        etf = (etf_ticker, float(etf_weight[0]))
+        if preset.get("etf_first"):
+            allocations.insert(0, etf)
+        else:
+            allocations.append(etf)
+    return allocations
+
+
+def _rank_table(values: Tuple[float, ...], n: int) -> np.ndarray:
+    table = np.zeros(n)
+    values = values[:n]
+    table[:len(values)] = values
+    return table
@@ -0,0 +1,224 @@
+"""
+Backtest - Historical performance of allocation strategies
+Simulates the output of allocate_low_risk / allocate_medium_risk /
+allocate_high_risk over daily prices from a local store, so it runs offline.
+
+Prices are a CSV or Parquet file (PRICE_HISTORY_PATH), either wide (a date
+column plus one column per ticker) or long (date, ticker, close columns).
+Record one from Yahoo Finance, then backtest (run inside backend/):
+    python -m tools.backtest --download AAPL,MSFT,NVDA,XLK,SPY --start 2015-01-01
+    python -m tools.backtest --ticker AAPL --rebalance Q
+
+Every strategy variant is a row of a weight matrix, so drift, rebalancing
+and metrics are computed for all variants and tickers at once:
+returns are compounded per rebalance period with a groupby cumprod and
+projected onto the weights with one matrix multiply.
+"""
+
+import argparse
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PRICE_HISTORY_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data",
+    "prices.parquet"
+)
+PRICE_HISTORY_PATH = os.getenv("PRICE_HISTORY_PATH", DEFAULT_PRICE_HISTORY_PATH)
+
+TRADING_DAYS = 252
+
+# Rebalance frequencies as pandas period codes (None = buy and hold)
+REBALANCE_PERIODS = {"none": None, "M": "M", "Q": "Q", "A": "Y"}
+
+
+def load_prices(
+    path: str = PRICE_HISTORY_PATH,
+    tickers: Optional[List[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Daily closes as a wide frame (DatetimeIndex x ticker), sorted by date.
+    Parquet needs pyarrow (or fastparquet); CSV needs nothing extra.
+    """
+    if path.endswith(".parquet"):
+        raw = pd.read_parquet(path)
+    else:
+        raw = pd.read_csv(path)
+
+    columns = {c.lower(): c for c in raw.columns}
+    date_column = columns.get("date", raw.columns[0])
+    if "ticker" in columns:
+        value_column = columns.get("close", columns.get("adj_close", raw.columns[-1]))
+        prices = raw.pivot_table(index=date_column, columns=columns["ticker"], values=value_column)
+    else:
+        prices = raw.set_index(date_column)
+
+    prices.index = pd.to_datetime(prices.index)
+    prices.columns = [str(c).upper() for c in prices.columns]
+    prices = prices.sort_index().loc[start:end]
+    if tickers is not None:
+        prices = prices.reindex(columns=[t.upper() for t in tickers])
+    return prices.astype(float)
+
+
+def save_prices(prices: pd.DataFrame, path: str = PRICE_HISTORY_PATH) -> None:
+    """Write a wide price frame to `path` (.parquet or .csv)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    frame = prices.rename_axis("date")
+    if path.endswith(".parquet"):
+        frame.to_parquet(path)
+    else:
+        frame.to_csv(path)
+
+
+def download_prices(tickers: List[str], start: str, end: Optional[str] = None) -> pd.DataFrame:
+    """Fetch adjusted daily closes from Yahoo Finance (for building the store)."""
+    import yfinance as yf
+    data = yf.download(tickers, start=start, end=end, auto_adjust=True, progress=False)
+    closes = data["Close"]
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(tickers[0])
+    return closes
+
+
+def weight_matrix(
+    allocations: Dict[str, List[Tuple[str, float]]],
+    tickers: List[str]
+) -> np.ndarray:
+    """Turn {strategy: [(ticker, weight), ...]} into a (strategies, tickers) matrix."""
+    column = {t: i for i, t in enumerate(tickers)}
+    weights = np.zeros((len(allocations), len(tickers)))
+    for row, pairs in enumerate(allocations.values()):
+        for ticker, weight in pairs:
+            weights[row, column[ticker]] += weight
+    return weights
+
+
+def simulate(
+    prices: pd.DataFrame,
+    weights: np.ndarray,
+    rebalance: Optional[str] = "M"
+) -> np.ndarray:
+    """
+    Portfolio value paths (days, strategies), starting at 1.0.
+
+    Weights are set on the first day and reset to their targets at the last
+    close of every rebalance period; in between each holding drifts with
+    its own returns. Gaps are forward-filled; days before a ticker starts
+    trading earn 0% for that holding, as does any unallocated (cash) weight.
+    """
+    returns = prices.ffill().pct_change(fill_method=None).iloc[1:].fillna(0.0)
+    growth_factors = returns + 1.0
+
+    period_code = REBALANCE_PERIODS.get(rebalance, rebalance)
+    if period_code is None:
+        periods = np.zeros(len(returns), dtype=int)
+    else:
+        periods = returns.index.to_period(period_code).asi8
+
+    # Growth of each ticker since the start of its rebalance period
+    growth = growth_factors.groupby(periods).cumprod().to_numpy()  # (days, tickers)
+    # Value of every strategy relative to the period start, in one multiply;
+    # weight left unallocated is held as cash
+    relative = growth @ weights.T + (1.0 - weights.sum(axis=1))  # (days, strategies)
+
+    # Chain periods: each period starts from the previous period's end value
+    period_end = np.r_[periods[1:] != periods[:-1], True]
+    end_values = relative[period_end]
+    starts = np.vstack([np.ones((1, weights.shape[0])), np.cumprod(end_values, axis=0)[:-1]])
+    period_index = np.cumsum(np.r_[False, period_end[:-1]])
+    values = starts[period_index] * relative
+    return np.vstack([np.ones((1, weights.shape[0])), values])
+
+
+def performance_metrics(values: np.ndarray) -> Dict[str, np.ndarray]:
+    """Total return, CAGR, annualized volatility, Sharpe (rf = 0) and max drawdown per strategy."""
+    daily = values[1:] / values[:-1] - 1.0
+    years = max(len(daily) / TRADING_DAYS, 1e-9)
+    volatility = daily.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS) if len(daily) > 1 else np.zeros(values.shape[1])
+    mean = daily.mean(axis=0) * TRADING_DAYS if len(daily) else np.zeros(values.shape[1])
+    drawdown = values / np.maximum.accumulate(values, axis=0) - 1.0
+    return {
+        "total_return": values[-1] - 1.0,
+        "cagr": values[-1] ** (1.0 / years) - 1.0,
+        "volatility": volatility,
+        "sharpe": np.divide(mean, volatility, out=np.zeros_like(mean), where=volatility > 0),
+        "max_drawdown": drawdown.min(axis=0)
+    }
+
+
+def backtest_allocations(
+    allocations: Dict[str, List[Tuple[str, float]]],
+    prices: Optional[pd.DataFrame] = None,
+    rebalance: Optional[str] = "M",
+    start: Optional[str] = None,
+    end: Optional[str] = None
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Backtest named allocations (as returned by the allocate_* functions).
+    Returns (metrics per strategy, daily value curves per strategy).
+    """
+    tickers = sorted({t for pairs in allocations.values() for t, _ in pairs})
+    if prices is None:
+        prices = load_prices(tickers=tickers, start=start, end=end)
+    missing = [t for t in tickers if t not in prices.columns or prices[t].isna().all()]
+    if missing:
+        raise ValueError(f"No price history for: {', '.join(missing)}")
+
+    prices = prices[tickers].loc[start:end]
+    values = simulate(prices, weight_matrix(allocations, tickers), rebalance)
+    names = list(allocations)
+    metrics = pd.DataFrame(performance_metrics(values), index=names)
+    curves = pd.DataFrame(values, index=prices.index, columns=names)
+    return metrics, curves
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest allocation strategies over local price history.")
+    parser.add_argument("--prices", default=PRICE_HISTORY_PATH, help="Price store (.parquet or .csv)")
+    parser.add_argument("--ticker", help="Target ticker: backtest its low/medium/high allocations")
+    parser.add_argument("--no-etfs", action="store_true", help="Exclude sector ETFs from allocations")
+    parser.add_argument("--rebalance", default="M", choices=list(REBALANCE_PERIODS), help="Rebalance frequency")
+    parser.add_argument("--start", help="First date (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last date (YYYY-MM-DD)")
+    parser.add_argument("--download", help="Comma-separated tickers to download into the price store")
+    args = parser.parse_args()
+
+    if args.download:
+        tickers = [t.strip().upper() for t in args.download.split(",") if t.strip()]
+        prices = download_prices(tickers, args.start or "2015-01-01", args.end)
+        save_prices(prices, args.prices)
+        print(f"✅ Saved {prices.shape[0]} days x {prices.shape[1]} tickers to {args.prices}")
+        return
+
+    if not args.ticker:
+        parser.error("--ticker or --download is required")
+
+    from agents.portfolio_agent import gather_candidates
+    from tools.allocation_algorithms import allocate_low_risk, allocate_medium_risk, allocate_high_risk
+
+    ticker = args.ticker.upper()
+    candidates = gather_candidates(ticker, not args.no_etfs)
+    scored, etf = candidates["scored_peers"], candidates["etf_ticker"]
+    allocations = {
+        "low": allocate_low_risk(scored, etf is not None, etf),
+        "medium": allocate_medium_risk(scored, etf is not None, etf),
+        "high": allocate_high_risk(scored, ticker, etf is not None, etf),
+    }
+
+    metrics, curves = backtest_allocations(
+        allocations,
+        load_prices(args.prices, start=args.start, end=args.end),
+        rebalance=args.rebalance
+    )
+    print(f"\n📈 Backtest for {ticker}: {curves.index[0].date()} to {curves.index[-1].date()}, rebalance {args.rebalance}")
+    print(metrics.round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
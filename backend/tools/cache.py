@@ -0,0 +1,239 @@
+"""
+Cache Tools - Tiered read-through caching
+In-process LRU tier with an optional Redis tier and per-field TTLs.
+"""
+
+import dataclasses
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+class FieldTTLCache:
+    """
+    Two-tier cache of records where every field expires on its own TTL.
+
+    Records (slotted dataclasses such as StockRecord) live in an in-process
+    LRU (bounded by `max_entries`) and, when a Redis URL is configured, are
+    mirrored to Redis so other workers and restarts can reuse them. A lookup
+    only hits when every requested field is still fresh, so callers that
+    need slow-moving fields (e.g. sector) keep hitting long after
+    fast-moving ones (e.g. price) have expired.
+
+    A record is always stored whole, so each entry keeps one store time and
+    a field is fresh until that time plus its TTL. Records are shared with
+    the cache: treat them as read-only and copy before changing a field.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        record_type: type,
+        field_ttls: Dict[str, float],
+        default_ttl: float,
+        max_entries: int = 1024,
+        redis_url: Optional[str] = None
+    ):
+        self.name = name
+        self.record_type = record_type
+        self.field_ttls = {f.name: field_ttls.get(f.name, default_ttl) for f in dataclasses.fields(record_type)}
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        # A whole-record lookup is fresh until its shortest-lived field expires
+        self._record_ttl = min(self.field_ttls.values())
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = connect_redis(redis_url) if redis_url else None
+        self._stats = {
+            "memory_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "redis_errors": 0
+        }
+
+    def get(self, key: str, fields: Optional[Iterable[str]] = None) -> Optional[Any]:
+        """
+        Return the cached record for `key` if all requested fields are fresh.
+
+        With `fields=None` every field of the record must be fresh.
+        """
+        now = time.time()
+        ttl = self._record_ttl if fields is None else min(self.field_ttls.get(f, self.default_ttl) for f in fields)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if entry[1] + ttl > now:
+                    self._stats["memory_hits"] += 1
+                    return entry[0]
+
+        entry = self._redis_get(key)
+        if entry is not None and entry[1] + ttl > now:
+            self._store(key, entry)
+            with self._lock:
+                self._stats["redis_hits"] += 1
+            return entry[0]
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def set(self, key: str, record: Any) -> None:
+        """Store a record; each field expires its own TTL from now."""
+        entry = (record, time.time())
+        self._store(key, entry)
+        self._redis_set(key, entry)
+        with self._lock:
+            self._stats["sets"] += 1
+
+    def peek(self, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Return (record, expires_at) for `key` even if fields have expired,
+        where expires_at is the earliest field expiry. Used to serve stale
+        data while a refresh runs; does not count towards hit/miss stats.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            entry = self._redis_get(key)
+        if entry is None:
+            return None
+        record, stored_at = entry
+        return record, stored_at + self._record_ttl
+
+    def clear(self) -> None:
+        """Drop every in-process entry (the Redis tier is left untouched)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and sizing for health reporting."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["memory_hits"] + stats["redis_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["redis_hits"]) / lookups, 3) if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["redis"] = "connected" if self._redis is not None else "not_configured"
+        return stats
+
+    def _store(self, key: str, entry: Tuple[Any, float]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    def _redis_get(self, key: str) -> Optional[Tuple[Any, float]]:
+        if self._redis is None:
+            return None
+        try:
+            raw = self._redis.get(self._redis_key(key))
+        except Exception as e:
+            self._redis_error(e)
+            return None
+        if raw is None:
+            return None
+        payload = json.loads(raw)
+        values = {name: payload["record"].get(name) for name in self.field_ttls}
+        return self.record_type(**values), payload["stored_at"]
+
+    def _redis_set(self, key: str, entry: Tuple[Any, float]) -> None:
+        if self._redis is None:
+            return
+        record, stored_at = entry
+        payload = {"stored_at": stored_at, "record": {name: getattr(record, name) for name in self.field_ttls}}
+        ttl = stored_at + max(self.field_ttls.values()) - time.time()
+        try:
+            self._redis.set(self._redis_key(key), json.dumps(payload), ex=max(1, int(ttl)))
+        except Exception as e:
+            self._redis_error(e)
+
+    def _redis_error(self, error: Exception) -> None:
+        with self._lock:
+            self._stats["redis_errors"] += 1
+            first_error = self._stats["redis_errors"] == 1
+        if first_error:
+            print(f"⚠️  Redis cache error ({self.name}): {error}")
+
+
+class TTLCache:
+    """
+    In-process LRU cache whose entries expire `ttl` seconds after being set.
+    Used for derived values (e.g. LLM rationales) that are cheap to store
+    but expensive to recompute.
+    """
+
+    def __init__(self, name: str, ttl: float, max_entries: int = 512):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+                del self._entries[key]
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value, evicting the least recently used entries past capacity."""
+        with self._lock:
+            self._entries[key] = (value, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            self._stats["sets"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def delete(self, key: str) -> None:
+        """Drop one entry if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and sizing for health reporting."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        return stats
+
+
+def connect_redis(redis_url: str):
+    """Connect to Redis, returning None if the client or server is unavailable."""
+    try:
+        import redis
+        client = redis.Redis.from_url(redis_url, socket_timeout=0.25, socket_connect_timeout=0.25)
+        client.ping()
+        return client
+    except Exception as e:
+        print(f"⚠️  Redis cache unavailable, using in-process cache only: {e}")
+        return None
+
@@ -0,0 +1,227 @@
+"""
+Data Source Gateway - Rate limiting and circuit breaking for upstream calls
+Every Yahoo Finance request goes through one gateway, which combines:
+  - an adaptive token bucket: requests wait briefly for a token; the rate
+    halves when the source throttles us and creeps back up on success
+  - a circuit breaker: after consecutive failures the source is marked
+    open and calls fail immediately; after a cool-down one probe call is
+    let through (half-open), closing the breaker again if it succeeds
+
+Callers catch SourceUnavailable and fall back to cached or stale data, so
+during an upstream incident requests run at cache speed instead of each
+waiting out its own timeout.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+
+class SourceUnavailable(Exception):
+    """Raised without calling upstream when the breaker is open or no rate-limit token is free."""
+
+
+class TokenBucket:
+    """Token bucket with an adjustable refill rate (tokens per second)."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float = 0.0) -> bool:
+        """
+        Take one token, waiting up to `timeout` seconds for it to refill.
+        Waiters reserve tokens in arrival order (the balance goes negative)
+        and sleep until theirs is due, so later callers cannot starve them.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1.0 - self._tokens) / self.rate)
+            if wait > timeout:
+                return False
+            self._tokens -= 1.0
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def set_rate(self, rate: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.rate = rate
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half_open once `reset_timeout` has passed, admitting one probe;
+    half_open -> closed if the probe succeeds, or back to open (with the
+    cool-down doubled, up to `max_reset_timeout`) if it fails.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, max_reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now (claims the probe slot when half-open)."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                print(f"✅ Circuit closed after successful probe")
+            self.state = "closed"
+            self._failures = 0
+            self._probing = False
+            self.reset_timeout = self.base_reset_timeout
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open":
+                self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+                self._open()
+            elif self.state == "closed" and self._failures >= self.failure_threshold:
+                self._open()
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe slot claimed by allow() without calling upstream."""
+        with self._lock:
+            self._probing = False
+
+    def retry_in(self) -> float:
+        """Seconds until the next probe is allowed (0 when closed)."""
+        with self._lock:
+            if self.state == "closed":
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def _open(self) -> None:
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self._probing = False
+        print(f"🔌 Circuit open after {self._failures} consecutive failures, probing again in {self.reset_timeout:.0f}s")
+
+
+class DataSourceGateway:
+    """Rate-limited, circuit-broken access to one upstream data source."""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: float,
+        max_wait: float,
+        failure_threshold: int,
+        reset_timeout: float,
+        max_reset_timeout: float = 300.0,
+        min_rate: float = 0.2,
+        throttle_errors: Tuple[Type[BaseException], ...] = ()
+    ):
+        self.name = name
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.max_wait = max_wait
+        self.throttle_errors = throttle_errors
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout, max_reset_timeout)
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "failures": 0, "throttled": 0, "rejected_open": 0, "rejected_rate": 0}
+
+    def available(self) -> bool:
+        """False while the breaker is open and not yet due for a probe."""
+        return self.breaker.state == "closed" or self.breaker.retry_in() == 0.0
+
+    def call(self, fn: Callable[..., Any], *args, wait: Optional[float] = None) -> Any:
+        """
+        Run `fn(*args)` against the source, or raise SourceUnavailable at
+        once if the breaker is open or no token frees up within `wait`
+        seconds (default `max_wait`; batch jobs may pass a longer wait).
+        """
+        if not self.breaker.allow():
+            self._count("rejected_open")
+            raise SourceUnavailable(f"{self.name} circuit open, retry in {self.breaker.retry_in():.0f}s")
+        if not self.bucket.acquire(self.max_wait if wait is None else wait):
+            self.breaker.release_probe()  # the probe never ran; let the next call take it
+            self._count("rejected_rate")
+            raise SourceUnavailable(f"{self.name} rate limit reached ({self.bucket.rate:.1f}/s)")
+
+        self._count("calls")
+        try:
+            result = fn(*args)
+        except Exception as e:
+            self._count("failures")
+            if _is_throttle(e, self.throttle_errors):
+                self._count("throttled")
+                self.bucket.set_rate(max(self.min_rate, self.bucket.rate / 2))
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        if self.bucket.rate < self.max_rate:
+            self.bucket.set_rate(min(self.max_rate, self.bucket.rate + self.max_rate / 20))
+        return result
+
+    def reset(self) -> None:
+        """Close the breaker, refill the bucket at full rate and zero the counters."""
+        self.bucket = TokenBucket(self.max_rate, self.bucket.capacity)
+        self.breaker = CircuitBreaker(
+            self.breaker.failure_threshold, self.breaker.base_reset_timeout, self.breaker.max_reset_timeout
+        )
+        with self._lock:
+            self._stats = dict.fromkeys(self._stats, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["state"] = self.breaker.state
+        stats["retry_in_seconds"] = round(self.breaker.retry_in(), 1)
+        stats["rate_per_second"] = round(self.bucket.rate, 2)
+        return stats
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+
+def _is_throttle(error: Exception, throttle_errors: Tuple[Type[BaseException], ...]) -> bool:
+    if throttle_errors and isinstance(error, throttle_errors):
+        return True
+    text = str(error)
+    return "429" in text or "Too Many Requests" in text or "Rate limited" in text
+
+
+def gateway_samples(gateway: DataSourceGateway) -> list:
+    """Collector samples (see config.metrics.register_collector) for a gateway."""
+    stats = gateway.stats()
+    labels = {"source": gateway.name}
+    samples = [
+        (f"portfolio_source_{key}_total", labels, stats[key])
+        for key in ("calls", "failures", "throttled", "rejected_open", "rejected_rate")
+    ]
+    samples.append(("portfolio_source_circuit_open", labels, 0 if stats["state"] == "closed" else 1))
+    samples.append(("portfolio_source_rate_per_second", labels, stats["rate_per_second"]))
+    return samples
@@ -1,167 +1,538 @@
 """
-Market Data Tools - Yahoo Finance Integration
-Free market data and peer discovery.
+Market Data Tools - Cached market data and peer discovery
+Stock info comes from the provider selected by MARKET_DATA_PROVIDER
+(see tools/providers/; Yahoo Finance by default).
 """
 
-import yfinance as yf
+import asyncio
+import dataclasses
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
 from typing import Dict, List, Optional
-import pandas as pd
+import numpy as np
 
-def get_stock_info(ticker: str) -> Dict:
-    """Get comprehensive stock information from Yahoo Finance."""
+from config.metrics import cache_samples, increment, register_collector, time_stage
+from tools.cache import FieldTTLCache
+from tools.gateway import DataSourceGateway, SourceUnavailable, gateway_samples
+from tools.providers import format_market_cap, get_provider
+from tools.records import SCORE_METRICS, StockRecord
+from tools.scoring import calculate_fundamental_score, calculate_fundamental_scores
+from tools.singleflight import SingleFlight
+from tools.snapshot import DEFAULT_SNAPSHOT_PATH, UniverseSnapshot, load_snapshot
+
+# Fan-out settings for concurrent fetches. The pool is shared by every request
+# so a burst of portfolio generations cannot open unbounded Yahoo connections.
+FETCH_MAX_WORKERS = int(os.getenv("MARKET_DATA_MAX_WORKERS", "8"))
+FETCH_TIMEOUT_SECONDS = float(os.getenv("MARKET_DATA_TIMEOUT_SECONDS", "8"))
+
+_fetch_executor = ThreadPoolExecutor(
+    max_workers=FETCH_MAX_WORKERS,
+    thread_name_prefix="market-data"
+)
+
+# Per-field cache TTLs (seconds). Identity fields barely change, fundamentals
+# move with quarterly reports, and price-driven fields go stale in minutes.
+STATIC_TTL_SECONDS = float(os.getenv("MAX_CACHE_TTL_SECONDS", "604800"))
+FUNDAMENTALS_TTL_SECONDS = float(os.getenv("FUNDAMENTALS_CACHE_TTL_SECONDS", "21600"))
+PRICE_TTL_SECONDS = float(os.getenv("PRICE_CACHE_TTL_SECONDS", "300"))
+
+STOCK_INFO_FIELD_TTLS = {
+    "ticker": STATIC_TTL_SECONDS,
+    "company_name": STATIC_TTL_SECONDS,
+    "sector": STATIC_TTL_SECONDS,
+    "industry": STATIC_TTL_SECONDS,
+    "profit_margin": FUNDAMENTALS_TTL_SECONDS,
+    "debt_to_equity": FUNDAMENTALS_TTL_SECONDS,
+    "revenue_growth": FUNDAMENTALS_TTL_SECONDS,
+    "earnings_growth": FUNDAMENTALS_TTL_SECONDS,
+    "price": PRICE_TTL_SECONDS,
+    "market_cap": PRICE_TTL_SECONDS,
+    "market_cap_formatted": PRICE_TTL_SECONDS,
+    "pe_ratio": PRICE_TTL_SECONDS,
+}
+
+_stock_info_cache = FieldTTLCache(
+    name="stock_info",
+    record_type=StockRecord,
+    field_ttls=STOCK_INFO_FIELD_TTLS,
+    default_ttl=PRICE_TTL_SECONDS,
+    max_entries=int(os.getenv("STOCK_INFO_CACHE_SIZE", "2048")),
+    redis_url=os.getenv("REDIS_URL")
+)
+
+register_collector(lambda: cache_samples("stock_info", _stock_info_cache.stats()))
+
+# Concurrent cache misses for one ticker share a single provider fetch
+_stock_info_flight = SingleFlight("stock_info")
+
+# Stale-while-revalidate: expired entries are still served for this long
+# while a background refresh fetches new data. Access counts (decayed by
+# the refresher, see tools/refresher.py) decide which tickers stay warm.
+STALE_GRACE_SECONDS = float(os.getenv("STALE_WHILE_REVALIDATE_SECONDS", "3600"))
+
+_access_counts: Dict[str, float] = {}
+_access_lock = threading.Lock()
+_refreshing = set()
+
+# Nightly universe snapshot (see tools/snapshot.py), served before Yahoo
+SNAPSHOT_PATH = os.getenv("UNIVERSE_SNAPSHOT_PATH", DEFAULT_SNAPSHOT_PATH)
+SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv("SNAPSHOT_MAX_AGE_SECONDS", "172800"))
+SNAPSHOT_RELOAD_CHECK_SECONDS = 60
+
+_snapshot: Optional[UniverseSnapshot] = None
+_snapshot_mtime: Optional[float] = None
+_snapshot_checked_at = 0.0
+_snapshot_lock = threading.Lock()
+
+# Market data source (tools/providers/). Remote providers are called through
+# one rate-limited, circuit-broken gateway (see tools/gateway.py); while it
+# is open, fetches fail fast and callers are served cached, stale or
+# snapshot data flagged via StockRecord.data_status.
+provider = get_provider()
+
+source_gateway = DataSourceGateway(
+    name=provider.name,
+    rate=float(os.getenv("YAHOO_RATE_LIMIT_PER_SECOND", "10")),
+    burst=float(os.getenv("YAHOO_RATE_LIMIT_BURST", "20")),
+    max_wait=float(os.getenv("YAHOO_RATE_LIMIT_MAX_WAIT_SECONDS", "2")),
+    failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5")),
+    reset_timeout=float(os.getenv("CIRCUIT_RESET_SECONDS", "30")),
+    throttle_errors=getattr(provider, "throttle_errors", ())
+)
+
+register_collector(lambda: gateway_samples(source_gateway))
+
+# Curated peer groups by sector
+SECTOR_PEERS = {
+    "Technology": ["AAPL", "MSFT", "GOOGL", "META", "NVDA", "AMD", "INTC", "AVGO", "ORCL", "CRM"],
+    "Financial Services": ["JPM", "BAC", "WFC", "GS", "MS", "C", "SCHW", "BLK"],
+    "Communication Services": ["GOOGL", "META", "DIS", "NFLX", "CMCSA", "T", "VZ"],
+    "Consumer Cyclical": ["AMZN", "TSLA", "HD", "NKE", "MCD", "SBUX", "TGT"],
+    "Healthcare": ["JNJ", "UNH", "PFE", "ABBV", "TMO", "MRK", "ABT", "DHR"],
+    "Consumer Defensive": ["PG", "KO", "PEP", "WMT", "COST", "PM", "MO"],
+    "Industrials": ["BA", "HON", "UPS", "CAT", "GE", "MMM", "LMT"],
+    "Energy": ["XOM", "CVX", "COP", "SLB", "EOG", "MPC"],
+    "Real Estate": ["AMT", "PLD", "CCI", "EQIX", "PSA", "SPG"],
+    "Utilities": ["NEE", "DUK", "SO", "D", "AEP"],
+    "Basic Materials": ["LIN", "APD", "ECL", "DD", "NEM"]
+}
+
+# Fintech names are peered with each other plus traditional brokers/banks
+FINTECH_PEERS = ["HOOD", "COIN", "SOFI", "SQ", "PYPL", "AFRM"]
+FINTECH_TRADITIONAL_PEERS = ["SCHW", "MS", "GS"]
+FALLBACK_PEERS = ["SPY", "QQQ", "AAPL", "MSFT", "GOOGL"]
+
+SECTOR_ETFS = {
+    "Technology": "XLK",
+    "Financial Services": "XLF",
+    "Healthcare": "XLV",
+    "Energy": "XLE",
+    "Consumer Cyclical": "XLY",
+    "Consumer Defensive": "XLP",
+    "Industrials": "XLI",
+    "Real Estate": "XLRE",
+    "Utilities": "XLU",
+    "Basic Materials": "XLB",
+    "Communication Services": "XLC"
+}
+DEFAULT_ETF = "SPY"
+
+def get_universe_tickers(extra: Optional[List[str]] = None) -> List[str]:
+    """
+    Every ticker peer discovery can return, plus the sector ETFs.
+    The universe is extended by `extra` and the comma-separated
+    UNIVERSE_EXTRA_TICKERS environment variable.
+    """
+    tickers = [t for peers in SECTOR_PEERS.values() for t in peers]
+    tickers += FINTECH_PEERS + FINTECH_TRADITIONAL_PEERS + FALLBACK_PEERS
+    tickers += list(SECTOR_ETFS.values()) + [DEFAULT_ETF]
+    tickers += [t.strip().upper() for t in os.getenv("UNIVERSE_EXTRA_TICKERS", "").split(",") if t.strip()]
+    tickers += [t.upper() for t in extra or []]
+    return list(dict.fromkeys(tickers))
+
+def get_stock_info(ticker: str) -> StockRecord:
+    """
+    Get comprehensive stock information from the market data provider.
+    Read-through cached. The record may be shared with the cache, so treat
+    it as read-only (copy.copy it before changing fields).
+    Concurrent misses for the same ticker are coalesced into one fetch.
+    Recently expired entries are served stale while a background refresh runs.
+    """
+    _record_access(ticker)
+    
+    info, stale, snapshot = _lookup_stock_info(ticker)
+    if info is not None:
+        return info
+    
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        
-        # Get market cap - try multiple fields
-        market_cap = info.get("marketCap", 0)
-        if market_cap == 0 or market_cap is None:
-            market_cap = info.get("market_cap", 0)
-        
-        # Format it immediately
-        market_cap_formatted = format_market_cap(market_cap) if market_cap else "N/A"
-        
-        return {
-            "ticker": ticker,
-            "company_name": info.get("longName", info.get("shortName", ticker)),
-            "sector": info.get("sector", "Unknown"),
-            "industry": info.get("industry", "Unknown"),
-            "market_cap": market_cap,
-            "market_cap_formatted": market_cap_formatted,
-            "price": info.get("currentPrice", info.get("regularMarketPrice", 0)),
-            "pe_ratio": info.get("trailingPE", 0),
-            "profit_margin": info.get("profitMargins", 0),
-            "debt_to_equity": info.get("debtToEquity", 0),
-            "revenue_growth": info.get("revenueGrowth", 0),
-            "earnings_growth": info.get("earningsGrowth", 0),
-        }
+        info = _stock_info_flight.do(ticker, lambda: _fetch_and_cache(ticker))
+    except Exception as e:
+        if not isinstance(e, SourceUnavailable):
+            print(f"Error fetching data for {ticker}: {e}")
+        return _degraded_stock_info(ticker, stale, snapshot)
+    
+    return info
+
+def _lookup_stock_info(ticker: str) -> tuple:
+    """
+    Serve `ticker` without fetching: from the cache, the snapshot, or an
+    entry within the stale grace period (scheduling a refresh).
+    Returns (info or None, the expired cache entry, the snapshot).
+    """
+    cached = _stock_info_cache.get(ticker)
+    if cached is not None:
+        return cached, None, None
+    
+    snapshot = get_snapshot()
+    if snapshot is not None and snapshot.age_seconds() < SNAPSHOT_MAX_AGE_SECONDS:
+        info = snapshot.get(ticker)
+        if info is not None:
+            increment("market_data_snapshot_hits_total")
+            return info, None, snapshot
+    
+    stale = _stock_info_cache.peek(ticker)
+    if stale is not None and time.time() - stale[1] < STALE_GRACE_SECONDS:
+        increment("market_data_stale_served_total")
+        _schedule_refresh(ticker)
+        return stale[0], stale, snapshot
+    
+    return None, stale, snapshot
+
+def _degraded_stock_info(ticker: str, stale, snapshot: Optional[UniverseSnapshot]) -> StockRecord:
+    """
+    Best data available when the fetch failed: an expired cache entry of
+    any age, then an out-of-date snapshot row, both with data_status
+    "stale"; otherwise a stub with data_status "unavailable".
+    """
+    if stale is not None:
+        increment("market_data_degraded_total", status="stale")
+        return dataclasses.replace(stale[0], data_status="stale")
+    
+    record = snapshot.get(ticker) if snapshot is not None else None
+    if record is not None:
+        increment("market_data_degraded_total", status="stale")
+        record.data_status = "stale"
+        return record
+    
+    increment("market_data_degraded_total", status="unavailable")
+    return StockRecord(
+        ticker=ticker,
+        company_name=ticker,
+        sector="Unknown",
+        market_cap=0,
+        market_cap_formatted="N/A",
+        price=0,
+        data_status="unavailable"
+    )
+
+def _fetch_and_cache(ticker: str) -> StockRecord:
+    with time_stage("ticker_fetch"):
+        record = StockRecord.from_info(fetch_stock_info(ticker))
+    _stock_info_cache.set(ticker, record)
+    return record
+
+def refresh_stock_info(ticker: str) -> bool:
+    """Re-fetch `ticker` into the cache, keeping the old entry on failure."""
+    try:
+        _stock_info_flight.do(ticker, lambda: _fetch_and_cache(ticker))
+    except SourceUnavailable:
+        increment("market_data_refreshes_total", result="skipped")
+        return False
     except Exception as e:
-        print(f"Error fetching data for {ticker}: {e}")
-        return {
-            "ticker": ticker,
-            "company_name": ticker,
-            "sector": "Unknown",
-            "market_cap": 0,
-            "market_cap_formatted": "N/A",
-            "price": 0
-        }
-
-def find_sector_peers(ticker: str, limit: int = 10) -> List[str]:
+        increment("market_data_refreshes_total", result="error")
+        print(f"⚠️  Background refresh failed for {ticker}: {e}")
+        return False
+    increment("market_data_refreshes_total", result="ok")
+    return True
+
+async def arefresh_stock_info(ticker: str) -> bool:
+    """Async refresh_stock_info on the shared fetch pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_fetch_executor, refresh_stock_info, ticker)
+
+def get_hot_tickers(limit: int, refresh_ahead: float) -> List[str]:
+    """
+    The most requested tickers whose cache entry is missing or expires
+    within `refresh_ahead` seconds, hottest first.
+    """
+    with _access_lock:
+        ranked = sorted(_access_counts, key=_access_counts.get, reverse=True)
+    
+    now = time.time()
+    hot = []
+    for ticker in ranked:
+        entry = _stock_info_cache.peek(ticker)
+        if entry is None or entry[1] - now < refresh_ahead:
+            hot.append(ticker)
+            if len(hot) >= limit:
+                break
+    return hot
+
+def decay_access_counts(factor: float = 0.5, floor: float = 0.1) -> None:
+    """Age access counts so popularity reflects recent traffic."""
+    with _access_lock:
+        for ticker in list(_access_counts):
+            _access_counts[ticker] *= factor
+            if _access_counts[ticker] < floor:
+                del _access_counts[ticker]
+
+def _record_access(ticker: str) -> None:
+    with _access_lock:
+        _access_counts[ticker] = _access_counts.get(ticker, 0.0) + 1.0
+
+def _schedule_refresh(ticker: str) -> None:
+    """Refresh `ticker` on the fetch pool unless a refresh is already queued."""
+    with _access_lock:
+        if ticker in _refreshing:
+            return
+        _refreshing.add(ticker)
+    
+    def run():
+        try:
+            refresh_stock_info(ticker)
+        finally:
+            with _access_lock:
+                _refreshing.discard(ticker)
+    
+    _fetch_executor.submit(run)
+
+def fetch_stock_info(ticker: str, wait: Optional[float] = None) -> Dict:
+    """
+    Fetch the provider's stock info dict for one ticker (uncached).
+    Remote providers raise SourceUnavailable without being called while the
+    gateway is open, or when no rate-limit token frees up within `wait` seconds.
+    """
+    if not provider.remote:
+        return provider.get_info(ticker)
+    return source_gateway.call(provider.get_info, ticker, wait=wait)
+
+def fetch_many_stock_info(tickers: List[str], wait: Optional[float] = None) -> Dict[str, Dict]:
+    """
+    Fetch many tickers in one provider call (uncached); tickers the source
+    has no data for are left out. Gateway behaviour as for fetch_stock_info.
+    """
+    if not provider.remote:
+        return provider.get_many(tickers)
+    return source_gateway.call(provider.get_many, tickers, wait=wait)
+
+def get_snapshot() -> Optional[UniverseSnapshot]:
+    """
+    The current universe snapshot, if one has been built.
+    Reopened when the nightly job replaces the file.
+    """
+    global _snapshot, _snapshot_mtime, _snapshot_checked_at
+    
+    now = time.time()
+    if now - _snapshot_checked_at < SNAPSHOT_RELOAD_CHECK_SECONDS:
+        return _snapshot
+    
+    with _snapshot_lock:
+        _snapshot_checked_at = now
+        try:
+            mtime = os.path.getmtime(SNAPSHOT_PATH)
+        except OSError:
+            _snapshot, _snapshot_mtime = None, None
+            return None
+        if mtime != _snapshot_mtime:
+            _snapshot = load_snapshot(SNAPSHOT_PATH)
+            _snapshot_mtime = mtime
+            if _snapshot is not None:
+                print(f"📸 Loaded universe snapshot: {len(_snapshot)} tickers")
+    return _snapshot
+
+# Fields that feed scoring and allocation; a change in any of them changes
+# a ticker's fundamentals version (price-driven fields deliberately do not)
+FUNDAMENTAL_FIELDS = ["company_name", "sector", "industry", "profit_margin", "pe_ratio",
+                      "debt_to_equity", "revenue_growth", "earnings_growth"]
+
+def fundamentals_version(record: StockRecord) -> str:
+    """Short fingerprint of the fundamentals in a StockRecord."""
+    values = [getattr(record, field) for field in FUNDAMENTAL_FIELDS]
+    payload = json.dumps(values, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+def get_fundamentals_version(ticker: str) -> Optional[str]:
+    """
+    Fundamentals version of the data get_stock_info would serve for `ticker`
+    right now, without fetching. None when nothing is cached or snapshotted.
+    """
+    entry = _stock_info_cache.peek(ticker)
+    if entry is not None and entry[1] > time.time():
+        return fundamentals_version(entry[0])
+    
+    snapshot = get_snapshot()
+    if snapshot is not None and snapshot.age_seconds() < SNAPSHOT_MAX_AGE_SECONDS:
+        record = snapshot.get(ticker)
+        if record is not None:
+            return fundamentals_version(record)
+    
+    return fundamentals_version(entry[0]) if entry is not None else None
+
+def get_cache_stats() -> Dict:
+    """Hit/miss counters for the market data caches."""
+    snapshot = get_snapshot()
+    return {
+        "stock_info": _stock_info_cache.stats(),
+        "snapshot": {
+            "loaded": snapshot is not None,
+            "tickers": len(snapshot) if snapshot is not None else 0,
+            "age_seconds": round(snapshot.age_seconds()) if snapshot is not None else None
+        },
+        "provider": provider.describe(),
+        "source_gateway": source_gateway.stats()
+    }
+
+def get_many_stock_info(tickers: List[str], timeout: Optional[float] = None) -> Dict[str, StockRecord]:
+    """
+    Fetch stock information for many tickers concurrently.
+    
+    Each ticker is fetched on the shared bounded thread pool. Tickers that have
+    not returned within `timeout` seconds are dropped, so the result is partial
+    rather than stalled by one slow symbol. Input order is preserved.
+    
+    With a bulk-capable provider every cache miss is fetched in one provider
+    call instead (see _get_many_bulk).
+    """
+    if timeout is None:
+        timeout = FETCH_TIMEOUT_SECONDS
+    
+    unique_tickers = list(dict.fromkeys(tickers))
+    if provider.supports_bulk:
+        return _get_many_bulk(unique_tickers, timeout)
+    
+    futures = {_fetch_executor.submit(get_stock_info, t): t for t in unique_tickers}
+    done, not_done = wait(futures, timeout=timeout)
+    
+    results = {}
+    for future in done:
+        ticker = futures[future]
+        try:
+            results[ticker] = future.result()
+        except Exception as e:
+            print(f"Error fetching data for {ticker}: {e}")
+    
+    for future in not_done:
+        future.cancel()
+        increment("market_data_timeouts_total")
+        print(f"⏱️  Timed out fetching {futures[future]} after {timeout}s, skipping")
+    
+    return {t: results[t] for t in unique_tickers if t in results}
+
+def _get_many_bulk(tickers: List[str], timeout: float) -> Dict[str, StockRecord]:
+    """
+    Serve what the cache and snapshot can, then fetch every miss with one
+    provider call. Misses the call does not return (or a failed or timed
+    out call) get the same stale/unavailable fallbacks as get_stock_info.
+    """
+    results = {}
+    misses = {}
+    for ticker in tickers:
+        _record_access(ticker)
+        info, stale, snapshot = _lookup_stock_info(ticker)
+        if info is not None:
+            results[ticker] = info
+        else:
+            misses[ticker] = (stale, snapshot)
+    
+    if misses:
+        future = _fetch_executor.submit(fetch_many_stock_info, list(misses))
+        try:
+            with time_stage("bulk_fetch"):
+                fetched = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            increment("market_data_timeouts_total")
+            print(f"⏱️  Timed out fetching {len(misses)} tickers after {timeout}s")
+            fetched = {}
+        except Exception as e:
+            if not isinstance(e, SourceUnavailable):
+                print(f"Error fetching data for {', '.join(misses)}: {e}")
+            fetched = {}
+        
+        for ticker, (stale, snapshot) in misses.items():
+            info = fetched.get(ticker)
+            if info is None:
+                results[ticker] = _degraded_stock_info(ticker, stale, snapshot)
+            else:
+                record = StockRecord.from_info(info)
+                _stock_info_cache.set(ticker, record)
+                results[ticker] = record
+    
+    return {t: results[t] for t in tickers}
+
+async def aget_stock_info(ticker: str) -> StockRecord:
+    """Async get_stock_info: the blocking fetch runs on the shared pool, off the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_fetch_executor, get_stock_info, ticker)
+
+async def aget_many_stock_info(tickers: List[str], timeout: Optional[float] = None) -> Dict[str, StockRecord]:
+    """
+    Async variant of get_many_stock_info.
+    Each ticker gets its own `timeout`; late or failed tickers are dropped.
+    """
+    if timeout is None:
+        timeout = FETCH_TIMEOUT_SECONDS
+    
+    unique_tickers = list(dict.fromkeys(tickers))
+    if provider.supports_bulk:
+        # Off the fetch pool: _get_many_bulk waits on a fetch it submits there
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, _get_many_bulk, unique_tickers, timeout)
+    
+    results = await asyncio.gather(
+        *(asyncio.wait_for(aget_stock_info(t), timeout) for t in unique_tickers),
+        return_exceptions=True
+    )
+    
+    fetched = {}
+    for ticker, result in zip(unique_tickers, results):
+        if isinstance(result, asyncio.TimeoutError):
+            increment("market_data_timeouts_total")
+            print(f"⏱️  Timed out fetching {ticker} after {timeout}s, skipping")
+        elif isinstance(result, Exception):
+            print(f"Error fetching data for {ticker}: {result}")
+        else:
+            fetched[ticker] = result
+    
+    return fetched
+
+def find_sector_peers(ticker: str, limit: int = 10, stock_info: Optional[StockRecord] = None) -> List[str]:
     """
     Find peer companies in the same sector/industry.
     Uses a curated list of major companies by sector.
+    
+    Pass the target's already-fetched `stock_info` to avoid another lookup;
+    otherwise the sector is resolved through the cached `get_stock_info`.
     """
     try:
-        stock = yf.Ticker(ticker)
-        sector = stock.info.get("sector", "")
-        industry = stock.info.get("industry", "")
-        
-        # Curated peer groups by sector
-        sector_peers = {
-            "Technology": ["AAPL", "MSFT", "GOOGL", "META", "NVDA", "AMD", "INTC", "AVGO", "ORCL", "CRM"],
-            "Financial Services": ["JPM", "BAC", "WFC", "GS", "MS", "C", "SCHW", "BLK"],
-            "Communication Services": ["GOOGL", "META", "DIS", "NFLX", "CMCSA", "T", "VZ"],
-            "Consumer Cyclical": ["AMZN", "TSLA", "HD", "NKE", "MCD", "SBUX", "TGT"],
-            "Healthcare": ["JNJ", "UNH", "PFE", "ABBV", "TMO", "MRK", "ABT", "DHR"],
-            "Consumer Defensive": ["PG", "KO", "PEP", "WMT", "COST", "PM", "MO"],
-            "Industrials": ["BA", "HON", "UPS", "CAT", "GE", "MMM", "LMT"],
-            "Energy": ["XOM", "CVX", "COP", "SLB", "EOG", "MPC"],
-            "Real Estate": ["AMT", "PLD", "CCI", "EQIX", "PSA", "SPG"],
-            "Utilities": ["NEE", "DUK", "SO", "D", "AEP"],
-            "Basic Materials": ["LIN", "APD", "ECL", "DD", "NEM"]
-        }
+        if stock_info is None:
+            # Sector/industry have long TTLs, so this usually avoids a Yahoo call
+            stock_info = _stock_info_cache.get(ticker, fields=("sector", "industry")) or get_stock_info(ticker)
+        sector = stock_info.sector or ""
+        industry = stock_info.industry or ""
         
         # Special case: Fintech companies
-        fintech_tickers = ["HOOD", "COIN", "SOFI", "SQ", "PYPL", "AFRM"]
-        if ticker in fintech_tickers:
-            peers = [t for t in fintech_tickers if t != ticker]
-            peers.extend(["SCHW", "MS", "GS"])  # Add traditional finance
+        if ticker in FINTECH_PEERS:
+            peers = [t for t in FINTECH_PEERS if t != ticker]
+            peers.extend(FINTECH_TRADITIONAL_PEERS)  # Add traditional finance
             return peers[:limit]
         
         # Get peers from sector
-        if sector in sector_peers:
-            peers = [t for t in sector_peers[sector] if t != ticker]
+        if sector in SECTOR_PEERS:
+            peers = [t for t in SECTOR_PEERS[sector] if t != ticker]
             return peers[:limit]
         
         # Fallback: return some large-cap stocks
-        return ["SPY", "QQQ", "AAPL", "MSFT", "GOOGL"][:limit]
+        return FALLBACK_PEERS[:limit]
         
     except Exception as e:
         print(f"Error finding peers for {ticker}: {e}")
         return ["SPY", "QQQ"]
 
-def calculate_fundamental_score(stock_info: Dict) -> float:
-    """
-    Calculate a quality score (1-5) based on fundamentals.
-    Similar to CapitalCube's approach but using available metrics.
-    """
-    score = 3.0  # Start at neutral
-    
-    # Profit margin (higher is better)
-    profit_margin = stock_info.get("profit_margin", 0)
-    if profit_margin > 0.20:
-        score += 0.5
-    elif profit_margin > 0.10:
-        score += 0.3
-    elif profit_margin < 0:
-        score -= 0.5
-    
-    # P/E ratio (reasonable range is good)
-    pe_ratio = stock_info.get("pe_ratio", 0)
-    if 10 < pe_ratio < 25:
-        score += 0.3
-    elif pe_ratio > 50:
-        score -= 0.3
-    
-    # Debt to equity (lower is better)
-    debt_to_equity = stock_info.get("debt_to_equity", 0)
-    if debt_to_equity < 50:
-        score += 0.4
-    elif debt_to_equity > 150:
-        score -= 0.4
-    
-    # Revenue growth (positive is good)
-    revenue_growth = stock_info.get("revenue_growth", 0)
-    if revenue_growth > 0.15:
-        score += 0.4
-    elif revenue_growth < 0:
-        score -= 0.3
-    
-    # Earnings growth
-    earnings_growth = stock_info.get("earnings_growth", 0)
-    if earnings_growth > 0.15:
-        score += 0.3
-    elif earnings_growth < 0:
-        score -= 0.3
-    
-    # Cap between 1.0 and 5.0
-    return max(1.0, min(5.0, round(score, 1)))
-
 def get_sector_etf(sector: str) -> Optional[str]:
     """Get the appropriate sector ETF ticker."""
-    sector_etfs = {
-        "Technology": "XLK",
-        "Financial Services": "XLF",
-        "Healthcare": "XLV",
-        "Energy": "XLE",
-        "Consumer Cyclical": "XLY",
-        "Consumer Defensive": "XLP",
-        "Industrials": "XLI",
-        "Real Estate": "XLRE",
-        "Utilities": "XLU",
-        "Basic Materials": "XLB",
-        "Communication Services": "XLC"
-    }
-    return sector_etfs.get(sector, "SPY")  # Default to S&P 500
-
-def format_market_cap(market_cap: int) -> str:
-    """Format market cap in readable form."""
-    if market_cap >= 1_000_000_000_000:
-        return f"${market_cap / 1_000_000_000_000:.1f}T"
-    elif market_cap >= 1_000_000_000:
-        return f"${market_cap / 1_000_000_000:.1f}B"
-    elif market_cap >= 1_000_000:
-        return f"${market_cap / 1_000_000:.1f}M"
-    else:
-        return f"${market_cap:,.0f}"
-
+    return SECTOR_ETFS.get(sector, DEFAULT_ETF)  # Default to S&P 500
@@ -0,0 +1,242 @@
+"""
+Portfolio Optimizer - Mean-variance strategies over historical returns
+Minimum-variance and maximum-Sharpe weights for a scored peer set, using a
+Ledoit-Wolf shrunk covariance estimated from the local price store
+(PRICE_HISTORY_PATH, see tools/backtest.py).
+
+The covariance and its Cholesky factor are cached per peer group, so
+repeated requests for the same sector reuse them instead of re-estimating
+and re-factorizing. Weights respect the same per-holding caps and ETF
+sleeve as the heuristic presets in tools/allocation_engine.py.
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.metrics import cache_samples, register_collector
+from tools.cache import TTLCache
+
+STRATEGIES = ("heuristic", "min_variance", "max_sharpe")
+
+TRADING_DAYS = 252
+LOOKBACK_DAYS = int(os.getenv("OPTIMIZER_LOOKBACK_DAYS", "756"))
+MIN_OBSERVATIONS = 60
+PROJECTED_STEPS = 500
+
+_covariance_cache = TTLCache(
+    name="covariance",
+    ttl=float(os.getenv("COVARIANCE_CACHE_TTL_SECONDS", "86400")),
+    max_entries=128
+)
+
+register_collector(lambda: cache_samples("covariance", _covariance_cache.stats()))
+
+_prices = None
+_prices_key = None
+_prices_lock = threading.Lock()
+
+
+class InsufficientHistory(ValueError):
+    """Raised when the price store cannot support an estimate for a peer group."""
+
+
+def shrunk_covariance(returns: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Ledoit-Wolf covariance of (days, assets) returns, shrunk towards a
+    scaled identity. Returns (covariance, shrinkage intensity).
+    """
+    days, n = returns.shape
+    centered = returns - returns.mean(axis=0)
+    sample = centered.T @ centered / days
+
+    mu = np.trace(sample) / n
+    target = mu * np.eye(n)
+    d2 = np.sum((sample - target) ** 2)
+    # Average squared distance of each day's outer product from the sample
+    b2_bar = (np.sum(np.sum(centered ** 2, axis=1) ** 2) / days - np.sum(sample ** 2)) / days
+    b2 = min(b2_bar, d2)
+    shrinkage = b2 / d2 if d2 > 0 else 1.0
+    return shrinkage * target + (1.0 - shrinkage) * sample, float(shrinkage)
+
+
+def get_covariance_model(tickers: List[str]) -> Dict:
+    """
+    Annualized expected returns, shrunk covariance and the inverse of its
+    Cholesky factor for `tickers`, cached per peer group and price store version.
+    """
+    prices, version = _load_prices()
+    key = f"{version}:{LOOKBACK_DAYS}:{','.join(sorted(tickers))}"
+    model = _covariance_cache.get(key)
+    if model is None:
+        model = _build_model(prices, sorted(tickers))
+        _covariance_cache.set(key, model)
+
+    order = [model["tickers"].index(t) for t in tickers]
+    return {
+        "tickers": list(tickers),
+        "mu": model["mu"][order],
+        "cov": model["cov"][np.ix_(order, order)],
+        "chol_inv": model["chol_inv"],
+        "order": order,
+        "max_eigenvalue": model["max_eigenvalue"]
+    }
+
+
+def optimize_weights(
+    strategy: str,
+    tickers: List[str],
+    budget: float = 1.0,
+    max_weight: float = 1.0
+) -> np.ndarray:
+    """
+    Long-only weights for `tickers` summing to `budget`, each at most
+    `max_weight`. The unconstrained closed form (via the cached factor) is
+    used when it already satisfies the caps; otherwise projected gradient
+    descent on the capped simplex.
+    """
+    if strategy not in ("min_variance", "max_sharpe"):
+        raise ValueError(f"Unknown optimizer strategy: {strategy}")
+
+    model = get_covariance_model(tickers)
+    cov, mu = model["cov"], model["mu"]
+    max_weight = max(max_weight, budget / len(tickers))  # keep the problem feasible
+
+    target = np.ones(len(tickers)) if strategy == "min_variance" else mu
+    direction = _solve(model, target)
+    if direction.sum() > 0:
+        closed_form = direction * budget / direction.sum()
+        if np.all(closed_form >= -1e-12) and np.all(closed_form <= max_weight + 1e-12):
+            return np.clip(closed_form, 0.0, None)
+
+    if strategy == "min_variance":
+        objective = lambda w: w @ cov @ w
+        gradient = lambda w: 2.0 * cov @ w
+        step = 0.5 / model["max_eigenvalue"]  # 1/L for the quadratic
+    else:
+        objective = lambda w: -(mu @ w) / np.sqrt(w @ cov @ w)
+        gradient = lambda w: -(mu * (w @ cov @ w) - (mu @ w) * (cov @ w)) / (w @ cov @ w) ** 1.5
+        step = 1.0
+
+    weights = project_capped_simplex(np.full(len(tickers), budget / len(tickers)), budget, max_weight)
+    current = objective(weights)
+    for _ in range(PROJECTED_STEPS):
+        candidate = project_capped_simplex(weights - step * gradient(weights), budget, max_weight)
+        value = objective(candidate)
+        if value < current - 1e-14:
+            converged = np.abs(candidate - weights).max() < 1e-9
+            weights, current = candidate, value
+            if converged:
+                break
+        else:
+            step /= 2  # backtrack
+            if step < 1e-12:
+                break
+    return weights
+
+
+def optimize_allocation(
+    strategy: str,
+    preset_name: str,
+    allocations: List[Tuple[str, float]],
+    etf_ticker: Optional[str] = None
+) -> List[Tuple[str, float]]:
+    """
+    Re-weight a preset's allocation with `strategy`: the same holdings and
+    ETF sleeve, with the stock weights chosen by the optimizer under the
+    preset's per-holding cap. Raises InsufficientHistory when the price
+    store cannot cover the holdings.
+    """
+    from tools.allocation_engine import PRESETS
+
+    stocks = [(t, w) for t, w in allocations if t != etf_ticker]
+    if len(stocks) < 2:
+        return allocations
+
+    preset = PRESETS[preset_name]
+    max_weight = preset.get("max_weight") or max(preset.get("rank_weights", (1.0,)))
+    tickers = [t for t, _ in stocks]
+    weights = optimize_weights(strategy, tickers, sum(w for _, w in stocks), max_weight)
+    optimized = dict(zip(tickers, weights))
+
+    return [
+        (t, float(optimized[t]) if t in optimized else w)
+        for t, w in allocations
+        if t not in optimized or optimized[t] > 1e-6
+    ]
+
+
+def project_capped_simplex(values: np.ndarray, budget: float, cap: float, iterations: int = 60) -> np.ndarray:
+    """Euclidean projection onto {w : sum(w) = budget, 0 <= w <= cap} by bisection."""
+    low, high = values.min() - cap, values.max()
+    for _ in range(iterations):
+        tau = (low + high) / 2
+        if np.clip(values - tau, 0.0, cap).sum() > budget:
+            low = tau
+        else:
+            high = tau
+    return np.clip(values - (low + high) / 2, 0.0, cap)
+
+
+def _solve(model: Dict, target: np.ndarray) -> np.ndarray:
+    """cov^-1 @ target using the cached inverse Cholesky factor (O(n^2))."""
+    order = model["order"]
+    inverse = model["chol_inv"]
+    permuted = np.zeros(len(inverse))
+    permuted[order] = target
+    solution = inverse.T @ (inverse @ permuted)
+    return solution[order]
+
+
+def _build_model(prices, tickers: List[str]) -> Dict:
+    missing = [t for t in tickers if t not in prices.columns]
+    if missing:
+        raise InsufficientHistory(f"No price history for: {', '.join(missing)}")
+
+    window = prices[tickers].ffill().iloc[-(LOOKBACK_DAYS + 1):]
+    returns = window.pct_change(fill_method=None).iloc[1:].dropna().to_numpy()
+    if len(returns) < MIN_OBSERVATIONS:
+        raise InsufficientHistory(
+            f"Only {len(returns)} overlapping days of history for {', '.join(tickers)}"
+        )
+
+    cov, shrinkage = shrunk_covariance(returns)
+    cov *= TRADING_DAYS
+    chol = np.linalg.cholesky(cov)
+    return {
+        "tickers": tickers,
+        "mu": returns.mean(axis=0) * TRADING_DAYS,
+        "cov": cov,
+        "chol_inv": np.linalg.inv(chol),
+        "max_eigenvalue": float(np.linalg.eigvalsh(cov)[-1]),
+        "shrinkage": shrinkage,
+        "observations": len(returns)
+    }
+
+
+def price_store_version() -> Optional[str]:
+    """Path and mtime of the price store, or None when there is none."""
+    from tools.backtest import PRICE_HISTORY_PATH
+
+    try:
+        return f"{PRICE_HISTORY_PATH}@{os.path.getmtime(PRICE_HISTORY_PATH)}"
+    except OSError:
+        return None
+
+
+def _load_prices():
+    """The price store, reloaded only when the file changes."""
+    global _prices, _prices_key
+    from tools.backtest import PRICE_HISTORY_PATH, load_prices
+
+    version = price_store_version()
+    if version is None:
+        raise InsufficientHistory(f"No price store at {PRICE_HISTORY_PATH}")
+
+    with _prices_lock:
+        if _prices_key != version:
+            _prices = load_prices(PRICE_HISTORY_PATH)
+            _prices_key = version
+        return _prices, version
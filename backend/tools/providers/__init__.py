@@ -0,0 +1,46 @@
+"""
+Market data providers. MARKET_DATA_PROVIDER picks the source behind
+tools/market_data.py: "yfinance" (default) or "local".
+"""
+
+import os
+from typing import Optional
+
+from .base import MarketDataProvider, ProviderError, TickerNotFound, format_market_cap
+
+DEFAULT_PROVIDER = "yfinance"
+PROVIDER_NAMES = ("yfinance", "local")
+
+
+def get_provider(name: Optional[str] = None) -> MarketDataProvider:
+    """
+    Build the provider called `name` (default: MARKET_DATA_PROVIDER).
+    Falls back to yfinance when the requested provider cannot be configured
+    (e.g. the local provider's file does not exist).
+    Provider modules are imported on demand, so yfinance is only loaded when used.
+    """
+    name = (name or os.getenv("MARKET_DATA_PROVIDER", DEFAULT_PROVIDER)).lower()
+    if name not in PROVIDER_NAMES:
+        print(f"⚠️  Unknown market data provider '{name}', using {DEFAULT_PROVIDER}")
+        name = DEFAULT_PROVIDER
+
+    try:
+        if name == "local":
+            from .local import LocalFileProvider
+            return LocalFileProvider()
+    except ProviderError as e:
+        print(f"⚠️  Market data provider '{name}' unavailable ({e}), using {DEFAULT_PROVIDER}")
+
+    from .yahoo import YFinanceProvider
+    return YFinanceProvider()
+
+
+__all__ = [
+    "MarketDataProvider",
+    "ProviderError",
+    "TickerNotFound",
+    "format_market_cap",
+    "get_provider",
+    "DEFAULT_PROVIDER",
+    "PROVIDER_NAMES",
+]
@@ -0,0 +1,64 @@
+"""
+Market Data Provider - Base interface for fundamentals sources
+A provider turns tickers into stock info dicts with the StockRecord fields
+(ticker, company_name, sector, industry, market_cap, market_cap_formatted,
+price, pe_ratio, profit_margin, debt_to_equity, revenue_growth,
+earnings_growth); market_data converts each into a StockRecord.
+"""
+
+from typing import Dict, List
+
+
+def format_market_cap(market_cap: int) -> str:
+    """Format market cap in readable form."""
+    if market_cap >= 1_000_000_000_000:
+        return f"${market_cap / 1_000_000_000_000:.1f}T"
+    elif market_cap >= 1_000_000_000:
+        return f"${market_cap / 1_000_000_000:.1f}B"
+    elif market_cap >= 1_000_000:
+        return f"${market_cap / 1_000_000:.1f}M"
+    else:
+        return f"${market_cap:,.0f}"
+
+
+class ProviderError(Exception):
+    """Raised when a provider is misconfigured or cannot serve a request."""
+
+
+class TickerNotFound(LookupError):
+    """Raised by get_info when the source has no data for a ticker."""
+
+
+class MarketDataProvider:
+    """
+    Base class for market data sources.
+
+    Subclasses implement get_info; bulk-capable sources also override
+    get_many and set `supports_bulk`, so market_data answers a whole peer
+    set with one call instead of one call per ticker. `remote` providers
+    are called through the rate-limited gateway (tools/gateway.py).
+    """
+    name = "base"
+    remote = False
+    supports_bulk = False
+
+    def get_info(self, ticker: str) -> Dict:
+        """Stock info for one ticker; raises TickerNotFound or a source error."""
+        raise NotImplementedError
+
+    def get_many(self, tickers: List[str]) -> Dict[str, Dict]:
+        """
+        Stock info for many tickers, keyed by ticker in input order.
+        Tickers the source has no data for are left out.
+        """
+        results = {}
+        for ticker in tickers:
+            try:
+                results[ticker] = self.get_info(ticker)
+            except TickerNotFound:
+                continue
+        return results
+
+    def describe(self) -> Dict:
+        """Provider summary for /health."""
+        return {"name": self.name, "remote": self.remote, "bulk": self.supports_bulk}
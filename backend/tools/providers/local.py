@@ -0,0 +1,144 @@
+"""
+Local File Provider - Fundamentals from a CSV or Parquet file
+Serves stock info from a local table (MARKET_DATA_FILE), for offline
+operation, tests and bulk data sources delivered as files. One row per
+ticker, with columns named after the stock info keys; only `ticker` is
+required. The file is re-read when it changes on disk.
+
+Export the current data for the universe (run inside backend/):
+    python -m tools.providers.local --out data/fundamentals.csv --extra TSLA,PLTR
+"""
+
+import argparse
+import os
+import threading
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from tools.providers.base import MarketDataProvider, ProviderError, TickerNotFound, format_market_cap
+
+DEFAULT_MARKET_DATA_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "data",
+    "fundamentals.parquet"
+)
+
+TEXT_COLUMNS = ["company_name", "sector", "industry", "market_cap_formatted"]
+NUMERIC_COLUMNS = ["price", "pe_ratio", "profit_margin", "debt_to_equity", "revenue_growth", "earnings_growth"]
+
+
+class LocalFileProvider(MarketDataProvider):
+    """CSV/Parquet fundamentals table; a whole peer set is one in-memory lookup."""
+    name = "local"
+    remote = False
+    supports_bulk = True
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("MARKET_DATA_FILE", DEFAULT_MARKET_DATA_FILE)
+        self._rows: Dict[str, Dict] = {}
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        # Fail here, so get_provider falls back, rather than on every lookup
+        self._load()
+
+    def get_info(self, ticker: str) -> Dict:
+        info = self._load().get(ticker.upper())
+        if info is None:
+            raise TickerNotFound(f"{ticker} not in {self.path}")
+        return dict(info, ticker=ticker)
+
+    def get_many(self, tickers: List[str]) -> Dict[str, Dict]:
+        rows = self._load()
+        return {t: dict(rows[t.upper()], ticker=t) for t in tickers if t.upper() in rows}
+
+    def describe(self) -> Dict:
+        return {**super().describe(), "path": self.path, "tickers": len(self._rows)}
+
+    def _load(self) -> Dict[str, Dict]:
+        """The table keyed by ticker, re-read only when the file changes."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            raise ProviderError(f"No market data file at {self.path}")
+
+        with self._lock:
+            if mtime != self._mtime:
+                try:
+                    self._rows = _read_rows(self.path)
+                except ProviderError:
+                    raise
+                except Exception as e:
+                    raise ProviderError(f"Could not read {self.path}: {e}")
+                self._mtime = mtime
+                print(f"📂 Loaded {len(self._rows)} tickers from {self.path}")
+            return self._rows
+
+
+def _read_rows(path: str) -> Dict[str, Dict]:
+    """Normalize the table with the same defaults as the Yahoo provider."""
+    frame = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    frame.columns = [str(c).lower() for c in frame.columns]
+    if "ticker" not in frame.columns:
+        raise ProviderError(f"{path} has no ticker column")
+
+    frame["ticker"] = frame["ticker"].astype(str).str.upper()
+    frame = frame.drop_duplicates("ticker", keep="last").set_index("ticker")
+    for column in TEXT_COLUMNS + NUMERIC_COLUMNS + ["market_cap"]:
+        if column not in frame.columns:
+            frame[column] = None
+
+    rows = {}
+    for ticker, row in zip(frame.index, frame.to_dict("records")):
+        market_cap = 0 if pd.isna(row["market_cap"]) else int(row["market_cap"])
+        info = {
+            "ticker": ticker,
+            "company_name": _text(row["company_name"], ticker),
+            "sector": _text(row["sector"], "Unknown"),
+            "industry": _text(row["industry"], "Unknown"),
+            "market_cap": market_cap,
+            "market_cap_formatted": _text(
+                row["market_cap_formatted"],
+                format_market_cap(market_cap) if market_cap else "N/A"
+            ),
+        }
+        info.update({column: 0 if pd.isna(row[column]) else float(row[column]) for column in NUMERIC_COLUMNS})
+        rows[ticker] = info
+    return rows
+
+
+def _text(value, default: str) -> str:
+    return default if value is None or pd.isna(value) or value == "" else str(value)
+
+
+def export_fundamentals(path: str, tickers: List[str]) -> int:
+    """Write stock info for `tickers` (from cache, snapshot or the active provider) to `path`."""
+    from tools.market_data import get_many_stock_info
+
+    infos = [
+        record.to_info() for record in get_many_stock_info(tickers).values()
+        if record.data_status != "unavailable"
+    ]
+    frame = pd.DataFrame(infos).drop(columns=["data_status"], errors="ignore")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if path.endswith(".parquet"):
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_csv(path, index=False)
+    print(f"✅ Wrote {len(frame)} tickers to {path}")
+    return len(frame)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export fundamentals for the local market data provider.")
+    parser.add_argument("--out", default=DEFAULT_MARKET_DATA_FILE, help="Output file (.csv or .parquet)")
+    parser.add_argument("--extra", default="", help="Comma-separated tickers to add to the universe")
+    args = parser.parse_args()
+
+    from tools.market_data import get_universe_tickers
+    extra = [t.strip() for t in args.extra.split(",") if t.strip()]
+    export_fundamentals(args.out, get_universe_tickers(extra))
+
+
+if __name__ == "__main__":
+    main()
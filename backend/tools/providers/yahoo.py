@@ -0,0 +1,54 @@
+"""
+Yahoo Finance Provider - Free fundamentals via yfinance
+One `Ticker(...).info` request per ticker; Yahoo has no bulk fundamentals
+endpoint, so market_data fans these out on its shared fetch pool.
+"""
+
+from typing import Dict
+
+import yfinance as yf
+
+from tools.providers.base import MarketDataProvider, format_market_cap
+
+try:
+    from yfinance.exceptions import YFRateLimitError
+    THROTTLE_ERRORS = (YFRateLimitError,)
+except ImportError:  # yfinance < 0.2.52
+    THROTTLE_ERRORS = ()
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Yahoo Finance via yfinance (rate limited through the gateway)."""
+    name = "yfinance"
+    remote = True
+    supports_bulk = False
+    throttle_errors = THROTTLE_ERRORS
+
+    def get_info(self, ticker: str) -> Dict:
+        return normalize_yahoo_info(ticker, yf.Ticker(ticker).info)
+
+
+def normalize_yahoo_info(ticker: str, info: Dict) -> Dict:
+    """Map a Yahoo `.info` payload onto the stock info keys."""
+    # Get market cap - try multiple fields
+    market_cap = info.get("marketCap", 0)
+    if market_cap == 0 or market_cap is None:
+        market_cap = info.get("market_cap", 0)
+
+    # Format it immediately
+    market_cap_formatted = format_market_cap(market_cap) if market_cap else "N/A"
+
+    return {
+        "ticker": ticker,
+        "company_name": info.get("longName", info.get("shortName", ticker)),
+        "sector": info.get("sector", "Unknown"),
+        "industry": info.get("industry", "Unknown"),
+        "market_cap": market_cap,
+        "market_cap_formatted": market_cap_formatted,
+        "price": info.get("currentPrice", info.get("regularMarketPrice", 0)),
+        "pe_ratio": info.get("trailingPE", 0),
+        "profit_margin": info.get("profitMargins", 0),
+        "debt_to_equity": info.get("debtToEquity", 0),
+        "revenue_growth": info.get("revenueGrowth", 0),
+        "earnings_growth": info.get("earningsGrowth", 0),
+    }
@@ -0,0 +1,134 @@
+"""
+Stock Records - Compact representations of stock fundamentals
+StockRecord is one ticker's fundamentals in a slotted dataclass (no
+per-instance __dict__); StockUniverse holds many tickers as one NumPy
+column per field.
+
+Providers return plain dicts; market_data converts each one into a
+StockRecord once, and its cache, the snapshot lookups and get_stock_info
+hand out records from there. Dicts reappear only at the API boundary
+(to_info).
+"""
+
+from dataclasses import dataclass, fields
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+# Metrics read by calculate_fundamental_score, in column order
+SCORE_METRICS = ["profit_margin", "pe_ratio", "debt_to_equity", "revenue_growth", "earnings_growth"]
+
+
+@dataclass(slots=True)
+class StockRecord:
+    """
+    Fundamentals for one ticker, with the same fields as a provider's stock
+    info dict plus its score. Fields the source did not provide are None.
+    `data_status` is "stale" or "unavailable" on records get_stock_info
+    could not fetch fresh (see market_data._degraded_stock_info).
+    """
+    ticker: str
+    company_name: Optional[str] = None
+    sector: Optional[str] = None
+    industry: Optional[str] = None
+    market_cap: Optional[int] = None
+    market_cap_formatted: Optional[str] = None
+    price: Optional[float] = None
+    pe_ratio: Optional[float] = None
+    profit_margin: Optional[float] = None
+    debt_to_equity: Optional[float] = None
+    revenue_growth: Optional[float] = None
+    earnings_growth: Optional[float] = None
+    score: Optional[float] = None
+    data_status: Optional[str] = None
+
+    @classmethod
+    def from_info(cls, info: Dict) -> "StockRecord":
+        """Record from a stock info dict (extra keys are ignored)."""
+        return cls(*(info.get(name) for name in RECORD_FIELDS), info.get("data_status"))
+
+    def to_info(self) -> Dict:
+        """Stock info dict (without the score), for API responses and exports."""
+        info = {name: getattr(self, name) for name in RECORD_FIELDS if name != "score"}
+        if self.data_status:
+            info["data_status"] = self.data_status
+        return info
+
+    @property
+    def has_fundamentals(self) -> bool:
+        """False for stub records from failed fetches, which carry no scoring metrics."""
+        return all(getattr(self, metric) is not None for metric in SCORE_METRICS)
+
+
+# Data fields, in column order; data_status describes a lookup, not the stock
+RECORD_FIELDS = [f.name for f in fields(StockRecord) if f.name != "data_status"]
+_TEXT_FIELDS = {"ticker", "company_name", "sector", "industry", "market_cap_formatted"}
+
+
+class StockUniverse:
+    """
+    Struct-of-arrays set of stock records: one NumPy column per field.
+    Text columns are fixed-width unicode ("" when missing), market cap is
+    int64 (0 when missing) and other numbers are float64 (NaN when missing).
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.columns = columns
+        self.tickers = columns["ticker"]
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers.tolist())}
+
+    @classmethod
+    def from_records(cls, records: Sequence[StockRecord]) -> "StockUniverse":
+        columns = {}
+        for name in RECORD_FIELDS:
+            values = [getattr(record, name) for record in records]
+            columns[name] = _column(name, values)
+        return cls(columns)
+
+    @classmethod
+    def from_infos(cls, infos: Iterable[Dict]) -> "StockUniverse":
+        infos = list(infos)
+        return cls({name: _column(name, [info.get(name) for info in infos]) for name in RECORD_FIELDS})
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self.index
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def metrics(self) -> Dict[str, np.ndarray]:
+        """Scoring metric columns for calculate_fundamental_scores (missing metrics count as 0)."""
+        return {metric: np.nan_to_num(self.columns[metric], nan=0.0) for metric in SCORE_METRICS}
+
+    def record(self, key: Union[str, int]) -> Optional[StockRecord]:
+        """The record for a ticker (or row index), or None."""
+        i = self.index.get(key) if isinstance(key, str) else key
+        if i is None:
+            return None
+        return StockRecord(*(_to_python(name, self.columns[name][i]) for name in RECORD_FIELDS))
+
+    def records(self) -> List[StockRecord]:
+        return [self.record(i) for i in range(len(self))]
+
+    def take(self, rows: np.ndarray) -> "StockUniverse":
+        """A universe of the given rows (indices or boolean mask)."""
+        return StockUniverse({name: column[rows] for name, column in self.columns.items()})
+
+
+def _column(name: str, values: list) -> np.ndarray:
+    if name in _TEXT_FIELDS:
+        return np.array(["" if v is None else str(v) for v in values], dtype=str)
+    if name == "market_cap":
+        return np.array([v or 0 for v in values], dtype=np.int64)
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+def _to_python(name: str, value):
+    if name in _TEXT_FIELDS:
+        return str(value) or None
+    if name == "market_cap":
+        return int(value)
+    return None if np.isnan(value) else float(value)
@@ -0,0 +1,72 @@
+"""
+Background Refresher - Keeps popular tickers warm
+An asyncio task (started from main.py's startup event) that re-fetches the
+most requested tickers shortly before their cache entries expire, so user
+requests for them are served from cache instead of waiting on Yahoo.
+"""
+
+import asyncio
+import os
+from typing import Optional
+
+from tools.market_data import arefresh_stock_info, decay_access_counts, get_hot_tickers, source_gateway
+
+REFRESH_ENABLED = os.getenv("BACKGROUND_REFRESH_ENABLED", "true").lower() == "true"
+REFRESH_INTERVAL_SECONDS = float(os.getenv("REFRESH_INTERVAL_SECONDS", "30"))
+REFRESH_AHEAD_SECONDS = float(os.getenv("REFRESH_AHEAD_SECONDS", "60"))
+REFRESH_HOT_LIMIT = int(os.getenv("REFRESH_HOT_TICKERS", "50"))
+
+_task: Optional[asyncio.Task] = None
+
+
+async def refresh_hot_tickers() -> int:
+    """
+    Refresh every hot ticker that is about to expire; returns how many succeeded.
+    Skipped while the market data circuit is open (stale entries keep being served).
+    """
+    if not source_gateway.available():
+        return 0
+    tickers = get_hot_tickers(REFRESH_HOT_LIMIT, REFRESH_AHEAD_SECONDS)
+    if not tickers:
+        return 0
+    results = await asyncio.gather(*(arefresh_stock_info(t) for t in tickers))
+    return sum(results)
+
+
+async def _refresh_loop() -> None:
+    while True:
+        await asyncio.sleep(REFRESH_INTERVAL_SECONDS)
+        try:
+            refreshed = await refresh_hot_tickers()
+            if refreshed:
+                print(f"🔄 Refreshed {refreshed} hot tickers")
+        except Exception as e:
+            print(f"⚠️  Background refresh cycle failed: {e}")
+        decay_access_counts()
+
+
+def start_refresher() -> bool:
+    """Start the refresh loop on the running event loop (no-op if disabled or running)."""
+    global _task
+    if not REFRESH_ENABLED:
+        return False
+    if _task is None or _task.done():
+        _task = asyncio.get_running_loop().create_task(_refresh_loop())
+    return True
+
+
+async def stop_refresher() -> None:
+    """Cancel the refresh loop and wait for it to exit."""
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _task = None
+
+
+def is_running() -> bool:
+    return _task is not None and not _task.done()
@@ -0,0 +1,161 @@
+"""
+Response Cache - Full portfolio responses with validation on read
+In-process LRU tier in front of a persistent tier: Redis when REDIS_URL is
+configured, otherwise a local SQLite file, so cached responses survive
+restarts and are shared between worker processes.
+
+Entries are stored together with the data versions they were built from.
+Callers pass a `validate` callable to get(); an entry it rejects (e.g.
+because a constituent ticker's fundamentals changed) is deleted from both
+tiers and reported as a miss. When `validate` returns None (this process
+cannot tell yet, e.g. a cold worker with no fundamentals cached) the entry
+is a miss here but stays in the shared tier for workers that can.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from tools.cache import TTLCache, connect_redis
+
+
+class ResponseCache:
+    """Two-tier cache of JSON-serializable entries with a shared TTL."""
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        max_entries: int = 256,
+        redis_url: Optional[str] = None,
+        path: Optional[str] = None
+    ):
+        self.name = name
+        self.ttl = ttl
+        self._memory = TTLCache(name, ttl, max_entries)
+        self._redis = connect_redis(redis_url) if redis_url else None
+        self._db = _open_db(path) if self._redis is None and path else None
+        self._db_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stats = {"persistent_hits": 0, "invalidations": 0, "unverified": 0, "persistent_errors": 0}
+
+    def get(self, key: str, validate: Optional[Callable[[Dict], Optional[bool]]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the entry for `key` if present, unexpired and accepted by
+        `validate`. False from `validate` deletes the entry from both tiers;
+        None is a miss that leaves the stored entry alone.
+        """
+        entry = self._memory.get(key)
+        from_persistent = False
+        if entry is None:
+            entry = self._persistent_get(key)
+            from_persistent = entry is not None
+        if entry is None:
+            return None
+
+        valid = validate(entry) if validate is not None else True
+        if valid is None:
+            with self._lock:
+                self._stats["unverified"] += 1
+            return None
+        if not valid:
+            self.delete(key)
+            with self._lock:
+                self._stats["invalidations"] += 1
+            return None
+
+        if from_persistent:
+            self._memory.set(key, entry)
+            with self._lock:
+                self._stats["persistent_hits"] += 1
+        return entry
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        self._memory.set(key, entry)
+        self._persistent_set(key, entry)
+
+    def delete(self, key: str) -> None:
+        self._memory.delete(key)
+        try:
+            if self._redis is not None:
+                self._redis.delete(self._redis_key(key))
+            elif self._db is not None:
+                with self._db_lock:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+        except Exception as e:
+            self._persistent_error(e)
+
+    def clear(self) -> None:
+        """Drop every in-process entry (the persistent tier is left untouched)."""
+        self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._memory.stats()
+        with self._lock:
+            stats.update(self._stats)
+        stats["persistent"] = "redis" if self._redis is not None else ("sqlite" if self._db is not None else "none")
+        return stats
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    def _persistent_get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            if self._redis is not None:
+                raw = self._redis.get(self._redis_key(key))
+            elif self._db is not None:
+                with self._db_lock:
+                    row = self._db.execute(
+                        "SELECT value FROM responses WHERE key = ? AND expires_at > ?",
+                        (key, time.time())
+                    ).fetchone()
+                raw = row[0] if row else None
+            else:
+                return None
+        except Exception as e:
+            self._persistent_error(e)
+            return None
+        return json.loads(raw) if raw else None
+
+    def _persistent_set(self, key: str, entry: Dict[str, Any]) -> None:
+        try:
+            raw = json.dumps(entry)
+            if self._redis is not None:
+                self._redis.set(self._redis_key(key), raw, ex=max(1, int(self.ttl)))
+            elif self._db is not None:
+                now = time.time()
+                with self._db_lock:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, raw, now + self.ttl)
+                    )
+                    # Expired rows are swept opportunistically on write
+                    self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        except Exception as e:
+            self._persistent_error(e)
+
+    def _persistent_error(self, error: Exception) -> None:
+        with self._lock:
+            self._stats["persistent_errors"] += 1
+            first_error = self._stats["persistent_errors"] == 1
+        if first_error:
+            print(f"⚠️  Response cache persistent tier error ({self.name}): {error}")
+
+
+def _open_db(path: str) -> Optional[sqlite3.Connection]:
+    """Open (and create) the SQLite tier, returning None if the file is unusable."""
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        return conn
+    except Exception as e:
+        print(f"⚠️  Response cache disk tier unavailable, using in-process cache only: {e}")
+        return None
@@ -0,0 +1,209 @@
+"""
+Score Store - Persistent fundamental score index
+SQLite table keyed by ticker holding the latest calculate_fundamental_score
+output, the metrics it was computed from and when it was computed.
+
+Written when the nightly snapshot is built (tools/snapshot.py) and, via a
+background writer that flushes in batches, whenever the agent scores
+candidates, so requests never wait on SQLite. Read by /api/v1/scores, so
+score lookups are an index read rather than a Yahoo fetch plus recompute.
+WAL mode lets every worker process read while another writes.
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from tools.records import SCORE_METRICS, StockRecord
+
+DEFAULT_SCORE_STORE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data",
+    "scores.db"
+)
+SCORE_STORE_PATH = os.getenv("SCORE_STORE_PATH", DEFAULT_SCORE_STORE_PATH)
+SCORE_FLUSH_SECONDS = float(os.getenv("SCORE_FLUSH_SECONDS", "1"))
+
+# SQLite caps bound parameters per statement (999 on older builds)
+_QUERY_CHUNK = 500
+
+_COLUMNS = ["ticker", "company_name", "sector", "score"] + SCORE_METRICS + ["source", "updated_at"]
+
+
+class ScoreStore:
+    """Ticker-keyed score index in a single SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        metric_columns = ", ".join(f"{metric} REAL" for metric in SCORE_METRICS)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores ("
+            "ticker TEXT PRIMARY KEY, company_name TEXT, sector TEXT, score REAL NOT NULL, "
+            f"{metric_columns}, source TEXT, updated_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def upsert(self, records: Iterable[Dict]) -> int:
+        """Insert or replace score records (dicts with the store's columns)."""
+        rows = [tuple(record.get(column) for column in _COLUMNS) for record in records]
+        if not rows:
+            return 0
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO scores ({', '.join(_COLUMNS)}) VALUES ({placeholders})",
+                rows
+            )
+            self._conn.execute("COMMIT")
+        return len(rows)
+
+    def get_many(self, tickers: List[str]) -> Dict[str, Dict]:
+        """Records for every stored ticker in `tickers`, in input order."""
+        unique = list(dict.fromkeys(tickers))
+        found = {}
+        with self._lock:
+            for i in range(0, len(unique), _QUERY_CHUNK):
+                chunk = unique[i:i + _QUERY_CHUNK]
+                cursor = self._conn.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM scores WHERE ticker IN ({', '.join('?' for _ in chunk)})",
+                    chunk
+                )
+                for row in cursor:
+                    found[row[0]] = _to_record(row)
+        return {t: found[t] for t in unique if t in found}
+
+    def get(self, ticker: str) -> Optional[Dict]:
+        return self.get_many([ticker]).get(ticker)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+
+_store: Optional[ScoreStore] = None
+_store_lock = threading.Lock()
+
+
+def get_score_store() -> ScoreStore:
+    """The process-wide score store, opened on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ScoreStore(SCORE_STORE_PATH)
+    return _store
+
+
+def record_scores(
+    stock_records: List[StockRecord],
+    scores: Iterable[float],
+    source: str,
+    updated_at: Optional[float] = None
+) -> int:
+    """
+    Persist freshly computed scores. Stub records from failed fetches (which
+    lack the scoring metrics) are skipped. Failures are logged, never raised,
+    so scoring never fails because the index is unavailable.
+    """
+    return _write(_score_rows(stock_records, scores, source, updated_at or time.time()))
+
+
+# Scores queued by request handlers, latest per ticker, until the writer flushes
+_pending: Dict[str, Dict] = {}
+_pending_lock = threading.Lock()
+_writer: Optional[threading.Thread] = None
+
+
+def queue_scores(stock_records: List[StockRecord], scores: Iterable[float], source: str) -> int:
+    """
+    Queue scores for the background writer instead of writing them on the
+    caller's thread (or event loop). Queued scores for the same ticker
+    coalesce; the writer upserts everything pending every
+    SCORE_FLUSH_SECONDS in one transaction.
+    """
+    global _writer
+    rows = _score_rows(stock_records, scores, source, time.time())
+    with _pending_lock:
+        for row in rows:
+            _pending[row["ticker"]] = row
+        if rows and _writer is None:
+            _writer = threading.Thread(target=_writer_loop, name="score-writer", daemon=True)
+            _writer.start()
+    return len(rows)
+
+
+def flush_scores() -> int:
+    """Write every queued score now (also runs at interpreter exit)."""
+    with _pending_lock:
+        rows = list(_pending.values())
+        _pending.clear()
+    return _write(rows)
+
+
+atexit.register(flush_scores)
+
+
+def _writer_loop() -> None:
+    while True:
+        time.sleep(SCORE_FLUSH_SECONDS)
+        flush_scores()
+
+
+def _score_rows(stock_records: List[StockRecord], scores: Iterable[float], source: str, updated_at: float) -> List[Dict]:
+    rows = []
+    for stock, score in zip(stock_records, scores):
+        if not stock.ticker or not stock.has_fundamentals:
+            continue
+        row = {metric: getattr(stock, metric) for metric in SCORE_METRICS}
+        row.update({
+            "ticker": stock.ticker,
+            "company_name": stock.company_name,
+            "sector": stock.sector,
+            "score": float(score),
+            "source": source,
+            "updated_at": updated_at
+        })
+        rows.append(row)
+    return rows
+
+
+def _write(rows: List[Dict]) -> int:
+    if not rows:
+        return 0
+    try:
+        return get_score_store().upsert(rows)
+    except Exception as e:
+        print(f"⚠️  Could not record scores: {e}")
+        return 0
+
+
+def lookup_scores(tickers: List[str]) -> Dict[str, Dict]:
+    """Stored score records for `tickers` (absent tickers are omitted), including queued ones."""
+    tickers = [t.upper() for t in tickers]
+    found = get_score_store().get_many(tickers)
+    with _pending_lock:
+        queued = {t: _pending[t] for t in tickers if t in _pending}
+    found.update({t: _to_record(tuple(row.get(column) for column in _COLUMNS)) for t, row in queued.items()})
+    return {t: found[t] for t in dict.fromkeys(tickers) if t in found}
+
+
+def _to_record(row: tuple) -> Dict:
+    values = dict(zip(_COLUMNS, row))
+    return {
+        "ticker": values["ticker"],
+        "company_name": values["company_name"],
+        "sector": values["sector"],
+        "score": values["score"],
+        "metrics": {metric: values[metric] for metric in SCORE_METRICS},
+        "source": values["source"],
+        "updated_at": datetime.fromtimestamp(values["updated_at"], tz=timezone.utc).isoformat()
+    }
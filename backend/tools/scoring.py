@@ -0,0 +1,97 @@
+"""
+Fundamental Scoring - Quality scores (1-5) from fundamentals
+Pure functions with no import-time side effects, so screening worker
+processes can score shards without loading the market data layer (its
+provider, gateway, Redis client and fetch pool).
+"""
+
+from typing import TYPE_CHECKING, Dict, Union
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from tools.records import StockRecord
+
+
+def calculate_fundamental_score(stock_info: Union[Dict, "StockRecord"]) -> float:
+    """
+    Calculate a quality score (1-5) based on fundamentals, from a stock
+    info dict or StockRecord. Missing metrics count as 0.
+    Similar to CapitalCube's approach but using available metrics.
+    """
+    if isinstance(stock_info, dict):
+        metric = lambda name: stock_info.get(name) or 0
+    else:
+        metric = lambda name: getattr(stock_info, name) or 0
+    score = 3.0  # Start at neutral
+    
+    # Profit margin (higher is better)
+    profit_margin = metric("profit_margin")
+    if profit_margin > 0.20:
+        score += 0.5
+    elif profit_margin > 0.10:
+        score += 0.3
+    elif profit_margin < 0:
+        score -= 0.5
+    
+    # P/E ratio (reasonable range is good)
+    pe_ratio = metric("pe_ratio")
+    if 10 < pe_ratio < 25:
+        score += 0.3
+    elif pe_ratio > 50:
+        score -= 0.3
+    
+    # Debt to equity (lower is better)
+    debt_to_equity = metric("debt_to_equity")
+    if debt_to_equity < 50:
+        score += 0.4
+    elif debt_to_equity > 150:
+        score -= 0.4
+    
+    # Revenue growth (positive is good)
+    revenue_growth = metric("revenue_growth")
+    if revenue_growth > 0.15:
+        score += 0.4
+    elif revenue_growth < 0:
+        score -= 0.3
+    
+    # Earnings growth
+    earnings_growth = metric("earnings_growth")
+    if earnings_growth > 0.15:
+        score += 0.3
+    elif earnings_growth < 0:
+        score -= 0.3
+    
+    # Cap between 1.0 and 5.0
+    return max(1.0, min(5.0, round(score, 1)))
+
+def calculate_fundamental_scores(frame) -> np.ndarray:
+    """
+    Vectorized calculate_fundamental_score over columns of metrics.
+    
+    `frame` is a mapping of metric name to array (e.g. StockUniverse.metrics())
+    or a DataFrame. Points are accumulated in integer tenths, so every
+    score matches the scalar function exactly, including its rounding.
+    """
+    n = len(next(iter(frame.values()))) if isinstance(frame, dict) else len(frame)
+    
+    def column(metric):
+        if metric in frame:
+            return np.asarray(frame[metric], dtype=float)
+        return np.zeros(n)
+    
+    profit_margin = column("profit_margin")
+    pe_ratio = column("pe_ratio")
+    debt_to_equity = column("debt_to_equity")
+    revenue_growth = column("revenue_growth")
+    earnings_growth = column("earnings_growth")
+    
+    tenths = np.full(n, 30, dtype=np.int64)  # Start at neutral
+    tenths += np.select([profit_margin > 0.20, profit_margin > 0.10, profit_margin < 0], [5, 3, -5], 0)
+    tenths += np.select([(pe_ratio > 10) & (pe_ratio < 25), pe_ratio > 50], [3, -3], 0)
+    tenths += np.select([debt_to_equity < 50, debt_to_equity > 150], [4, -4], 0)
+    tenths += np.select([revenue_growth > 0.15, revenue_growth < 0], [4, -3], 0)
+    tenths += np.select([earnings_growth > 0.15, earnings_growth < 0], [3, -3], 0)
+    
+    # Cap between 1.0 and 5.0
+    return np.clip(tenths, 10, 50) / 10.0
@@ -0,0 +1,367 @@
+"""
+Universe Screening - Scores and preset portfolios for every ticker at once
+Builds the low/medium/high preset portfolio for each ticker in a universe
+(thousands of symbols) by sharding the CPU work across a process pool, so
+scoring and allocation never compete with the event loop in the API worker.
+
+Run inside backend/:
+    python -m tools.screening --risk medium,high --out data/screen.npz
+    python -m tools.screening --tickers AAPL,MSFT,NVDA,AMD,JPM,BAC --top 5
+
+Work is exchanged with the workers as NumPy arrays, never lists of dicts:
+  1. score:    each shard's metric columns -> calculate_fundamental_scores
+  2. allocate: each shard's sector codes plus the per-sector leader table
+     -> candidate score matrix -> allocate_batch per preset
+Each ticker's candidates are the ticker plus the largest same-sector
+members of the universe (by market cap), like the curated sector peers
+used by the agent. Results index into the universe `tickers` array.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tools.allocation_engine import allocate_batch
+from tools.records import RECORD_FIELDS, SCORE_METRICS, StockUniverse
+from tools.scoring import calculate_fundamental_scores
+
+RISK_LEVELS = ["low", "medium", "high"]
+
+SCREENING_WORKERS = int(os.getenv("SCREENING_WORKERS") or os.cpu_count() or 1)
+# Fewest rows per shard (~20ms of work); below this a pool round trip costs
+# more than the vectorized kernels save. A universe is split into one
+# shard per worker, so anything under twice this size is a single shard.
+SCREENING_MIN_SHARD_SIZE = int(os.getenv("SCREENING_MIN_SHARD_SIZE", "500"))
+PEER_LIMIT = 8
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+
+def get_screening_pool(workers: int = SCREENING_WORKERS) -> ProcessPoolExecutor:
+    """
+    The process-wide screening pool, started on first use (and restarted if
+    a different size is requested). Workers are spawned rather than forked:
+    the API process runs fetch and refresh threads whose locks a forked
+    child could inherit mid-acquire.
+    """
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is not None and _pool_size != workers:
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_size = workers
+        return _pool
+
+
+def shutdown_screening_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def shard_bounds(n: int, workers: int, min_shard_size: int = SCREENING_MIN_SHARD_SIZE) -> List[Tuple[int, int]]:
+    """(start, stop) row ranges: one per worker, each at least `min_shard_size` rows."""
+    shards = max(1, min(workers, n // max(min_shard_size, 1)))
+    size = -(-n // shards) if n else 0
+    return [(start, min(start + size, n)) for start in range(0, n, size)] if n else [(0, 0)]
+
+
+def load_universe(tickers: Optional[List[str]] = None) -> StockUniverse:
+    """
+    Universe columns for `tickers` (default: the curated universe), read from
+    the snapshot where possible and fetched otherwise. Sector ETFs and
+    tickers that fail to fetch are left out.
+    """
+    from tools.market_data import (
+        get_many_stock_info,
+        get_snapshot,
+        get_universe_tickers,
+        DEFAULT_ETF,
+        SECTOR_ETFS
+    )
+
+    etfs = set(SECTOR_ETFS.values()) | {DEFAULT_ETF}
+    snapshot = get_snapshot()
+    if tickers is None and snapshot is not None:
+        rows = snapshot.rows[~np.isin(snapshot.rows["ticker"], list(etfs))]
+        return StockUniverse({name: np.array(rows[name]) for name in RECORD_FIELDS})
+
+    tickers = [t for t in dict.fromkeys(t.upper() for t in tickers or get_universe_tickers()) if t not in etfs]
+    records = []
+    missing = []
+    for ticker in tickers:
+        record = snapshot.get(ticker) if snapshot is not None else None
+        if record is None:
+            missing.append(ticker)
+        else:
+            records.append(record)
+    fetched = get_many_stock_info(missing) if missing else {}
+    # Stub records from failed fetches carry no metrics and would screen as neutral
+    universe = StockUniverse.from_records(records + list(fetched.values()))
+    return universe.take(np.all([~np.isnan(universe[metric]) for metric in SCORE_METRICS], axis=0))
+
+
+def sector_leaders(
+    sector_codes: np.ndarray,
+    market_cap: np.ndarray,
+    sectors: int,
+    peer_limit: int = PEER_LIMIT
+) -> np.ndarray:
+    """
+    (sectors, peer_limit + 1) row indices of each sector's largest members
+    by market cap, -1 padded. One more than `peer_limit`, so a ticker's
+    peers are its sector's leaders without itself.
+    """
+    n = len(sector_codes)
+    order = np.lexsort((-market_cap, sector_codes))  # by sector, then largest first
+    sorted_codes = sector_codes[order]
+    rank = np.arange(n) - np.searchsorted(sorted_codes, sorted_codes)
+
+    leaders = np.full((sectors, peer_limit + 1), -1, dtype=np.int64)
+    keep = rank <= peer_limit
+    leaders[sorted_codes[keep], rank[keep]] = order[keep]
+    return leaders
+
+
+def candidate_rows(rows: np.ndarray, sector_codes: np.ndarray, leaders: np.ndarray) -> np.ndarray:
+    """
+    (len(rows), peer_limit + 1) candidate indices: each ticker followed by
+    its sector's leaders other than itself.
+    """
+    candidates = leaders[sector_codes]
+    peer_limit = candidates.shape[1] - 1
+    is_self = candidates == rows[:, None]
+    # Drop the ticker itself, or the smallest leader when it is not one
+    drop = np.where(is_self.any(axis=1), is_self.argmax(axis=1), peer_limit)
+    keep = np.ones_like(candidates, dtype=bool)
+    keep[np.arange(len(rows)), drop] = False
+    return np.hstack([rows[:, None], candidates[keep].reshape(len(rows), peer_limit)])
+
+
+def screen_universe(
+    universe: Optional[StockUniverse] = None,
+    risk_levels: Optional[List[str]] = None,
+    include_etfs: bool = True,
+    peer_limit: int = PEER_LIMIT,
+    workers: Optional[int] = None,
+    use_pool: Optional[bool] = None
+) -> Dict:
+    """
+    Score every ticker and build its preset portfolio for each risk level.
+    The universe is sharded across `workers` processes; by default a
+    single-shard universe runs in the calling process, `use_pool=True`
+    sends it to the pool as well.
+
+    Returns compact arrays: `tickers`, `sectors`, `etfs` and `scores` (n,),
+    and per risk level `holdings` (n, k) universe indices in priority order
+    (-1 padded), `weights` (n, k), `etf_weight`, `holdings_count`,
+    `average_quality` and `top_weight` (n,).
+    """
+    import pandas as pd
+    from tools.market_data import get_sector_etf
+
+    universe = universe if universe is not None else load_universe()
+    risk_levels = risk_levels or RISK_LEVELS
+    n = len(universe)
+    workers = workers if workers is not None else SCREENING_WORKERS
+    print(f"🔬 Screening {n} tickers ({', '.join(risk_levels)})...")
+
+    bounds = shard_bounds(n, workers)
+    if use_pool is None:
+        use_pool = len(bounds) > 1
+    pool = get_screening_pool(workers) if use_pool else None
+    run = pool.map if pool is not None else map
+
+    sector_codes, sector_names = pd.factorize(universe["sector"])
+    market_cap = universe["market_cap"]
+    metrics = universe.metrics()
+    tasks = [
+        (
+            {metric: column[start:stop] for metric, column in metrics.items()},
+            sector_codes[start:stop], market_cap[start:stop], len(sector_names), peer_limit
+        )
+        for start, stop in bounds
+    ]
+    scored = list(run(_score_shard, tasks))
+    scores = np.concatenate([shard_scores for shard_scores, _ in scored])
+
+    # Workers only need each sector's leaders (and their scores) to build
+    # their rows' candidate lists. The universe leaders are the leaders of
+    # every shard's local leaders.
+    local = np.sort(np.concatenate(
+        [shard_leaders[shard_leaders >= 0] + start for (_, shard_leaders), (start, _) in zip(scored, bounds)]
+    ))
+    positions = sector_leaders(sector_codes[local], market_cap[local], len(sector_names), peer_limit)
+    leaders = np.where(positions >= 0, local[np.clip(positions, 0, None)], -1)
+    leader_scores = np.where(leaders >= 0, scores[np.clip(leaders, 0, None)], np.nan)
+    portfolios = {level: [] for level in risk_levels}
+    tasks = [
+        (start, stop, sector_codes[start:stop], leaders, leader_scores, scores[start:stop], risk_levels, include_etfs)
+        for start, stop in bounds
+    ]
+    for shard in run(_allocate_shard, tasks):
+        for level in risk_levels:
+            portfolios[level].append(shard[level])
+
+    etf_by_sector = np.array([get_sector_etf(str(s)) or "" for s in sector_names], dtype="U12")
+    result = {
+        "tickers": universe.tickers,
+        "sectors": universe["sector"],
+        "etfs": etf_by_sector[sector_codes] if include_etfs else np.full(n, "", dtype="U12"),
+        "scores": scores,
+        "portfolios": {
+            level: {key: np.concatenate([shard[key] for shard in shards]) for key in shards[0]}
+            for level, shards in portfolios.items()
+            if shards
+        }
+    }
+    processes = f"{min(workers, len(bounds))} worker process(es)" if pool else "the calling process"
+    print(f"✅ Screened {n} tickers in {len(bounds)} shard(s) on {processes}")
+    return result
+
+
+async def ascreen_universe(
+    tickers: Optional[List[str]] = None,
+    risk_levels: Optional[List[str]] = None,
+    include_etfs: bool = True,
+    peer_limit: int = PEER_LIMIT
+) -> Dict:
+    """
+    Load and screen a universe off the event loop. All scoring and
+    allocation runs in the pool, however small the universe, so it never
+    holds the API process's GIL.
+    """
+    loop = asyncio.get_running_loop()
+    universe = await loop.run_in_executor(None, load_universe, tickers)
+    return await loop.run_in_executor(
+        None, screen_universe, universe, risk_levels, include_etfs, peer_limit, None, True
+    )
+
+
+def screen_payload(result: Dict, decimals: int = 4) -> Dict:
+    """A screen as columnar JSON-ready lists (holdings stay indices into `tickers`)."""
+    return {
+        "count": len(result["tickers"]),
+        "tickers": result["tickers"].tolist(),
+        "sectors": result["sectors"].tolist(),
+        "etfs": result["etfs"].tolist(),
+        "scores": result["scores"].tolist(),
+        "portfolios": {
+            level: {
+                key: np.round(value.astype(float), decimals).tolist() if value.dtype.kind == "f" else value.tolist()
+                for key, value in columns.items()
+            }
+            for level, columns in result["portfolios"].items()
+        }
+    }
+
+
+def save_screen(result: Dict, path: str) -> None:
+    """Write a screen to a compressed .npz (one array per column)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    arrays = {key: value for key, value in result.items() if key != "portfolios"}
+    for level, columns in result["portfolios"].items():
+        arrays.update({f"{level}_{key}": value for key, value in columns.items()})
+    np.savez_compressed(path, **arrays)
+
+
+def _score_shard(task) -> Tuple[np.ndarray, np.ndarray]:
+    """Scores and per-sector leaders (shard row indices) for one shard."""
+    metrics, sector_codes, market_cap, sectors, peer_limit = task
+    return calculate_fundamental_scores(metrics), sector_leaders(sector_codes, market_cap, sectors, peer_limit)
+
+
+def _allocate_shard(task) -> Dict[str, Dict[str, np.ndarray]]:
+    """Preset portfolios and their summary statistics for one shard."""
+    start, stop, sector_codes, leaders, leader_scores, own_scores, risk_levels, include_etfs = task
+    candidates = candidate_rows(np.arange(start, stop), sector_codes, leaders)
+    scores = np.hstack([own_scores[:, None], _candidate_peer_scores(candidates, sector_codes, leaders, leader_scores)])
+    result = {}
+    for level in risk_levels:
+        order = _priority_order(scores, target_first=level == "high")
+        holdings = np.take_along_axis(candidates, order, axis=1)
+        ordered = np.take_along_axis(scores, order, axis=1)
+        weights, etf_weight = allocate_batch(level, ordered, include_etfs)
+
+        held = weights > 1e-9
+        count = held.sum(axis=1)
+        quality = np.where(held, np.nan_to_num(ordered), 0.0).sum(axis=1) / np.maximum(count, 1)
+        result[level] = {
+            "holdings": np.where(held, holdings, -1).astype(np.int32),
+            "weights": weights.astype(np.float32),
+            "etf_weight": etf_weight.astype(np.float32),
+            "holdings_count": (count + (etf_weight > 0)).astype(np.int16),
+            "average_quality": quality.astype(np.float32),
+            "top_weight": np.maximum(weights.max(axis=1, initial=0.0), etf_weight).astype(np.float32),
+        }
+    return result
+
+
+def _candidate_peer_scores(
+    candidates: np.ndarray,
+    sector_codes: np.ndarray,
+    leaders: np.ndarray,
+    leader_scores: np.ndarray
+) -> np.ndarray:
+    """Scores of each row's peers (candidate columns 1..), looked up in its sector's leader table."""
+    peers = candidates[:, 1:, None]
+    row_leaders = leaders[sector_codes][:, None, :]
+    position = (row_leaders == peers).argmax(axis=2)
+    scores = np.take_along_axis(leader_scores[sector_codes], position, axis=1)
+    return np.where(candidates[:, 1:] >= 0, scores, np.nan)
+
+
+def _priority_order(scores: np.ndarray, target_first: bool) -> np.ndarray:
+    """Column order by score (highest first, empty slots last), optionally pinning column 0."""
+    key = np.where(np.isnan(scores), np.inf, -scores)
+    if target_first:
+        key = key.copy()
+        key[:, 0] = -np.inf
+    return np.argsort(key, axis=1, kind="stable")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen a ticker universe with the allocation presets.")
+    parser.add_argument("--tickers", help="Comma-separated tickers (default: snapshot or curated universe)")
+    parser.add_argument("--risk", default=",".join(RISK_LEVELS), help="Comma-separated risk levels")
+    parser.add_argument("--no-etfs", action="store_true", help="Exclude sector ETFs from portfolios")
+    parser.add_argument("--peers", type=int, default=PEER_LIMIT, help="Peers per portfolio")
+    parser.add_argument("--workers", type=int, default=SCREENING_WORKERS, help="Worker processes")
+    parser.add_argument("--out", help="Write the screen to this .npz file")
+    parser.add_argument("--top", type=int, default=10, help="Print the best N portfolios per risk level")
+    args = parser.parse_args()
+
+    tickers = [t.strip() for t in args.tickers.split(",") if t.strip()] if args.tickers else None
+    risk_levels = [r.strip() for r in args.risk.split(",") if r.strip()]
+    result = screen_universe(load_universe(tickers), risk_levels, not args.no_etfs, args.peers, args.workers)
+    shutdown_screening_pool()
+
+    if args.out:
+        save_screen(result, args.out)
+        print(f"💾 Saved screen to {args.out}")
+
+    tickers = result["tickers"]
+    for level, columns in result["portfolios"].items():
+        print(f"\n📋 {level} risk: top {args.top} by average quality")
+        for i in np.argsort(-columns["average_quality"], kind="stable")[:args.top]:
+            holdings = ", ".join(
+                f"{tickers[h]} {w:.0%}" for h, w in zip(columns["holdings"][i], columns["weights"][i]) if h >= 0
+            )
+            etf = f", {result['etfs'][i]} {columns['etf_weight'][i]:.0%}" if columns["etf_weight"][i] > 0 else ""
+            print(f"  {tickers[i]:<6} quality {columns['average_quality'][i]:.2f}  {holdings}{etf}")
+
+
+if __name__ == "__main__":
+    main()
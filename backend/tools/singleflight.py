@@ -0,0 +1,97 @@
+"""
+Single-flight Request Coalescing
+Concurrent callers asking for the same key share one in-flight call.
+
+When a ticker trends, dozens of requests miss the cache for it at the
+same moment. Without coalescing each one calls Yahoo; with it the first
+caller (the leader) does the work and everyone else waits for its result.
+Nothing is cached here: once the call finishes the key is forgotten, so
+the next caller starts a fresh flight (normally a cache hit by then).
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from config.metrics import increment
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """Coalesces concurrent blocking calls across threads."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run `fn()` unless a call for `key` is already in flight, in which case
+        wait for it. Every caller gets the leader's result (or exception), so
+        treat the result as shared and copy before mutating.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            increment("singleflight_coalesced_total", flight=self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces concurrent coroutines on the same event loop. In-flight tasks
+    are tracked per loop, so callers on different loops (the server's and a
+    script thread's) never await each other's tasks.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Task]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await `factory()` unless a call for `key` is already in flight.
+
+        The shared call runs as its own task, so a caller that is cancelled
+        (e.g. a client disconnect) does not cancel it for the others.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            tasks = self._loops.setdefault(loop, {})
+        task = tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            tasks[key] = task
+            task.add_done_callback(lambda _: tasks.pop(key, None))
+        else:
+            increment("singleflight_coalesced_total", flight=self.name)
+        return await asyncio.shield(task)
@@ -0,0 +1,192 @@
+"""
+Universe Snapshot - Precomputed fundamentals store
+Nightly job that snapshots the curated universe into a memory-mapped file.
+
+Build (e.g. from a nightly cron, run inside backend/):
+    python -m tools.snapshot --out data/universe_snapshot.npy --extra TSLA,PLTR
+
+The snapshot is a NumPy structured array (one fixed-width row per ticker)
+with a JSON sidecar holding build metadata. Readers open it with
+mmap_mode="r", so every worker process shares one copy via the page cache.
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from tools.records import StockRecord
+
+DEFAULT_SNAPSHOT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data",
+    "universe_snapshot.npy"
+)
+
+SNAPSHOT_DTYPE = np.dtype([
+    ("ticker", "U12"),
+    ("company_name", "U80"),
+    ("sector", "U32"),
+    ("industry", "U64"),
+    ("market_cap", "i8"),
+    ("market_cap_formatted", "U12"),
+    ("price", "f8"),
+    ("pe_ratio", "f8"),
+    ("profit_margin", "f8"),
+    ("debt_to_equity", "f8"),
+    ("revenue_growth", "f8"),
+    ("earnings_growth", "f8"),
+    ("score", "f8"),
+])
+
+# Stock info fields, as written from provider data (the score is computed)
+STOCK_INFO_FIELDS = [name for name in SNAPSHOT_DTYPE.names if name != "score"]
+_TEXT_FIELDS = {"ticker", "company_name", "sector", "industry", "market_cap_formatted"}
+
+
+class UniverseSnapshot:
+    """Read-only, memory-mapped view of a universe snapshot file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = np.load(path, mmap_mode="r")
+        self.index = {str(ticker): i for i, ticker in enumerate(self.rows["ticker"])}
+        self.metadata = _read_metadata(path)
+        self.built_at = self.metadata.get("built_at", os.path.getmtime(path))
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self.index
+
+    def age_seconds(self) -> float:
+        return time.time() - self.built_at
+
+    def get(self, ticker: str) -> Optional[StockRecord]:
+        """A new StockRecord for `ticker`, with its precomputed score, or None."""
+        i = self.index.get(ticker)
+        if i is None:
+            return None
+        row = self.rows[i]
+        return StockRecord(**{field: _to_python(field, row[field]) for field in SNAPSHOT_DTYPE.names})
+
+    def get_score(self, ticker: str) -> Optional[float]:
+        """Precomputed fundamental score for `ticker`, or None."""
+        i = self.index.get(ticker)
+        return None if i is None else float(self.rows[i]["score"])
+
+
+def build_snapshot(
+    path: str = DEFAULT_SNAPSHOT_PATH,
+    tickers: Optional[List[str]] = None,
+    max_workers: int = 8
+) -> Dict:
+    """
+    Fetch fundamentals for the universe and write a snapshot to `path`.
+
+    Scores and formatted market caps are precomputed, and the scores are
+    also written to the score index (tools/score_store.py). Tickers that
+    fail to fetch are left out (and listed in the metadata) rather than
+    written as zero-filled stubs. The file is replaced atomically.
+    """
+    from tools.market_data import (
+        fetch_stock_info,
+        get_universe_tickers,
+        calculate_fundamental_scores,
+        format_market_cap
+    )
+    from tools.records import StockUniverse
+    from tools.score_store import record_scores
+
+    tickers = tickers or get_universe_tickers()
+    print(f"📸 Building universe snapshot for {len(tickers)} tickers...")
+
+    def fetch(ticker):
+        try:
+            # Batch job: queue behind the Yahoo rate limit instead of failing fast
+            return fetch_stock_info(ticker, wait=60)
+        except Exception as e:
+            print(f"Error fetching data for {ticker}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(fetch, tickers))
+
+    records = [StockRecord.from_info(info) for info in results if info is not None]
+    failed = [t for t, info in zip(tickers, results) if info is None]
+    universe = StockUniverse.from_records(records)
+    scores = calculate_fundamental_scores(universe.metrics())
+
+    rows = np.zeros(len(records), dtype=SNAPSHOT_DTYPE)
+    for field in STOCK_INFO_FIELDS:
+        column = universe[field]
+        rows[field] = column if field in _TEXT_FIELDS else np.nan_to_num(column, nan=0.0)
+    rows["market_cap_formatted"] = [format_market_cap(cap) if cap else "N/A" for cap in universe["market_cap"].tolist()]
+    rows["score"] = scores
+
+    built_at = time.time()
+    metadata = {
+        "built_at": built_at,
+        "count": len(records),
+        "failed": failed
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp.npy"
+    np.save(tmp_path, rows)
+    with open(f"{path}.json.tmp", "w") as f:
+        json.dump(metadata, f)
+    os.replace(f"{path}.json.tmp", f"{path}.json")
+    os.replace(tmp_path, path)
+    record_scores(records, scores, source="snapshot", updated_at=built_at)
+
+    print(f"✅ Snapshot written to {path}: {len(records)} tickers, {len(failed)} failed")
+    return metadata
+
+
+def load_snapshot(path: str = DEFAULT_SNAPSHOT_PATH) -> Optional[UniverseSnapshot]:
+    """Open a snapshot if one exists at `path`."""
+    if not os.path.exists(path):
+        return None
+    try:
+        return UniverseSnapshot(path)
+    except Exception as e:
+        print(f"⚠️  Could not load universe snapshot {path}: {e}")
+        return None
+
+
+def _read_metadata(path: str) -> Dict:
+    try:
+        with open(f"{path}.json") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _to_python(field: str, value):
+    if field in _TEXT_FIELDS:
+        return str(value)
+    if field == "market_cap":
+        return int(value)
+    return float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the universe fundamentals snapshot.")
+    parser.add_argument("--out", default=DEFAULT_SNAPSHOT_PATH, help="Snapshot file path (.npy)")
+    parser.add_argument("--extra", default="", help="Comma-separated tickers to add to the universe")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent fetches")
+    args = parser.parse_args()
+
+    from tools.market_data import get_universe_tickers
+    extra = [t.strip() for t in args.extra.split(",") if t.strip()]
+    build_snapshot(args.out, get_universe_tickers(extra), max_workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
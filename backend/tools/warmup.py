@@ -0,0 +1,66 @@
+"""
+Startup Warm-up - Preload the curated universe before taking traffic
+Run from main.py's startup event. Uvicorn does not accept connections until
+startup finishes, so the first users after a deploy hit a warm cache and an
+initialized LLM client instead of paying for both.
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "30"))
+
+_status: Dict = {"state": "pending"}
+
+
+async def warm_up() -> Dict:
+    """
+    Fetch every sector peer and sector ETF concurrently and create the
+    shared LLM client. Tickers that miss WARMUP_TIMEOUT_SECONDS are left
+    cold rather than delaying startup further.
+    """
+    global _status
+    if not WARMUP_ENABLED:
+        _status = {"state": "disabled"}
+        return _status
+
+    _status = {"state": "warming"}
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+
+    from tools.market_data import get_many_stock_info, get_universe_tickers
+    tickers = get_universe_tickers()
+    # get_many_stock_info blocks on the fetch pool, so drive it from the default executor
+    loaded = await loop.run_in_executor(None, get_many_stock_info, tickers, WARMUP_TIMEOUT_SECONDS)
+
+    if not os.getenv("OPENAI_API_KEY"):
+        llm_status = "not_configured"  # rationales fall back to templates
+    else:
+        try:
+            from agents.portfolio_agent import get_llm
+            await loop.run_in_executor(None, get_llm, loop)
+            llm_status = "ok"
+        except Exception as e:
+            print(f"⚠️  LLM client warm-up failed: {e}")
+            llm_status = "error"
+
+    _status = {
+        "state": "ready",
+        "tickers_loaded": sum(1 for record in loaded.values() if record.data_status != "unavailable"),
+        "tickers_total": len(tickers),
+        "llm_client": llm_status,
+        "duration_seconds": round(time.perf_counter() - start, 2)
+    }
+    return _status
+
+
+def get_warmup_status() -> Dict:
+    """Warm-up state for /health."""
+    return dict(_status)
+
+
+def is_ready() -> bool:
+    return _status["state"] in ("ready", "disabled")
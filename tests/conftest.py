@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# Backend modules import as tools.x / agents.x, as when run from backend/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+# Keep test runs out of the real score and response stores under backend/data
+_scratch = tempfile.mkdtemp(prefix="portfolio-tests-")
+os.environ.setdefault("SCORE_STORE_PATH", os.path.join(_scratch, "scores.db"))
+os.environ.setdefault("RESPONSE_CACHE_PATH", os.path.join(_scratch, "response_cache.db"))
@@ -0,0 +1,116 @@
+"""
+Property tests for the allocation engine: per-name bounds, sector caps and
+the budget hold for every feasible problem, and the presets keep their
+documented shapes.
+"""
+
+import numpy as np
+import pytest
+
+from tools.allocation_engine import allocate_preset, solve_weights
+
+TOL = 1e-9
+
+
+def assert_feasible(weights, budget, lo, hi, sectors=None, cap=None):
+    assert weights.sum() == pytest.approx(budget, abs=TOL)
+    assert np.all(weights >= lo - TOL)
+    assert np.all(weights <= hi + TOL)
+    if sectors is not None:
+        for code in set(sectors.tolist()) - {-1}:
+            assert weights[sectors == code].sum() <= cap + TOL
+
+
+def feasible(budget, lo, hi, n, sectors=None, cap=None):
+    """Whether bounds and caps can meet the budget (caps never force a sector below its floors)."""
+    if n * lo > budget + TOL or n * hi < budget - TOL:
+        return False
+    if sectors is None:
+        return True
+    room = 0.0
+    for code in set(sectors.tolist()):
+        members = int((sectors == code).sum())
+        if code == -1:
+            room += members * hi
+        elif members * lo > cap + TOL:
+            return False
+        else:
+            room += min(cap, members * hi)
+    return room >= budget - TOL
+
+
+@pytest.mark.parametrize(
+    "prefs, budget, lo, hi, sectors, cap",
+    [
+        ([5, 4, 3, 2, 1, 1, 1, 1], 1.0, 0.0, 0.177, [1, 2, 1, 0, 1, 1, 2, 0], 0.334),
+        ([9, 1, 1, 1, 1], 1.0, 0.0827, 0.234, None, None),
+        ([9, 1, 1], 1.0, 0.258, 0.568, None, None),
+        ([10, 0, 0, 0], 1.0, 0.0, 0.3, None, None),
+    ],
+)
+def test_reported_cases(prefs, budget, lo, hi, sectors, cap):
+    sectors = None if sectors is None else np.array(sectors)
+    weights = solve_weights(np.array(prefs, dtype=float), budget, lo, hi, sectors, cap)
+    assert_feasible(weights, budget, lo, hi, sectors, cap)
+
+
+def test_random_feasible_problems():
+    rng = np.random.default_rng(7)
+    checked = 0
+    while checked < 500:
+        n = int(rng.integers(2, 10))
+        prefs = rng.uniform(0, 10, n)
+        prefs[rng.random(n) < 0.2] = 0.0
+        budget = float(rng.choice([0.6, 0.95, 0.97, 1.0]))
+        hi = float(rng.uniform(budget / n, 1.0))
+        lo = float(rng.uniform(0, budget / n)) if rng.random() < 0.5 else 0.0
+        sectors, cap = None, None
+        if rng.random() < 0.6:
+            sectors = rng.integers(-1, 3, n)
+            cap = float(rng.uniform(0.15, 0.6))
+        if not feasible(budget, lo, hi, n, sectors, cap):
+            continue
+        weights = solve_weights(prefs, budget, lo, hi, sectors, cap)
+        assert_feasible(weights, budget, lo, hi, sectors, cap)
+        checked += 1
+
+
+def test_batch_rows_match_single_rows():
+    rng = np.random.default_rng(11)
+    prefs = rng.uniform(0, 10, (40, 6))
+    prefs[rng.random(prefs.shape) < 0.15] = np.nan
+    sectors = rng.integers(-1, 3, (40, 6))
+    batch = solve_weights(prefs, 0.95, 0.0, 0.4, sectors, 0.5)
+    for row in range(len(prefs)):
+        single = solve_weights(prefs[row], 0.95, 0.0, 0.4, sectors[row], 0.5)
+        np.testing.assert_allclose(batch[row], single, atol=TOL)
+    assert np.all(batch[np.isnan(prefs)] == 0)
+
+
+def test_unbound_holdings_stay_proportional():
+    weights = solve_weights(np.array([6.0, 3.0, 2.0, 1.0]), 1.0, 0.0, 0.45)
+    assert weights[0] == pytest.approx(0.45)
+    free = weights[1:] / np.array([3.0, 2.0, 1.0])
+    np.testing.assert_allclose(free, free[0])
+
+
+def test_capped_sector_sits_at_cap_and_others_absorb_rest():
+    weights = solve_weights(np.array([4.0, 3.0, 1.0, 1.0]), 1.0, 0.0, 1.0, np.array([0, 0, 1, 2]), 0.4)
+    assert weights[:2].sum() == pytest.approx(0.4)
+    assert weights[0] / weights[1] == pytest.approx(4 / 3)
+    assert weights[2] == pytest.approx(weights[3])
+    assert weights.sum() == pytest.approx(1.0)
+
+
+def test_infeasible_caps_rescale_to_budget():
+    weights = solve_weights(np.array([4.5, 3.0]), 0.95, 0.0, 0.35)
+    np.testing.assert_allclose(weights, [0.475, 0.475])
+
+
+def test_presets_respect_sector_caps():
+    peers = [("A", 8.0), ("B", 7.0), ("C", 6.5), ("D", 5.0), ("E", 4.0), ("F", 3.0)]
+    sector_by_ticker = {"A": "Tech", "B": "Tech", "C": "Tech", "D": "Energy", "E": "Health", "F": "Energy"}
+    for preset in ("low", "medium", "high"):
+        allocations = dict(allocate_preset(preset, peers, sector_by_ticker=sector_by_ticker, sector_cap=0.5))
+        assert sum(allocations.values()) == pytest.approx(1.0, abs=TOL)
+        assert sum(allocations.get(t, 0.0) for t in ("A", "B", "C")) <= 0.5 + TOL
@@ -0,0 +1,143 @@
+"""
+Portfolio agent behaviour when market data sources fail, run against the
+benchmark fakes (no network).
+"""
+
+import pytest
+
+from benchmarks.fakes import FakeChatOpenAI, FakeYFinance, InjectedFailure, LatencyModel, install_fakes
+from benchmarks.run_benchmarks import reset_state
+from tools.gateway import SourceUnavailable
+
+
+class PartialOutage(FakeYFinance):
+    """Fake Yahoo that fails every request for `down` (all tickers if None)."""
+
+    def __init__(self, down=None):
+        super().__init__(LatencyModel())
+        self.down = down
+
+    def Ticker(self, ticker):
+        if self.down is None or ticker in self.down:
+            raise InjectedFailure(f"Injected Yahoo failure for {ticker}")
+        return super().Ticker(ticker)
+
+
+@pytest.fixture
+def outage():
+    def install(down=None):
+        install_fakes(PartialOutage(down), FakeChatOpenAI())
+        reset_state()
+    yield install
+    reset_state()
+
+
+@pytest.mark.parametrize("include_etfs", [True, False])
+@pytest.mark.parametrize("risk_level", ["low", "medium", "high"])
+def test_all_sources_down_raises_source_unavailable(outage, risk_level, include_etfs):
+    from agents.portfolio_agent import generate_portfolio_allocation
+
+    outage()
+    with pytest.raises(SourceUnavailable):
+        generate_portfolio_allocation("AAPL", 10000, risk_level, include_etfs)
+
+
+def test_all_sources_down_returns_503(outage):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    outage()
+    response = TestClient(app).post(
+        "/api/v1/portfolio/generate",
+        json={"ticker": "AAPL", "investment_amount": 10000, "risk_level": "medium"}
+    )
+    assert response.status_code == 503
+
+
+def test_unavailable_etf_gets_no_weight(outage):
+    from agents.portfolio_agent import generate_portfolio_allocation
+
+    outage(down={"XLK"})
+    result = generate_portfolio_allocation("AAPL", 10000, "low", include_etfs=True)
+    tickers = [item["ticker"] for item in result["allocation"]]
+    assert "XLK" not in tickers
+    assert result["data_quality"]["unavailable"] == ["XLK"]
+    assert sum(item["allocation_percent"] for item in result["allocation"]) >= 99
+
+
+@pytest.fixture
+def healthy():
+    install_fakes(FakeYFinance(LatencyModel()), FakeChatOpenAI())
+    reset_state()
+    yield
+    reset_state()
+
+
+def test_optimizer_without_price_store_reports_fallback(healthy, monkeypatch, tmp_path):
+    import agents.portfolio_agent as portfolio_agent
+    import tools.backtest as backtest
+
+    monkeypatch.setattr(backtest, "PRICE_HISTORY_PATH", str(tmp_path / "missing.parquet"))
+    result = portfolio_agent.generate_portfolio_allocation("AAPL", 10000, "medium", strategy="min_variance")
+    assert result["data_quality"]["strategy"] == "heuristic"
+    assert "No price store" in result["data_quality"]["strategy_fallback"]
+    assert portfolio_agent.get_response_cache_stats()["sets"] == 0
+
+
+def test_optimizer_failure_falls_back_to_preset(healthy, monkeypatch):
+    import numpy as np
+    import agents.portfolio_agent as portfolio_agent
+
+    def singular(*args, **kwargs):
+        raise np.linalg.LinAlgError("Matrix is not positive definite")
+
+    monkeypatch.setattr(portfolio_agent, "optimize_allocation", singular)
+    result = portfolio_agent.generate_portfolio_allocation("AAPL", 10000, "high", strategy="max_sharpe")
+    heuristic = portfolio_agent.generate_portfolio_allocation("AAPL", 10000, "high")
+    assert result["data_quality"]["strategy_fallback"] == "Matrix is not positive definite"
+    assert [i["allocation_percent"] for i in result["allocation"]] == [i["allocation_percent"] for i in heuristic["allocation"]]
+
+
+def test_portfolio_flight_is_per_event_loop():
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    from tools.singleflight import AsyncSingleFlight
+
+    flight = AsyncSingleFlight("test")
+
+    async def generate():
+        await asyncio.sleep(0.05)
+        return asyncio.get_running_loop()
+
+    def run_on_own_loop():
+        return asyncio.run(flight.do("same-request", generate))
+
+    with ThreadPoolExecutor(2) as pool:
+        loops = list(pool.map(lambda _: run_on_own_loop(), range(2)))
+    assert loops[0] is not loops[1]
+
+
+def test_price_refresh_changes_optimizer_cache_key(monkeypatch, tmp_path):
+    import os
+    import tools.backtest as backtest
+    from agents.portfolio_agent import response_cache_key
+
+    prices = tmp_path / "prices.csv"
+    prices.write_text("date,AAPL\n2024-01-02,185.6\n")
+    monkeypatch.setattr(backtest, "PRICE_HISTORY_PATH", str(prices))
+    before = {s: response_cache_key("AAPL", 10000, "medium", True, 5, s) for s in ("heuristic", "min_variance")}
+
+    os.utime(prices, (0, os.path.getmtime(prices) + 60))
+    after = {s: response_cache_key("AAPL", 10000, "medium", True, 5, s) for s in ("heuristic", "min_variance")}
+    assert after["heuristic"] == before["heuristic"]
+    assert after["min_variance"] != before["min_variance"]
+
+
+def test_stock_info_cache_serves_records(healthy):
+    import tools.market_data as market_data
+    from tools.records import StockRecord
+
+    record = market_data.get_stock_info("AAPL")
+    assert isinstance(record, StockRecord) and record.data_status is None
+    assert market_data.get_stock_info("AAPL") is record
+    assert market_data._stock_info_cache.get("AAPL", fields=("sector", "industry")) is record